@@ -0,0 +1,59 @@
+import os
+import logging
+import hashlib
+from astra_web.utils import get_env_var, get_env_flag, default_filename, GENERATOR_DATA_PATH
+from astra_web.storage.content import ContentStore, link_files
+from .schemas.io import GeneratorInput
+
+logger = logging.getLogger(__name__)
+
+# reuses the output of a previous generator run with identical, deterministic input
+GENERATOR_CACHE = get_env_flag("GENERATOR_CACHE", default=True)
+generator_cache = ContentStore(
+    f"{GENERATOR_DATA_PATH}/.generated",
+    max_size=int(get_env_var("GENERATOR_CACHE_SIZE") or 2048) * 2**20,
+    max_age=float(get_env_var("GENERATOR_CACHE_AGE") or 30) * 86400,
+)
+
+
+def input_hash(generator_input: GeneratorInput) -> str | None:
+    """
+    Canonical hash of a generator input without its file name. None if the output is not reproducible,
+    i.e. if particles are sampled pseudo-randomly instead of from a Hammersley sequence or added to an existing file.
+    """
+    if not generator_input.Noise_reduc or generator_input.Add:
+        return None
+    canonical = generator_input.model_dump_json(exclude={'FNAME'}, exclude_none=True, by_alias=True)
+
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _files(generator_input: GeneratorInput) -> dict[str, str]:
+    prefix = default_filename(generator_input.gen_id)
+    return {"particles.ini": f"{prefix}.ini", "run.out": f"{prefix}.out"}
+
+
+def restore_generated(generator_input: GeneratorInput) -> bool:
+    """
+    Links the output of a previous run with the same input to the file names of the given input.
+    """
+    key = input_hash(generator_input) if GENERATOR_CACHE else None
+    entry = None if key is None else generator_cache.lookup(key)
+    if entry is None:
+        return False
+    link_files({target: os.path.join(entry["path"], name) for name, target in _files(generator_input).items()},
+               GENERATOR_DATA_PATH)
+
+    return True
+
+
+def cache_generated(generator_input: GeneratorInput) -> None:
+    key = input_hash(generator_input) if GENERATOR_CACHE else None
+    files = _files(generator_input)
+    if key is None or not all(map(os.path.exists, files.values())):
+        return
+    try:
+        generator_cache.store(key, files, gen_id=generator_input.gen_id)
+    except OSError as e:
+        # the cache is an optimization only
+        logger.warning("Caching the distribution %s failed: %s", generator_input.gen_id, e)
@@ -1,8 +1,11 @@
 import os
 from subprocess import run
 from astra_web.utils import get_env_var, default_filename
+from astra_web.storage.compression import exists
+from astra_web.scheduler import reserve, pin
 from .schemas.io import GeneratorInput
-from .schemas.particles import Particles
+from .cache import restore_generated, cache_generated
+from .schemas.particles import Particles, ParticleSelection
 
 
 ASTRA_BINARY_PATH = get_env_var("ASTRA_BINARY_PATH")
@@ -17,15 +20,21 @@ def write_input_file(generator_input: GeneratorInput) -> str:
 
 
 def process_generator_input(generator_input: GeneratorInput) -> str:
-    raw_process_output = run([
-        _generator_binary(),
-        generator_input.input_filename],
-        capture_output=True
-    ).stdout
-    decoded_process_output = raw_process_output.decode()
     output_file_name = default_filename(generator_input.gen_id) + ".out"
+    if restore_generated(generator_input):
+        with open(output_file_name, "r") as file:
+            return file.read()
+
+    with reserve(1, os.path.basename(generator_input.input_filename)) as cores:
+        raw_process_output = run(pin([
+            _generator_binary(),
+            generator_input.input_filename], cores),
+            capture_output=True
+        ).stdout
+    decoded_process_output = raw_process_output.decode()
     with open(output_file_name, "w") as file:
         file.write(decoded_process_output)
+    cache_generated(generator_input)
 
     return decoded_process_output
 
@@ -34,9 +43,9 @@ def _generator_binary() -> str:
     return f"{ASTRA_BINARY_PATH}/generator"
 
 
-def read_particle_file(filepath):
-    if os.path.exists(filepath):
-        return Particles.from_csv(filepath)
+def read_particle_file(filepath, selection: ParticleSelection | None = None):
+    if exists(filepath):
+        return Particles.from_csv(filepath, cached=True, selection=selection)
     else:
         return None
 
@@ -0,0 +1,104 @@
+import io
+import numpy as np
+from typing import Annotated, Any
+from pydantic import BaseModel, model_validator
+from pydantic_core import core_schema
+from astra_web.storage.parser import read_columns
+from astra_web.storage.cache import cached_columns
+
+
+class NumpyColumn:
+    """
+    Pydantic annotation storing a list of numbers as a contiguous, one-dimensional NumPy array.
+    JSON input and output keep the shape of a plain list, so the array representation is invisible to clients.
+    """
+    def __init__(self, dtype: type, json_type: str):
+        self.dtype = np.dtype(dtype)
+        self.json_type = json_type
+
+    def validate(self, value: Any) -> np.ndarray:
+        return np.ascontiguousarray(value, dtype=self.dtype).reshape(-1)
+
+    @staticmethod
+    def serialize(value: np.ndarray) -> list:
+        return value.tolist()
+
+    def __get_pydantic_core_schema__(self, source_type, handler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            self.validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(self.serialize, when_used='json')
+        )
+
+    def __get_pydantic_json_schema__(self, schema, handler) -> dict:
+        return {'type': 'array', 'items': {'type': self.json_type}}
+
+
+FloatArray = Annotated[np.ndarray, NumpyColumn(np.float64, 'number')]
+IntArray = Annotated[np.ndarray, NumpyColumn(np.int64, 'integer')]
+
+
+def empty_float_array() -> np.ndarray:
+    return np.empty(0, dtype=np.float64)
+
+
+def empty_int_array() -> np.ndarray:
+    return np.empty(0, dtype=np.int64)
+
+
+def write_npz(arrays: dict[str, np.ndarray]) -> bytes:
+    """
+    Serializes arrays into an uncompressed .npz archive with little-endian byte order.
+    """
+    buffer = io.BytesIO()
+    np.savez(buffer, **{key: _little_endian(value) for key, value in arrays.items()})
+
+    return buffer.getvalue()
+
+
+def read_npz(content: bytes) -> dict[str, np.ndarray]:
+    with np.load(io.BytesIO(content), allow_pickle=False) as archive:
+        return {key: archive[key] for key in archive.files}
+
+
+def _little_endian(value) -> np.ndarray:
+    array = np.asarray(value)
+    return array.astype(array.dtype.newbyteorder('<'), copy=False)
+
+
+class ColumnarModel(BaseModel):
+    """
+    Base class of models whose fields are NumPy columns of equal length. Besides JSON, such models
+    can be exchanged as .npz archives holding one array per field.
+    """
+    @model_validator(mode='after')
+    def check_lengths(self):
+        lengths = {key: value.size for key, value in self.columns().items()}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"Columns of unequal length: {lengths}.")
+        return self
+
+    def columns(self) -> dict[str, np.ndarray]:
+        return {key: value for key, value in self if value is not None}
+
+    def to_npz(self) -> bytes:
+        return write_npz(self.columns())
+
+    @classmethod
+    def from_npz(cls, content: bytes):
+        return cls(**read_npz(content))
+
+    @classmethod
+    def from_columns(cls, columns: np.ndarray):
+        return cls(**dict(zip(cls.model_fields, columns)))
+
+    @classmethod
+    def read_columns(cls, filename: str, cached: bool = False) -> np.ndarray:
+        """
+        Reads the columns of an ASTRA file. If cached is true, they are memory-mapped from a binary twin of the file.
+        """
+        read = cached_columns if cached else read_columns
+        return read(filename, len(cls.model_fields))
+
+    @classmethod
+    def from_csv(cls, filename: str, cached: bool = False):
+        return cls.from_columns(cls.read_columns(filename, cached))
@@ -1,70 +1,90 @@
 import pandas as pd
 import numpy as np
+from typing import Mapping
+from numpy.typing import ArrayLike
 from pmd_beamphysics import ParticleGroup
-from typing import Type, TypeVar
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+from .columns import ColumnarModel, FloatArray, IntArray, empty_float_array, empty_int_array
 
-T = TypeVar('T', bound='Parent')
 
-
-class Particles(BaseModel):
-    x: list[float] = Field(
-        default=[],
+class Particles(ColumnarModel):
+    x: FloatArray = Field(
+        default_factory=empty_float_array,
         description='List of particle x values.',
         json_schema_extra={'format': 'Unit: [m]'}
     )
-    y: list[float] = Field(
-        default=[],
+    y: FloatArray = Field(
+        default_factory=empty_float_array,
         description='List of particle y values',
         json_schema_extra={'format': 'Unit: [m]'}
     )
-    z: list[float] = Field(
-        default=[],
+    z: FloatArray = Field(
+        default_factory=empty_float_array,
         description='List of particle z values.',
         json_schema_extra={'format': 'Unit: [m]'}
     )
-    px: list[float] = Field(
-        default=[],
+    px: FloatArray = Field(
+        default_factory=empty_float_array,
         description='List of particle px values.',
         json_schema_extra={'format': 'Unit: [eV/c]'}
     )
-    py: list[float] = Field(
-        default=[],
+    py: FloatArray = Field(
+        default_factory=empty_float_array,
         description='List of particle py values.',
         json_schema_extra={'format': 'Unit: [eV/c]'}
     )
-    pz: list[float] = Field(
-        default=[],
+    pz: FloatArray = Field(
+        default_factory=empty_float_array,
         description='List of particle pz values.',
         json_schema_extra={'format': 'Unit: [eV/c]'}
     )
-    t_clock: list[float] | None = []
-    macro_charge: list[float] = Field(
-        default=[],
+    t_clock: FloatArray = Field(default_factory=empty_float_array)
+    macro_charge: FloatArray = Field(
+        default_factory=empty_float_array,
         description='List of particle macro charges.',
         json_schema_extra={'format': 'Unit: [nC]'}
     )
-    species: list[int] | None = []
-    status: list[int] | None = []
+    species: IntArray = Field(default_factory=empty_int_array)
+    status: IntArray = Field(default_factory=empty_int_array)
 
     @property
     def active_particles(self):
-        return np.array(self.status) >= 0
+        return self.status >= 0
 
     @property
     def lost_particles(self):
-        return np.array(self.status) < 0
+        return self.status < 0
 
     def to_csv(self, filename) -> None:
         pd.DataFrame(dict(self)).to_csv(filename, sep=" ", header=False, index=False)
 
     @classmethod
-    def from_csv(cls: Type[T], filename: str) -> T:
-        df = pd.read_csv(filename, names=list(cls.model_fields.keys()), sep=r"\s+")
-        return cls(**df.to_dict("list"))
+    def from_csv(cls, filename: str, cached: bool = False, selection: 'ParticleSelection | None' = None):
+        columns = cls.read_columns(filename, cached)
+        if selection is None:
+            return cls.from_columns(columns)
+        return SelectedParticles(**selection.select(dict(zip(cls.model_fields, columns))))
 
     def to_df(self):
-        return pd.DataFrame(self.dict())
+        return pd.DataFrame(dict(self))
+
+    def coordinate(self, key: str, ref=None) -> np.ndarray:
+        """
+        Returns a particle coordinate in the absolute frame and units used by to_pmd, i.e. z, pz and t
+        are shifted by the values of the reference particle and t is given in [s].
+
+        :param key: One of x, y, z, px, py, pz, t.
+        :param ref: Reference particle, defaults to the first particle.
+        """
+        column = self.t_clock if key == 't' else getattr(self, key)
+        if key not in ['z', 'pz', 't'] or column.size == 0:
+            return column
+
+        ref_value = column[0] if ref is None else ref['t_clock' if key == 't' else key]
+        values = column.copy()
+        values[1:] += ref_value
+
+        return values * 1e-9 if key == 't' else values
 
     def to_pmd(self, ref=None, only_active=False) -> ParticleGroup:
         """
@@ -72,27 +92,122 @@ class Particles(BaseModel):
 
         Parameters
         ----------
-        :param particles: DataFrame
-            A pandas DataFrame holding information on a particle distribution formatted as defined by ASTRA. Refer
-            to the ASTRA manual for further information.
+        :param ref: dict-like
+            Reference particle holding values for 'z', 'pz' and 't_clock'. Defaults to the first particle.
+        :param only_active: bool
+            If true, lost particles are discarded.
         :return: ParticleGroup
         """
-        data = self.to_df()
-        ref = ref if ref is not None else data.iloc[0]
+        ref = ref if ref is not None else {key: getattr(self, key)[0] for key in ['z', 'pz', 't_clock']}
+        rows = np.flatnonzero(self.active_particles) if only_active else slice(None)
+        # offsets apply to all particles except the reference particle in the first row
+        first = 1 if not only_active or (self.status.size > 0 and self.status[0] >= 0) else 0
+
+        # ParticleGroup copies all arrays on construction, so views are only copied here if they are modified
+        data = {key: getattr(self, key)[rows] for key in ['x', 'y', 'px', 'py']}
+        for key in ['z', 'pz']:
+            column = getattr(self, key)[rows] if only_active else getattr(self, key).copy()
+            column[first:] += ref[key]
+            data[key] = column
+
+        status = self.status[rows]
+        data['status'] = np.where(status == 1, 2, np.where(status == 5, 1, status))
+        data['weight'] = np.abs(self.macro_charge[rows]) * 1e-9
+        data['species'] = 'electron'
+        data['t'] = ref['t_clock'] * 1e-9
+
+        return ParticleGroup(data=data)
+
+
+class SelectedParticles(Particles):
+    """
+    Particles read with a ParticleSelection. Attributes which are not selected are null.
+    """
+    x: FloatArray | None = None
+    y: FloatArray | None = None
+    z: FloatArray | None = None
+    px: FloatArray | None = None
+    py: FloatArray | None = None
+    pz: FloatArray | None = None
+    t_clock: FloatArray | None = None
+    macro_charge: FloatArray | None = None
+    species: IntArray | None = None
+    status: IntArray | None = None
+
+
+class ParticleSelection(BaseModel):
+    """
+    Subset of particle checkpoints, attributes and particles to be read from disk. The reference
+    particle in the first row is always kept, since the longitudinal coordinates of all other particles
+    are given relative to it.
+    """
+    checkpoints: list[int] | None = Field(
+        default=None,
+        description='Indices of the checkpoints to be returned. Negative indices count from the last checkpoint.'
+    )
+    z_min: float | None = Field(
+        default=None,
+        description='Only checkpoints with a reference particle at or behind z_min are returned.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    z_max: float | None = Field(
+        default=None,
+        description='Only checkpoints with a reference particle at or before z_max are returned.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    columns: list[str] | None = Field(
+        default=None,
+        description='Particle attributes to be returned. All other attributes are null.'
+    )
+    only_active: bool = Field(
+        default=False,
+        description='If true, lost particles are discarded.'
+    )
+    stride: int = Field(
+        default=1,
+        gt=0,
+        description='Only every n-th particle is returned.'
+    )
+    sample: int | None = Field(
+        default=None,
+        gt=0,
+        description='Size of a random subset of the particles to be returned.'
+    )
+    seed: int | None = Field(
+        default=None,
+        description='Seed of the random subset. Equal seeds select equal particles.'
+    )
+
+    @field_validator('columns')
+    @classmethod
+    def known_columns(cls, columns: list[str] | None) -> list[str] | None:
+        unknown = set(columns or []) - set(Particles.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown particle attributes {sorted(unknown)}.")
+        return columns
+
+    def checkpoint_indices(self, n_checkpoints: int) -> list[int]:
+        if self.checkpoints is None:
+            return list(range(n_checkpoints))
+        return [idx % n_checkpoints for idx in self.checkpoints if -n_checkpoints <= idx < n_checkpoints]
 
-        if only_active:
-            data = data[self.active_particles]
+    def rows(self, status: np.ndarray) -> np.ndarray | slice:
+        if not self.only_active and self.stride == 1 and self.sample is None:
+            return slice(None)
 
-        data['weight'] = np.abs(data.pop('macro_charge')) * 1e-9
-        data.loc[1:, 'z'] = data.loc[1:, 'z'] + ref['z']
-        data.loc[1:, 'pz'] = data.loc[1:, 'pz'] + ref['pz']
-        data.loc[1:, 't_clock'] = (data.loc[1:, 't_clock'] + ref['t_clock']) * 1e-9
-        data.loc[data['status'] == 1, 'status'] = 2
-        data.loc[data['status'] == 5, 'status'] = 1
+        rows = np.flatnonzero(status >= 0) if self.only_active else np.arange(status.size)
+        rows = rows[rows > 0][::self.stride]
+        if self.sample is not None and self.sample < rows.size:
+            rows = np.sort(np.random.default_rng(self.seed).choice(rows, size=self.sample, replace=False))
 
-        data_dict = data.to_dict('list')
-        data_dict['n_particles'] = data.size
-        data_dict['species'] = 'electron'
-        data_dict['t'] = ref['t_clock'] * 1e-9
+        return np.concatenate([[0], rows]) if status.size > 0 else rows
+
+    def select(self, columns: Mapping[str, ArrayLike]) -> dict[str, np.ndarray | None]:
+        """
+        Selects rows and attributes from the columns of a particle file, e.g. memory-mapped arrays or
+        HDF5 datasets. Only the status column and the selected attributes are accessed.
+        """
+        rows = self.rows(np.asarray(columns['status']))
+        selected = self.columns or list(Particles.model_fields)
 
-        return ParticleGroup(data=data_dict)
\ No newline at end of file
+        return {name: np.asarray(columns[name])[rows] if name in selected else None for name in Particles.model_fields}
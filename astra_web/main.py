@@ -1,27 +1,65 @@
-import os, glob, typing, orjson
+import os, glob, typing, orjson, asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import Future
 from shutil import rmtree
 from datetime import datetime
 from shortuuid import uuid
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.responses import ORJSONResponse
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from fastapi.responses import ORJSONResponse, FileResponse
 from .utils import default_filename, GENERATOR_DATA_PATH, SIMULATION_DATA_PATH
+from .storage.cache import remove_sidecars
+from .negotiation import NPZ_MEDIA_TYPE, NDJSON_MEDIA_TYPE, NPZResponse, NDJSONResponse, alternative_responses, \
+    accepts_npz, accepts_ndjson, npz_request_body, npz_request_body_schema, EventStreamResponse, \
+    EVENT_STREAM_MEDIA_TYPE
 from .auth.auth_schemes import api_key_auth
-from .generator.schemas.particles import Particles
+from .scheduler import Cancelled, SchedulerStatus, status as scheduler_status
+from .generator.schemas.particles import Particles, ParticleSelection
 from .generator.schemas.io import GeneratorInput, GeneratorOutput
-from .simulation.schemas.io import StatisticsInput, StatisticsOutput
-from .simulation.schemas.io import SimulationInput, SimulationOutput
+from .simulation.schemas.io import StatisticsInput, StatisticsOutput, HistogramInput, HistogramOutput
+from .simulation.schemas.io import StatisticsEvolutionInput, StatisticsEvolution
+from .simulation.schemas.io import SimulationInput, SimulationOutput, CompactionReport, SimulationSummary
+from .simulation.schemas.jobs import Job, JobStatus
+from .simulation.schemas.scan import ScanInput, ScanPoint
+from .simulation.schemas.tables import FieldTable
 from .generator.generator import write_input_file, process_generator_input, read_output_file, read_particle_file
-from .simulation.simulation import process_simulation_input, load_emittance_output, load_simulation_output
-from .simulation.statistics import get_statistics
+from .simulation.simulation import load_simulation_output, \
+    iter_simulation_output, checkpoints, read_checkpoint, export_run_hdf5, compact_run
+from .simulation.statistics import submit_statistics, submit_statistics_evolution, histogram, histogram_columns, \
+    shutdown as shutdown_statistics
+from .simulation import jobs, progress, scratch, statistics_cache
+from .simulation.scratch import run_path
+from .simulation.summary import load_summary, submit_summary
+from .simulation.scan import submit_scan, iter_scan_results
+from .simulation.cache import result_cache
+from .simulation.fieldmaps import field_tables, register_field_table, load_field_table, list_field_tables
+from .generator.cache import generator_cache
+from .storage.content import ContentStoreStatus
 
 tags_metadata = [
     {"name": "particles", "description": "All CRUD methods for particle distributions. Distributions are generated \
                                          by ASTRA generator binary."},
     {"name": "simulations", "description": "All CRUD methods for beam dynamics simulations. Simulations are run \
                                            by ASTRA binary."},
+    {"name": "fieldmaps", "description": "Registry of field tables of cavities and solenoids. Registered tables \
+                                         are referenced by their ID and shared by all simulations."},
+    {"name": "jobs", "description": "Asynchronous execution of simulations. Jobs are run by a bounded pool of \
+                                    workers and survive restarts of the API."},
 ]
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.recover_scratch()
+    jobs.restore_jobs()
+    yield
+    jobs.shutdown()
+    shutdown_statistics()
+    scratch.shutdown()
+
+
 app = FastAPI(
     title="ASTRA WebAPI",
     description="This is an API wrapper for the ASTRA simulation code developed \
@@ -33,10 +71,65 @@ app = FastAPI(
     },
     root_path=os.getenv("SERVER_ROOT_PATH", ""),
     openapi_tags=tags_metadata,
-    default_response_class=ORJSONResponse
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 
+def _query(model_cls, name: str):
+    field = model_cls.model_fields[name]
+    return Query(default=field.default, description=field.description)
+
+
+def _selection_query(name: str):
+    return _query(ParticleSelection, name)
+
+
+def _histogram_query(name: str):
+    return _query(HistogramInput, name)
+
+
+def particle_selection(
+        checkpoints: list[int] | None = _selection_query('checkpoints'),
+        z_min: float | None = _selection_query('z_min'),
+        z_max: float | None = _selection_query('z_max'),
+        columns: list[str] | None = _selection_query('columns'),
+        only_active: bool = _selection_query('only_active'),
+        stride: int = _selection_query('stride'),
+        sample: int | None = _selection_query('sample'),
+        seed: int | None = _selection_query('seed'),
+) -> ParticleSelection:
+    try:
+        return ParticleSelection(checkpoints=checkpoints, z_min=z_min, z_max=z_max, columns=columns,
+                                 only_active=only_active, stride=stride, sample=sample, seed=seed)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+def histogram_input(
+        x: typing.Literal['x', 'y', 'z', 'px', 'py', 'pz', 't'] = _histogram_query('x'),
+        y: typing.Literal['x', 'y', 'z', 'px', 'py', 'pz', 't'] | None = _histogram_query('y'),
+        bins_x: int = _histogram_query('bins_x'),
+        bins_y: int = _histogram_query('bins_y'),
+        x_min: float | None = _histogram_query('x_min'),
+        x_max: float | None = _histogram_query('x_max'),
+        y_min: float | None = _histogram_query('y_min'),
+        y_max: float | None = _histogram_query('y_max'),
+        only_active: bool = _histogram_query('only_active'),
+        weighted: bool = _histogram_query('weighted'),
+        checkpoint: int = _histogram_query('checkpoint'),
+) -> HistogramInput:
+    try:
+        return HistogramInput(x=x, y=y, bins_x=bins_x, bins_y=bins_y, x_min=x_min, x_max=x_max, y_min=y_min,
+                              y_max=y_max, only_active=only_active, weighted=weighted, checkpoint=checkpoint)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+def _histogram_selection(params: HistogramInput) -> ParticleSelection:
+    return ParticleSelection(columns=histogram_columns(params), only_active=params.only_active)
+
+
 @app.post("/particles", dependencies=[Depends(api_key_auth)], tags=['particles'])
 def generate_particle_distribution(generator_input: GeneratorInput) -> GeneratorOutput:
     """
@@ -54,25 +147,43 @@ def generate_particle_distribution(generator_input: GeneratorInput) -> Generator
     )
 
 
-@app.put('/particles/{gen_id}', dependencies=[Depends(api_key_auth)], tags=['particles'])
-def upload_particle_distribution(data: Particles, gen_id: str | None = None) -> dict:
+@app.put('/particles/{gen_id}', dependencies=[Depends(api_key_auth)], tags=['particles'],
+         openapi_extra=npz_request_body_schema('Particles'))
+def upload_particle_distribution(data: Particles = Depends(npz_request_body(Particles, 'particles_body')),
+                                 gen_id: str | None = None) -> dict:
+    """
+    Uploads a particle distribution, either as JSON or as .npz archive with one array per particle attribute.
+    """
     if gen_id is None: gen_id = f"{datetime.now().strftime('%Y-%m-%d')}-{uuid()[:8]}"
     path = default_filename(gen_id) + '.ini'
-    if os.path.exists(path): os.remove(path)
+    if os.path.exists(path):
+        remove_sidecars(path)
+        os.remove(path)
 
     data.to_csv(path)
     return {"gen_id": gen_id}
 
 
-@app.get('/particles/{gen_id}', dependencies=[Depends(api_key_auth)], tags=['particles'])
-def download_particle_distribution(gen_id: str) -> Particles | None:
+@app.get('/particles/cache', dependencies=[Depends(api_key_auth)], tags=['particles'])
+def get_generator_cache_status() -> ContentStoreStatus:
+    """
+    Reports size and hit rate of the cache of generated distributions, which answers generator inputs
+    matching a previous deterministic (quasi-random) generation.
+    """
+    return generator_cache.status()
+
+
+@app.get('/particles/{gen_id}', dependencies=[Depends(api_key_auth)], tags=['particles'],
+         responses=alternative_responses(NPZ_MEDIA_TYPE))
+def download_particle_distribution(gen_id: str, request: Request) -> Particles | None:
     """
     Returns a specific particle distribution on the requested server depending
     on the given filename.
     """
     path = default_filename(gen_id) + '.ini'
     if os.path.exists(path):
-        return Particles.from_csv(path)
+        particles = Particles.from_csv(path)
+        return NPZResponse(particles.to_npz()) if accepts_npz(request) else particles
     else:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -80,6 +191,22 @@ def download_particle_distribution(gen_id: str) -> Particles | None:
         )
 
 
+@app.get('/particles/{gen_id}/histogram', dependencies=[Depends(api_key_auth)], tags=['particles'])
+def particle_distribution_histogram(gen_id: str, params: HistogramInput = Depends(histogram_input)) -> HistogramOutput:
+    """
+    Returns a one- or two-dimensional histogram of the coordinates of a particle distribution.
+    The checkpoint parameter is ignored.
+    """
+    path = default_filename(gen_id) + '.ini'
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item '{gen_id}' not found."
+        )
+
+    return histogram(read_particle_file(path, _histogram_selection(params)), params)
+
+
 @app.get('/particles', dependencies=[Depends(api_key_auth)], tags=['particles'])
 def list_available_particle_distributions() -> list[str]:
     """
@@ -94,39 +221,76 @@ def list_available_particle_distributions() -> list[str]:
 @app.delete('/particles/{gen_id}', dependencies=[Depends(api_key_auth)], tags=['particles'])
 async def delete_particle_distribution(gen_id: str) -> None:
     path = default_filename(gen_id) + '.ini'
-    if os.path.exists(path): os.remove(path)
+    if os.path.exists(path):
+        remove_sidecars(path)
+        os.remove(path)
+
+
+async def _await_job(job: Job, future, request: Request, poll_interval: float = 1.0):
+    # a client giving up on a blocking request must not keep the cores busy
+    result = asyncio.wrap_future(future)
+    while not (await asyncio.wait({result}, timeout=poll_interval))[0]:
+        if await request.is_disconnected():
+            await run_in_threadpool(jobs.cancel, job.job_id)
+    if result.cancelled() or isinstance(result.exception(), Cancelled):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job '{job.job_id}' was cancelled."
+        )
+
+    return result.result()
 
 
 @app.put('/simulations', dependencies=[Depends(api_key_auth)], tags=['simulations'])
-async def run_simulation(simulation_input: SimulationInput) -> dict:
-    simulation_input.write_to_disk()
-    output = process_simulation_input(simulation_input)
+async def run_simulation(simulation_input: SimulationInput, request: Request) -> dict:
+    job, future = await run_in_threadpool(jobs.submit, simulation_input)
+    output = await _await_job(job, future, request)
 
     return {'output': output, 'sim_id': simulation_input.sim_id}
 
-def _particle_paths(sim_id):
-    return sorted(glob.glob(f"{SIMULATION_DATA_PATH}/{sim_id}/run.*[0-9].001"), key=lambda s: s.split(".")[1])
-
-@app.post('/simulations', dependencies=[Depends(api_key_auth)], tags=['simulations'])
-async def run_simulation_and_return_results(simulation_input: SimulationInput) -> SimulationOutput:
-    input_ini = simulation_input.write_to_disk()
-    output = process_simulation_input(simulation_input)
-    x_table, y_table, z_table = load_emittance_output(simulation_input.run_dir)
-    particles = [read_particle_file(path) for path in _particle_paths(simulation_input.sim_id)]
-
-    return SimulationOutput(
-        sim_id=simulation_input.sim_id,
-        input_ini=input_ini,
-        run_output=output,
-        particles=particles,
-        emittance_x=x_table,
-        emittance_y=y_table,
-        emittance_z=z_table,
-    )
+def _simulation_response(path: str, sim_id: str, request: Request, selection: ParticleSelection | None = None):
+    if accepts_ndjson(request):
+        return NDJSONResponse(iter_simulation_output(path, sim_id, selection))
+    output = load_simulation_output(path, sim_id, selection)
+
+    return NPZResponse(output.to_npz()) if accepts_npz(request) else output
+
+
+def _checkpoints(sim_id):
+    return checkpoints(run_path(sim_id))
+
+@app.post('/simulations', dependencies=[Depends(api_key_auth)], tags=['simulations'],
+          responses=alternative_responses(NDJSON_MEDIA_TYPE))
+async def run_simulation_and_return_results(simulation_input: SimulationInput, request: Request) -> SimulationOutput:
+    job, future = await run_in_threadpool(jobs.submit, simulation_input)
+    await _await_job(job, future, request)
+
+    return await run_in_threadpool(_simulation_response, run_path(job.sim_id), simulation_input.sim_id,
+                                   request)
+
+
+async def _scan_results(points: list, n_slices: int):
+    yield {"points": [point for point, _ in points]}
+    async for point in iter_scan_results(points, n_slices):
+        yield point
+
+
+@app.post('/simulations/scan', dependencies=[Depends(api_key_auth)], tags=['simulations'],
+          response_class=NDJSONResponse,
+          responses={200: {"content": {NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}}}}})
+async def run_parameter_scan(scan: ScanInput) -> NDJSONResponse:
+    """
+    Simulates every point of a parameter scan, i.e. the base input with the parameter overrides of the grid and
+    the points, in parallel within the core budget. The response streams newline delimited JSON: first
+    {"points": [...]} listing the sim_id of every point, then one ScanPoint with statistics per finished simulation.
+    """
+    points = await run_in_threadpool(submit_scan, scan)
+
+    return NDJSONResponse(_scan_results(points, scan.n_slices))
 
 
 @app.get('/simulations', dependencies=[Depends(api_key_auth)], tags=['simulations'])
-def list_available_particle_distributions() -> list[str]:
+def list_simulation_ids() -> list[str]:
     """
     Returns a list of all existing simulations on the requested server.
     """
@@ -136,15 +300,32 @@ def list_available_particle_distributions() -> list[str]:
     return sorted(files)
 
 
-@app.get("/simulations/{sim_id}", dependencies=[Depends(api_key_auth)], tags=['simulations'])
-def download_simulation_results(sim_id: str) -> SimulationOutput | None:
+@app.get('/simulations/summaries', dependencies=[Depends(api_key_auth)], tags=['simulations'])
+def list_simulation_summaries(
+        sim_ids: list[str] | None = Query(default=None, description='IDs of the simulations. All by default.')
+) -> list[SimulationSummary]:
+    """
+    Returns the summaries written after the given simulations, without reading any particle file. Simulations
+    without summary are left out.
+    """
+    if sim_ids is None:
+        sim_ids = list_simulation_ids()
+
+    return [summary for sim_id in sim_ids if (summary := load_summary(sim_id, run_path(sim_id))) is not None]
+
+
+@app.get("/simulations/{sim_id}", dependencies=[Depends(api_key_auth)], tags=['simulations'],
+         responses=alternative_responses(NPZ_MEDIA_TYPE, NDJSON_MEDIA_TYPE))
+def download_simulation_results(sim_id: str, request: Request,
+                                selection: ParticleSelection = Depends(particle_selection)) -> SimulationOutput | None:
     """
         Returns the output of a specific ASTRA simulation on the requested server depending
-        on the given ID.
+        on the given ID. Checkpoints, particle attributes and particles can be restricted by the query parameters,
+        which are applied while the particle files are read.
         """
-    path = os.path.abspath(f"{SIMULATION_DATA_PATH}/{sim_id}")
+    path = run_path(sim_id)
     if os.path.exists(path):
-        return load_simulation_output(path, sim_id)
+        return _simulation_response(path, sim_id, request, selection)
     else:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -152,16 +333,276 @@ def download_simulation_results(sim_id: str) -> SimulationOutput | None:
         )
 
 
+@app.get("/simulations/{sim_id}/histogram", dependencies=[Depends(api_key_auth)], tags=['simulations'])
+def simulation_histogram(sim_id: str, params: HistogramInput = Depends(histogram_input)) -> HistogramOutput:
+    """
+    Returns a one- or two-dimensional histogram of the particle coordinates at a simulation checkpoint.
+    """
+    names = _checkpoints(sim_id)
+    if not -len(names) <= params.checkpoint < len(names):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Checkpoint {params.checkpoint} of simulation '{sim_id}' not found."
+        )
+    particles = read_checkpoint(run_path(sim_id), names[params.checkpoint],
+                                _histogram_selection(params))
+
+    return histogram(particles, params)
+
+
+@app.get("/simulations/{sim_id}/summary", dependencies=[Depends(api_key_auth)], tags=['simulations'])
+def simulation_summary(sim_id: str) -> SimulationSummary:
+    """
+    Returns the summary of a simulation, i.e. statistics of its final checkpoint (of all checkpoints with
+    SIMULATION_SUMMARY=all) and the extrema of its emittance tables. Missing summaries are computed first.
+    """
+    run_dir = run_path(sim_id)
+    summary = load_summary(sim_id, run_dir) if os.path.isdir(run_dir) else None
+    if summary is None and os.path.isdir(run_dir):
+        summary = submit_summary(run_dir).result()
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Simulation '{sim_id}' not found."
+        )
+
+    return summary
+
+
+@app.get("/simulations/{sim_id}/export", dependencies=[Depends(api_key_auth)], tags=['simulations'],
+         response_class=FileResponse, responses={200: {"content": {"application/x-hdf5": {}}}})
+def export_simulation(sim_id: str) -> FileResponse:
+    """
+    Returns all checkpoints, emittance tables and text files of a simulation as a single HDF5 file. Particle
+    checkpoints are stored as openPMD particle records and additionally as the original ASTRA columns.
+    """
+    path = run_path(sim_id)
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Simulation '{sim_id}' not found."
+        )
+
+    return FileResponse(export_run_hdf5(path), media_type="application/x-hdf5", filename=f"{sim_id}.h5")
+
+
+@app.post("/simulations/{sim_id}/compact", dependencies=[Depends(api_key_auth)], tags=['simulations'])
+def compact_simulation(sim_id: str, codec: typing.Literal['zstd', 'gzip'] = 'zstd') -> CompactionReport:
+    """
+    Compresses the particle and emittance files of an existing simulation, e.g. of runs finished before
+    compression was enabled. Reading the simulation afterwards is unchanged.
+    """
+    path = run_path(sim_id)
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Simulation '{sim_id}' not found."
+        )
+
+    return compact_run(path, codec)
+
+
 @app.delete('/simulations/{sim_id}', dependencies=[Depends(api_key_auth)], tags=['simulations'])
 async def delete_simulation(sim_id: str) -> None:
     path = default_filename(f"{SIMULATION_DATA_PATH}/{sim_id}")
     if os.path.exists(path): rmtree(path)
+    if (scratch_path := scratch.scratch_dir(path)) is not None: rmtree(scratch_path, ignore_errors=True)
+    statistics_cache.forget(os.path.abspath(path))
+    if scratch_path is not None: statistics_cache.forget(scratch_path)
+
+
+async def _statistics_results(futures: list[Future], ordered: bool):
+    """
+    Yields the results of statistics futures, in order or as they finish. Futures still pending when the client
+    disconnects are cancelled.
+    """
+    pending = [asyncio.wrap_future(future) for future in futures]
+    try:
+        for result in (pending if ordered else asyncio.as_completed(pending)):
+            yield await result
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+async def _statistics_response(futures: list[Future], request: Request):
+    if accepts_ndjson(request):
+        return NDJSONResponse(_statistics_results(futures, ordered=False))
+
+    return [result async for result in _statistics_results(futures, ordered=True)]
+
+
+@app.post('/simulations/statistics', dependencies=[Depends(api_key_auth)], tags=['simulations'],
+          responses=alternative_responses(NDJSON_MEDIA_TYPE))
+async def statistics(statistics_input: StatisticsInput, request: Request) -> list[StatisticsOutput]:
+    """
+    Returns the statistics of the simulations, computed in parallel by a pool of STATISTICS_WORKERS processes.
+    The statistics of a simulation for which they cannot be calculated hold an error message. With
+    'Accept: application/x-ndjson' every result is streamed as soon as it is finished, in arbitrary order.
+    """
+    return await _statistics_response(await run_in_threadpool(submit_statistics, statistics_input), request)
+
+@app.post('/simulations/statistics/evolution', dependencies=[Depends(api_key_auth)], tags=['simulations'],
+          responses=alternative_responses(NDJSON_MEDIA_TYPE))
+async def statistics_evolution(statistics_input: StatisticsEvolutionInput,
+                               request: Request) -> list[StatisticsEvolution]:
+    """
+    Returns the statistics of every selected checkpoint of the simulations. Slice quantities are given as
+    two-dimensional lists with one row per checkpoint. Simulations are processed in parallel as by
+    POST /simulations/statistics.
+    """
+    return await _statistics_response(await run_in_threadpool(submit_statistics_evolution, statistics_input),
+                                      request)
+
+@app.post('/fieldmaps', dependencies=[Depends(api_key_auth)], tags=['fieldmaps'])
+def upload_field_table(field_table: FieldTable) -> dict:
+    """
+    Registers a field table and returns its ID, which can be passed as field_table_id of cavities and solenoids
+    instead of the table itself. Uploading the same table again returns the same ID.
+    """
+    return {"field_table_id": register_field_table(field_table)}
+
+
+@app.get('/fieldmaps', dependencies=[Depends(api_key_auth)], tags=['fieldmaps'])
+def list_field_table_ids() -> list[str]:
+    return list_field_tables()
+
+
+@app.get('/fieldmaps/cache', dependencies=[Depends(api_key_auth)], tags=['fieldmaps'])
+def get_field_table_cache_status() -> ContentStoreStatus:
+    """
+    Reports size and hit rate of the registry of field tables. Tables which are evicted have to be registered
+    again, runs keep the tables they were started with.
+    """
+    return field_tables.status()
+
+
+@app.get('/fieldmaps/{field_table_id}', dependencies=[Depends(api_key_auth)], tags=['fieldmaps'])
+def download_field_table(field_table_id: str) -> FieldTable:
+    field_table = load_field_table(field_table_id)
+    if field_table is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Field table '{field_table_id}' not found."
+        )
+
+    return field_table
+
+
+@app.post('/jobs', dependencies=[Depends(api_key_auth)], tags=['jobs'], status_code=status.HTTP_202_ACCEPTED)
+def submit_simulation_job(simulation_input: SimulationInput) -> Job:
+    """
+    Queues a simulation and returns immediately. Progress is reported by GET /jobs/{job_id}.
+    """
+    job, _ = jobs.submit(simulation_input)
+
+    return job
+
+
+@app.get('/jobs', dependencies=[Depends(api_key_auth)], tags=['jobs'])
+def list_simulation_jobs(job_status: list[JobStatus] | None = Query(default=None, alias='status')) -> list[Job]:
+    """
+    Lists all jobs in the order of submission, optionally restricted to the given states,
+    e.g. ?status=queued&status=running.
+    """
+    return jobs.list_jobs(job_status)
+
+
+@app.get('/jobs/scheduler', dependencies=[Depends(api_key_auth)], tags=['jobs'])
+def get_scheduler_status() -> SchedulerStatus:
+    """
+    Reports the reservation of CPU cores by running generator and simulation processes, the number of
+    waiting processes and their waiting times.
+    """
+    return scheduler_status()
+
+
+@app.get('/jobs/cache', dependencies=[Depends(api_key_auth)], tags=['jobs'])
+def get_result_cache_status() -> ContentStoreStatus:
+    """
+    Reports size and hit rate of the cache of simulation results, which answers submissions whose input,
+    initial distribution and field tables match a previous simulation.
+    """
+    return result_cache.status()
+
+
+def _job(job_id: str):
+    record = jobs.load_job(job_id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job '{job_id}' not found."
+        )
+
+    return record
+
 
+@app.get('/jobs/{job_id}', dependencies=[Depends(api_key_auth)], tags=['jobs'])
+def get_simulation_job(job_id: str) -> Job:
+    return _job(job_id).job
+
+
+async def _job_events(job_id: str, keep_alive: float = 15.0):
+    with progress.subscription(job_id) as queue:
+        # the job is read after subscribing, so no state change in between is missed
+        job = _job(job_id).job
+        yield 'status', job
+        if (latest := jobs.progress(job_id)) is not None:
+            yield 'progress', latest
+        while job.status in ['queued', 'running']:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), keep_alive)
+            except asyncio.TimeoutError:
+                yield None, None
+                continue
+            if event == 'status':
+                job = data
+            yield event, data
+
+
+@app.post('/jobs/{job_id}/cancel', dependencies=[Depends(api_key_auth)], tags=['jobs'])
+def cancel_simulation_job(job_id: str) -> Job:
+    """
+    Cancels a queued or running job and returns it without waiting. A running ASTRA process is terminated together
+    with all MPI ranks, its cores are released immediately and the job becomes 'cancelled' once ASTRA has exited.
+    Jobs of another API replica are cancelled by that replica within a second. Output written so far is kept.
+    """
+    record = _job(job_id)
+    if record.job.status not in ['queued', 'running']:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job '{job_id}' is {record.job.status}."
+        )
+
+    return jobs.cancel(job_id).job
+
+
+@app.get('/jobs/{job_id}/events', dependencies=[Depends(api_key_auth)], tags=['jobs'],
+         response_class=EventStreamResponse,
+         responses={200: {"content": {EVENT_STREAM_MEDIA_TYPE: {"schema": {"type": "string"}}}}})
+def stream_simulation_job_events(job_id: str) -> EventStreamResponse:
+    """
+    Server-Sent Events of a job: 'status' events carry the job whenever its state changes, 'output' events
+    each line ASTRA writes to stdout and 'progress' events the current z position, step count and estimated
+    remaining time. The stream closes when the job has finished or failed.
+    """
+    _job(job_id)
+
+    return EventStreamResponse(_job_events(job_id))
+
+
+@app.get('/jobs/{job_id}/result', dependencies=[Depends(api_key_auth)], tags=['jobs'],
+         responses=alternative_responses(NPZ_MEDIA_TYPE, NDJSON_MEDIA_TYPE))
+def get_simulation_job_result(job_id: str, request: Request,
+                              selection: ParticleSelection = Depends(particle_selection)) -> SimulationOutput:
+    """
+    Returns the output of a finished job in the same way as GET /simulations/{sim_id}.
+    """
+    record = _job(job_id)
+    if record.job.status != 'finished':
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job '{job_id}' is {record.job.status}." + (f" {record.job.error}" if record.job.error else "")
+        )
 
-@app.post('/simulations/statistics', dependencies=[Depends(api_key_auth)], tags=['simulations'])
-async def statistics(statistics_input: StatisticsInput) -> list[StatisticsOutput]:
-    stats = []
-    for sim_id in statistics_input.sim_ids:
-        particles = read_particle_file(_particle_paths(sim_id)[-1])
-        stats.append(get_statistics(sim_id, statistics_input.n_slices, particles))
-    return stats
\ No newline at end of file
+    return _simulation_response(run_path(record.job.sim_id), record.job.sim_id, request, selection)
@@ -0,0 +1,147 @@
+import orjson
+import numpy as np
+from typing import Any, AsyncIterable, Iterable
+from zipfile import BadZipFile
+from fastapi import Request, HTTPException, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+
+NPZ_MEDIA_TYPE = "application/x-npz"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+BINARY_MEDIA_TYPES = [NPZ_MEDIA_TYPE, "application/octet-stream"]
+
+_MEDIA_TYPE_DESCRIPTIONS = {
+    NPZ_MEDIA_TYPE: f"'Accept: {NPZ_MEDIA_TYPE}' or 'Accept: application/octet-stream' returns little-endian \
+                    NumPy arrays in an .npz archive.",
+    NDJSON_MEDIA_TYPE: f"'Accept: {NDJSON_MEDIA_TYPE}' streams the response as newline delimited JSON objects.",
+}
+
+
+def alternative_responses(*media_types: str) -> dict:
+    """
+    OpenAPI description of response formats which are available besides JSON.
+    """
+    return {
+        200: {
+            "content": {media_type: {"schema": {"type": "string", "format": "binary"}} for media_type in media_types},
+            "description": "Successful Response. " + " ".join(_MEDIA_TYPE_DESCRIPTIONS[m] for m in media_types),
+        }
+    }
+
+
+class NPZResponse(Response):
+    media_type = NPZ_MEDIA_TYPE
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError
+
+
+def _ndjson_line(chunk: Any) -> bytes:
+    return orjson.dumps(chunk, default=_orjson_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    Streams each chunk of the given (async) iterable as one line of JSON. Chunks are serialized only when they
+    are sent, so a lazy iterable keeps a single chunk in memory at a time.
+    """
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(self, chunks: Iterable | AsyncIterable, status_code: int = 200, **kwargs):
+        lines = self._async_lines(chunks) if hasattr(chunks, "__aiter__") else self._lines(chunks)
+        super().__init__(lines, status_code=status_code, media_type=self.media_type, **kwargs)
+
+    @staticmethod
+    def _lines(chunks: Iterable):
+        for chunk in chunks:
+            yield _ndjson_line(chunk)
+
+    @staticmethod
+    async def _async_lines(chunks: AsyncIterable):
+        async for chunk in chunks:
+            yield _ndjson_line(chunk)
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    Server-Sent Events. Chunks are (event, data) tuples, data is sent as JSON. An event None sends a comment,
+    which keeps idle connections open.
+    """
+    media_type = EVENT_STREAM_MEDIA_TYPE
+
+    def __init__(self, events: AsyncIterable, status_code: int = 200, **kwargs):
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        super().__init__(self._events(events), status_code=status_code, media_type=self.media_type, headers=headers,
+                         **kwargs)
+
+    @staticmethod
+    async def _events(events: AsyncIterable):
+        async for event, data in events:
+            if event is None:
+                yield b": keep-alive\n\n"
+            else:
+                yield b"event: " + event.encode() + b"\ndata: " + orjson.dumps(
+                    data, default=_orjson_default, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n\n"
+
+
+def _media_types(header: str) -> list[str]:
+    return [part.split(";")[0].strip().lower() for part in header.split(",")]
+
+
+def accepts_npz(request: Request) -> bool:
+    return any(media_type in BINARY_MEDIA_TYPES for media_type in _media_types(request.headers.get("accept", "")))
+
+
+def accepts_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in _media_types(request.headers.get("accept", ""))
+
+
+def is_npz(request: Request) -> bool:
+    return _media_types(request.headers.get("content-type", ""))[0] in BINARY_MEDIA_TYPES
+
+
+def npz_request_body(model_cls, name: str):
+    """
+    Returns a dependency parsing the request body into model_cls, either from JSON or from an .npz archive
+    depending on the content type of the request. The OpenAPI description of the body has to be given separately.
+    """
+    async def parse(request: Request):
+        content = await request.body()
+        if is_npz(request):
+            try:
+                return model_cls.from_npz(content)
+            except (BadZipFile, ValueError, OSError) as e:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Invalid .npz payload: {e}"
+                )
+            except ValidationError as e:
+                raise RequestValidationError(e.errors())
+        try:
+            return model_cls.model_validate_json(content)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+
+    parse.__name__ = name
+    return parse
+
+
+def npz_request_body_schema(schema_name: str) -> dict:
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"$ref": f"#/components/schemas/{schema_name}"}},
+                NPZ_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            }
+        }
+    }
@@ -0,0 +1,168 @@
+import os
+import shutil
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Condition, Event
+from time import monotonic
+from typing import Iterator
+from pydantic import BaseModel, Field
+from .utils import get_env_var, get_env_flag
+
+_CPUS = sorted(os.sched_getaffinity(0))
+# number of cores shared by all generator and simulation processes
+CORE_BUDGET = min(int(get_env_var("CORE_BUDGET") or len(_CPUS)), len(_CPUS))
+# pins every process to the cores reserved for it
+CPU_PINNING = get_env_flag("CPU_PINNING", default=True) and shutil.which("taskset") is not None
+
+
+class Cancelled(Exception):
+    """
+    Raised if a process is cancelled while waiting for cores or while running.
+    """
+
+
+class Reservation(BaseModel):
+    name: str = Field(
+        description='Name of the process holding the cores.'
+    )
+    cores: list[int] = Field(
+        description='IDs of the reserved CPU cores.'
+    )
+    since: datetime = Field(
+        description='Time of admission.'
+    )
+
+
+class SchedulerStatus(BaseModel):
+    core_budget: int = Field(
+        description='Number of cores shared by all generator and simulation processes.'
+    )
+    reserved_cores: int = Field(
+        description='Number of cores reserved at the moment.'
+    )
+    utilization: float = Field(
+        description='Fraction of the core budget reserved at the moment.'
+    )
+    mean_utilization: float = Field(
+        description='Fraction of the core budget reserved on average since the start of the API.'
+    )
+    waiting: int = Field(
+        description='Number of processes waiting for cores.'
+    )
+    admitted: int = Field(
+        description='Number of processes admitted since the start of the API.'
+    )
+    mean_wait: float = Field(
+        description='Average time processes waited for cores.',
+        json_schema_extra={'format': 'Unit: [s]'}
+    )
+    max_wait: float = Field(
+        description='Longest time a process waited for cores.',
+        json_schema_extra={'format': 'Unit: [s]'}
+    )
+    reservations: list[Reservation] = Field(
+        description='Processes holding cores at the moment.'
+    )
+
+
+_condition = Condition()
+_free = set(_CPUS[:CORE_BUDGET])
+_queue = deque()
+_reservations: dict[int, Reservation] = {}
+_started = monotonic()
+_stats = {"admitted": 0, "total_wait": 0.0, "max_wait": 0.0, "core_seconds": 0.0}
+
+
+@contextmanager
+def reserve(n_cores: int, name: str, cancelled: Event | None = None) -> Iterator[list[int]]:
+    """
+    Blocks until n_cores cores are free and reserves them for the duration of the context. Requests are
+    admitted in the order of arrival. Requests larger than the budget are rejected, as the process would start
+    more MPI ranks than cores are reserved for it.
+
+    :param n_cores: Number of cores, e.g. the number of MPI processes, at most CORE_BUDGET.
+    :param name: Name of the process shown in the scheduler status.
+    :param cancelled: Stops waiting with Cancelled once set and interrupt is called.
+    :return: IDs of the reserved cores.
+    """
+    if n_cores > CORE_BUDGET:
+        raise ValueError(f"{name} requests {n_cores} cores, the core budget is {CORE_BUDGET}.")
+    n_cores = max(1, n_cores)
+    ticket = object()
+    start = monotonic()
+    with _condition:
+        _queue.append(ticket)
+        _condition.wait_for(lambda: (cancelled is not None and cancelled.is_set())
+                            or (_queue[0] is ticket and len(_free) >= n_cores))
+        if cancelled is not None and cancelled.is_set():
+            _queue.remove(ticket)
+            _condition.notify_all()
+            raise Cancelled(f"{name} was cancelled while waiting for cores.")
+        _queue.popleft()
+        cores = sorted(_free)[:n_cores]
+        _free.difference_update(cores)
+        _reservations[id(ticket)] = Reservation(name=name, cores=cores, since=datetime.now())
+        wait = monotonic() - start
+        _stats["admitted"] += 1
+        _stats["total_wait"] += wait
+        _stats["max_wait"] = max(_stats["max_wait"], wait)
+        # the next request in line may fit into the remaining cores
+        _condition.notify_all()
+    admitted = monotonic()
+    try:
+        yield cores
+    finally:
+        with _condition:
+            _free.update(cores)
+            del _reservations[id(ticket)]
+            _stats["core_seconds"] += len(cores) * (monotonic() - admitted)
+            _condition.notify_all()
+
+
+def interrupt() -> None:
+    """
+    Wakes up all waiting requests, such that cancelled ones leave the queue.
+    """
+    with _condition:
+        _condition.notify_all()
+
+
+def pin(command: list[str], cores: list[int]) -> list[str]:
+    """
+    Restricts a command to the given cores. MPI processes started by the command inherit the restriction.
+    """
+    if not CPU_PINNING:
+        return command
+
+    return ["taskset", "--cpu-list", ",".join(map(str, cores))] + command
+
+
+def pinning_env(cores: list[int]) -> dict[str, str]:
+    """
+    Environment variables binding the ranks of Intel MPI, which ignores inherited affinities, to the given cores.
+    """
+    if not CPU_PINNING:
+        return {}
+
+    return {"I_MPI_PIN_PROCESSOR_LIST": ",".join(map(str, cores))}
+
+
+def status() -> SchedulerStatus:
+    with _condition:
+        now = datetime.now()
+        reservations = list(_reservations.values())
+        reserved = sum(len(r.cores) for r in reservations)
+        running = sum(len(r.cores) * (now - r.since).total_seconds() for r in reservations)
+        uptime = monotonic() - _started
+        return SchedulerStatus(
+            core_budget=CORE_BUDGET,
+            reserved_cores=reserved,
+            utilization=reserved / CORE_BUDGET,
+            mean_utilization=min((_stats["core_seconds"] + running) / (CORE_BUDGET * uptime), 1.0),
+            waiting=len(_queue),
+            admitted=_stats["admitted"],
+            mean_wait=_stats["total_wait"] / _stats["admitted"] if _stats["admitted"] > 0 else 0.0,
+            max_wait=_stats["max_wait"],
+            reservations=reservations,
+        )
@@ -0,0 +1,59 @@
+import os
+import logging
+import shutil
+import hashlib
+from astra_web.utils import get_env_var, get_env_flag, SIMULATION_DATA_PATH
+from astra_web.storage.compression import resolve
+from astra_web.storage.content import ContentStore, file_digest
+from .schemas.io import SimulationInput
+from .simulation import astra_binary
+
+logger = logging.getLogger(__name__)
+
+# reuses the results of a previous simulation with identical input
+SIMULATION_CACHE = get_env_flag("SIMULATION_CACHE", default=True)
+result_cache = ContentStore(
+    f"{SIMULATION_DATA_PATH}/.results",
+    max_size=int(get_env_var("SIMULATION_CACHE_SIZE") or 10240) * 2**20,
+    max_age=float(get_env_var("SIMULATION_CACHE_AGE") or 30) * 86400,
+)
+
+
+def input_hash(simulation_input: SimulationInput) -> str:
+    """
+    Canonical hash of everything determining the result of a simulation: the rendered input file, the
+    ASTRA binary, the content of the initial particle distribution and the IDs of the field tables.
+    """
+    hash_ = hashlib.sha256(simulation_input.to_ini().encode())
+    hash_.update(os.path.basename(astra_binary(simulation_input)).encode())
+    distribution = resolve(simulation_input.run_specs.Distribution)
+    if os.path.exists(distribution):
+        file_digest(hash_, distribution)
+    for module in simulation_input.cavities + simulation_input.solenoids:
+        if module.table_id is not None:
+            hash_.update(module.table_id.encode())
+
+    return hash_.hexdigest()
+
+
+def restore_cached_run(key: str, run_dir: str) -> bool:
+    """
+    Fills a new run directory with the result of a previous simulation with the same input hash.
+
+    :return: False if there is no such result or it could not be restored, the run directory is removed then.
+    """
+    try:
+        return result_cache.restore(key, run_dir) is not None
+    except OSError as e:
+        # e.g. the entry was evicted by another process, the simulation is run instead
+        logger.warning("Restoring the cached result of sim %s failed: %s", os.path.basename(run_dir), e)
+        shutil.rmtree(run_dir, ignore_errors=True)
+        return False
+
+
+def cache_run(key: str, run_dir: str) -> None:
+    try:
+        result_cache.store(key, run_dir, sim_id=os.path.basename(run_dir))
+    except OSError as e:
+        # the cache is an optimization only
+        logger.warning("Caching the result of sim %s failed: %s", os.path.basename(run_dir), e)
@@ -0,0 +1,91 @@
+import os
+import glob
+import hashlib
+import numpy as np
+from astra_web.utils import get_env_var, temporary_path, SIMULATION_DATA_PATH
+from astra_web.storage.content import ContentStore
+from .schemas.tables import FieldTable
+
+# field tables shared by all runs, stored once under the hash of their content
+FIELD_TABLE_PATH = f"{SIMULATION_DATA_PATH}/.fieldmaps"
+field_tables = ContentStore(
+    FIELD_TABLE_PATH,
+    max_size=int(get_env_var("FIELDMAP_CACHE_SIZE") or 1024) * 2**20,
+    max_age=float(get_env_var("FIELDMAP_CACHE_AGE") or 365) * 86400,
+)
+# name of the table in ASTRA format within its entry
+_TABLE_FILE = "table.dat"
+
+
+def field_table_path(table_id: str) -> str:
+    return f"{FIELD_TABLE_PATH}/{table_id}/{_TABLE_FILE}"
+
+
+def field_table_exists(table_id: str) -> bool:
+    """
+    True if a table is registered and not expired. Counts as use of the table.
+    """
+    return table_id.isalnum() and field_tables.lookup(table_id) is not None
+
+
+def field_table_id(table: FieldTable) -> str:
+    """
+    ID of a field table in the registry, the hash of its content in ASTRA format, whether it is registered or not.
+    """
+    return hashlib.sha256(table.to_text().encode()).hexdigest()
+
+
+def register_field_table(table: FieldTable) -> str:
+    """
+    Stores a field table in ASTRA format unless an identical table is stored already.
+
+    :return: ID of the table, the hash of the file content.
+    """
+    content = table.to_text()
+    table_id = hashlib.sha256(content.encode()).hexdigest()
+    if field_tables.lookup(table_id) is None:
+        os.makedirs(FIELD_TABLE_PATH, exist_ok=True)
+        tmp_path = temporary_path(f"{FIELD_TABLE_PATH}/.{table_id}.dat")
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(content)
+            field_tables.store(table_id, {_TABLE_FILE: tmp_path})
+        finally:
+            os.remove(tmp_path)
+
+    return table_id
+
+
+def register(*modules) -> None:
+    """
+    Moves the field tables given inline with cavities or solenoids to the registry, such that the modules reference
+    them by field_table_id. Runs before an input is written to disk, hashed or split into segments.
+    """
+    for module in modules:
+        if module.field_table_id is None and module.field_table is not None:
+            module.field_table_id, module.field_table = register_field_table(module.field_table), None
+
+
+def load_field_table(table_id: str) -> FieldTable | None:
+    if not field_table_exists(table_id):
+        return None
+    data = np.loadtxt(field_table_path(table_id), ndmin=2)
+
+    return FieldTable(z=data[:, 0].tolist(), v=data[:, 1].tolist())
+
+
+def list_field_tables() -> list[str]:
+    return sorted(os.path.basename(os.path.dirname(path)) for path in glob.glob(field_table_path("*")))
+
+
+def link_field_table(table_id: str, path: str) -> None:
+    """
+    Makes a registered field table available to a run under the file name expected by its input. The run holds
+    a hard link, so evicting the table from the registry does not affect it.
+
+    :raises FileNotFoundError: If the table was evicted in the meantime.
+    """
+    if os.path.lexists(path):
+        os.remove(path)
+    if field_tables.restore(table_id, os.path.dirname(path), {os.path.basename(path): _TABLE_FILE}) is None:
+        raise FileNotFoundError(f"Field table '{table_id}' not found.")
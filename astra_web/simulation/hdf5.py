@@ -0,0 +1,136 @@
+import os
+import h5py
+import numpy as np
+from pmd_beamphysics import ParticleGroup
+from pmd_beamphysics.readers import component_from_alias
+from pmd_beamphysics.tools import fstr
+from pmd_beamphysics.units import pg_units
+from pmd_beamphysics.writers import pmd_init
+from astra_web.utils import temporary_path
+from astra_web.generator.schemas.particles import Particles, ParticleSelection, SelectedParticles
+from .schemas.tables import XYEmittanceTable, ZEmittanceTable
+
+HDF5_FILE_NAME = "run.h5"
+TEXT_FILES = ["run.in", "run.out", "input.json"]
+EMITTANCE_KEYS = ["emittance_x", "emittance_y", "emittance_z"]
+_COMPRESSION = {"compression": "gzip", "compression_opts": 4, "shuffle": True}
+
+# Layout of the file, following openPMD 2.0 with the BeamPhysics extension:
+#   /data/{i}/particles/electron/...  openPMD particle records of the i-th checkpoint as in Particles.to_pmd
+#   /data/{i}/astra/{column}          original ASTRA columns of the i-th checkpoint, attribute 'name' holds
+#                                     the name of the original file, e.g. 'run.0100.001'
+#   /astra/emittance_{x,y,z}/{column} emittance tables
+#   /astra/files/{name}               run.in, run.out and input.json
+
+
+def hdf5_path(run_dir: str) -> str:
+    return f"{run_dir}/{HDF5_FILE_NAME}"
+
+
+def _write_dataset(group: h5py.Group, name: str, data: np.ndarray) -> h5py.Dataset:
+    if data.size == 0:
+        return group.create_dataset(name, data=data)
+    return group.create_dataset(name, data=data, chunks=True, **_COMPRESSION)
+
+
+def _write_bunch(group: h5py.Group, particle_group: ParticleGroup) -> None:
+    # compressed variant of pmd_beamphysics.writers.write_pmd_bunch
+    group.attrs["speciesType"] = fstr(particle_group["species"])
+    group.attrs["numParticles"] = particle_group["n_particle"]
+    group.attrs["totalCharge"] = particle_group["charge"]
+    group.attrs["chargeUnitSI"] = 1.0
+
+    for key in ["x", "px", "y", "py", "z", "pz", "t", "status", "weight"]:
+        data = particle_group[key]
+        if np.all(data == data.flat[0]):
+            record = group.create_group(component_from_alias[key])
+            record.attrs["value"] = data.flat[0]
+            record.attrs["shape"] = data.shape
+        else:
+            record = _write_dataset(group, component_from_alias[key], data)
+        unit = pg_units(key)
+        record.attrs["unitSI"] = unit.unitSI
+        record.attrs["unitDimension"] = unit.unitDimension
+        record.attrs["unitSymbol"] = fstr(unit.unitSymbol)
+
+
+def write_run_hdf5(run_dir: str, particle_files: list[str], tables: list) -> str:
+    """
+    Writes particle checkpoints, emittance tables and text files of a simulation run into a single
+    compressed HDF5 file in the run directory.
+
+    :param run_dir: Run directory.
+    :param particle_files: Paths of the particle checkpoints in the order of the simulation.
+    :param tables: Emittance tables in x, y and z, entries may be None.
+    :return: Path of the HDF5 file.
+    """
+    path = hdf5_path(run_dir)
+    tmp_path = temporary_path(path)
+    with h5py.File(tmp_path, "w") as h5:
+        pmd_init(h5, basePath="/data/%T/", particlesPath="particles/")
+        h5.attrs["software"] = fstr("astra-web")
+
+        for idx, file_path in enumerate(particle_files):
+            particles = Particles.from_csv(file_path, cached=True)
+            iteration = h5.create_group(f"data/{idx}")
+            iteration.attrs["time"] = particles.t_clock[0] * 1e-9 if particles.t_clock.size > 0 else 0.0
+            iteration.attrs["dt"] = 0.0
+            iteration.attrs["timeUnitSI"] = 1.0
+            columns = iteration.create_group("astra")
+            columns.attrs["name"] = os.path.basename(file_path)
+            for key, column in particles.columns().items():
+                _write_dataset(columns, key, column)
+            if particles.x.size > 0:
+                _write_bunch(iteration.create_group("particles/electron"), particles.to_pmd())
+
+        for key, table in zip(EMITTANCE_KEYS, tables):
+            if table is not None:
+                group = h5.create_group(f"astra/{key}")
+                for column_key, column in table.columns().items():
+                    _write_dataset(group, column_key, column)
+
+        for name in TEXT_FILES:
+            if os.path.exists(f"{run_dir}/{name}"):
+                with open(f"{run_dir}/{name}", "r") as f:
+                    h5[f"astra/files/{name}"] = f.read()
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def _iterations(h5: h5py.File) -> dict[str, h5py.Group]:
+    if "data" not in h5:
+        return {}
+    iterations = sorted(h5["data"].values(), key=lambda group: int(group.name.split("/")[-1]))
+    return {group["astra"].attrs["name"]: group for group in iterations}
+
+
+def hdf5_checkpoints(run_dir: str) -> list[str]:
+    with h5py.File(hdf5_path(run_dir), "r") as h5:
+        return list(_iterations(h5))
+
+
+def read_hdf5_particles(run_dir: str, name: str, selection: ParticleSelection | None = None) -> Particles:
+    """
+    Reads the checkpoint with the given file name. Only the datasets needed for the selection are read.
+    """
+    with h5py.File(hdf5_path(run_dir), "r") as h5:
+        columns = _iterations(h5)[name]["astra"]
+        if selection is None:
+            return Particles(**{key: dataset[()] for key, dataset in columns.items()})
+        return SelectedParticles(**selection.select(columns))
+
+
+def read_hdf5_reference_z(run_dir: str, name: str) -> float:
+    with h5py.File(hdf5_path(run_dir), "r") as h5:
+        return float(_iterations(h5)[name]["astra/z"][0])
+
+
+def read_hdf5_tables(run_dir: str) -> list[XYEmittanceTable | ZEmittanceTable | None]:
+    tables = []
+    with h5py.File(hdf5_path(run_dir), "r") as h5:
+        for key, model_cls in zip(EMITTANCE_KEYS, [XYEmittanceTable, XYEmittanceTable, ZEmittanceTable]):
+            group = h5.get(f"astra/{key}")
+            tables.append(None if group is None else model_cls(**{k: v[()] for k, v in group.items()}))
+
+    return tables
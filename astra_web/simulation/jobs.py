@@ -0,0 +1,409 @@
+import os
+import logging
+import glob
+import json
+import socket
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from threading import Event, Lock, Thread
+from shortuuid import uuid
+from astra_web.utils import get_env_var, temporary_path, SIMULATION_DATA_PATH
+from astra_web.scheduler import CORE_BUDGET, Cancelled, interrupt
+from .schemas.io import SimulationInput
+from .schemas.jobs import Job, JobRecord, JobStatus, RunProgress, SimulationProcess
+from .simulation import simulation_process, run_simulation_process, terminate_run
+from .progress import ProgressTracker, publish
+from .cache import SIMULATION_CACHE, input_hash, restore_cached_run, cache_run
+from .segments import plan_segments, restore_segment, complete_segments
+from .summary import SIMULATION_SUMMARY, submit_summary
+from .fieldmaps import register
+from .scratch import recover_run, scratch_runs
+
+logger = logging.getLogger(__name__)
+
+# number of jobs waiting for cores or running at the same time, further jobs are queued
+SIMULATION_WORKERS = int(get_env_var("SIMULATION_WORKERS") or CORE_BUDGET)
+JOBS_PATH = f"{SIMULATION_DATA_PATH}/.jobs"
+# interval in which cancellations of jobs by other processes sharing JOBS_PATH are looked for
+CANCEL_POLL_INTERVAL = 1.0
+
+_executor = ThreadPoolExecutor(max_workers=SIMULATION_WORKERS, thread_name_prefix="simulation")
+_futures: dict[str, Future] = {}
+_cancel_events: dict[str, Event] = {}
+_progress: dict[str, RunProgress] = {}
+_lock = Lock()
+_stopped = Event()
+_watcher: Thread | None = None
+
+
+def _job_path(job_id: str) -> str:
+    return f"{JOBS_PATH}/{job_id}.json"
+
+
+def _owner_path(job_id: str) -> str:
+    return f"{JOBS_PATH}/{job_id}.owner"
+
+
+def _cancel_path(job_id: str) -> str:
+    return f"{JOBS_PATH}/{job_id}.cancel"
+
+
+def _claim(job_id: str) -> bool:
+    """
+    Creates the owner file of a job, which holds host name and PID of this process and a unique token.
+    Creation is exclusive, so of several API processes sharing JOBS_PATH exactly one executes a job.
+
+    :return: False if the job is owned by another process.
+    """
+    os.makedirs(JOBS_PATH, exist_ok=True)
+    try:
+        fd = os.open(_owner_path(job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        json.dump({"hostname": socket.gethostname(), "pid": os.getpid(), "token": uuid()}, f)
+
+    return True
+
+
+def _read_owner(path: str) -> dict | None:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # also an owner file which is just being written
+        return None
+
+
+def _orphaned(owner: dict) -> bool:
+    """
+    True if the process owning a job verifiably no longer exists. This can only be decided for processes on
+    this host: the owner is gone if its PID is not alive or is the PID of this process, whose own jobs are known.
+    """
+    if owner.get("hostname") != socket.gethostname():
+        return False
+    if owner.get("pid") == os.getpid():
+        return True
+    try:
+        os.kill(owner["pid"], 0)
+    except ProcessLookupError:
+        return True
+    except (OSError, KeyError, TypeError):
+        return False
+
+    return False
+
+
+def _take_over(job_id: str) -> bool:
+    """
+    Claims a job without owner or whose owner is orphaned.
+
+    :return: False if the job is owned by a live or unknown process, or another process took it over first.
+    """
+    if _claim(job_id):
+        return True
+    path = _owner_path(job_id)
+    owner = _read_owner(path)
+    if owner is None or not _orphaned(owner):
+        return False
+    # only one process succeeds in moving the owner file aside
+    stale_path = f"{path}.{uuid()}.stale"
+    try:
+        os.rename(path, stale_path)
+    except FileNotFoundError:
+        return False
+    if _read_owner(stale_path) != owner:
+        # moved the claim of a process which took over in the meantime, it is put back
+        try:
+            os.link(stale_path, path)
+        except FileExistsError:
+            pass
+        os.remove(stale_path)
+        return False
+    os.remove(stale_path)
+
+    return _claim(job_id)
+
+
+def _release(job_id: str) -> None:
+    for path in [_cancel_path(job_id), _owner_path(job_id)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _save(record: JobRecord) -> None:
+    os.makedirs(JOBS_PATH, exist_ok=True)
+    path = _job_path(record.job.job_id)
+    tmp_path = temporary_path(path)
+    with open(tmp_path, "w") as f:
+        f.write(record.model_dump_json())
+    os.replace(tmp_path, path)
+    publish(record.job.job_id, 'status', record.job.model_copy())
+
+
+def load_job(job_id: str) -> JobRecord | None:
+    path = _job_path(job_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return JobRecord.model_validate_json(f.read())
+
+
+def _records() -> list[JobRecord]:
+    records = []
+    for path in glob.glob(f"{JOBS_PATH}/*.json"):
+        with open(path, "r") as f:
+            records.append(JobRecord.model_validate_json(f.read()))
+
+    return sorted(records, key=lambda record: record.job.submitted)
+
+
+def list_jobs(statuses: list[JobStatus] | None = None) -> list[Job]:
+    return [record.job for record in _records() if statuses is None or record.job.status in statuses]
+
+
+def progress(job_id: str) -> RunProgress | None:
+    """
+    Latest progress of a running job.
+    """
+    return _progress.get(job_id)
+
+
+def _output_handler(job_id: str, tracker: ProgressTracker):
+    def handle(line: str) -> None:
+        publish(job_id, 'output', line.rstrip("\n"))
+        if (update := tracker.update(line)) is not None:
+            _progress[job_id] = update
+            publish(job_id, 'progress', update)
+
+    return handle
+
+
+def _start_handler(record: JobRecord):
+    def handle(cores: list[int]) -> None:
+        record.job.status, record.job.started, record.job.cores = 'running', datetime.now(), cores
+        _save(record)
+
+    return handle
+
+
+def _summarize(run_dir: str) -> None:
+    if SIMULATION_SUMMARY == "none":
+        return
+    try:
+        # the summary is computed in the background, the job finishes right away
+        submit_summary(run_dir)
+    except RuntimeError as e:
+        # the pool does not take new work while the API shuts down
+        logger.warning("Summarizing sim %s failed: %s", os.path.basename(run_dir), e)
+
+
+def _post_process(process: SimulationProcess) -> None:
+    """
+    Runs once the results of a run are stored in the run directory.
+    """
+    if process.cache_key is not None:
+        cache_run(process.cache_key, process.run_dir)
+    _summarize(process.run_dir)
+
+
+def _execute(job_id: str) -> str:
+    record = load_job(job_id)
+    persisted = Event()
+
+    def on_persisted() -> None:
+        _post_process(record.process)
+        with _lock:
+            persisted.set()
+            executed = job_id not in _futures
+        if executed: _release(job_id)
+
+    try:
+        on_exit = None
+        if len(record.process.segments) > 0:
+            on_exit = lambda work_dir: complete_segments(record.process, work_dir)
+        output = run_simulation_process(record.process, _output_handler(job_id, ProgressTracker(record.process)),
+                                        _start_handler(record), on_exit, on_persisted, _cancel_events[job_id])
+    except Cancelled:
+        record.job.status = 'cancelled'
+        raise
+    except Exception as e:
+        record.job.status, record.job.error = 'failed', f"{type(e).__name__}: {e}"
+        raise
+    else:
+        record.job.status = 'finished'
+    finally:
+        record.job.finished = datetime.now()
+        _save(record)
+        with _lock:
+            _futures.pop(job_id, None)
+            _cancel_events.pop(job_id, None)
+            # finished jobs keep their owner until their results are persisted, see recover_scratch
+            persisting = record.job.status == 'finished' and not persisted.is_set()
+        _progress.pop(job_id, None)
+        if not persisting: _release(job_id)
+
+    return output
+
+
+def _watch_cancellations() -> None:
+    while not _stopped.wait(CANCEL_POLL_INTERVAL):
+        with _lock:
+            job_ids = [job_id for job_id, cancelled in _cancel_events.items() if not cancelled.is_set()]
+        for job_id in job_ids:
+            if os.path.exists(_cancel_path(job_id)):
+                _cancel_local(job_id)
+
+
+def _enqueue(job_id: str) -> Future:
+    global _watcher
+    with _lock:
+        _cancel_events[job_id] = Event()
+        future = _futures[job_id] = _executor.submit(_execute, job_id)
+        if _watcher is None:
+            _watcher = Thread(target=_watch_cancellations, name="cancellations", daemon=True)
+            _watcher.start()
+
+    return future
+
+
+def _cancel_local(job_id: str) -> bool:
+    """
+    Cancels a job executed by this process.
+
+    :return: False if the job is not executed by this process.
+    """
+    with _lock:
+        future, cancelled = _futures.get(job_id), _cancel_events.get(job_id)
+    if future is None:
+        return False
+    if future.cancel():
+        # the job never started, so _execute does not report it
+        record = load_job(job_id)
+        record.job.status, record.job.finished = 'cancelled', datetime.now()
+        _save(record)
+        with _lock:
+            _futures.pop(job_id, None)
+            _cancel_events.pop(job_id, None)
+        _release(job_id)
+    elif not cancelled.is_set():
+        cancelled.set()
+        interrupt()
+        # the process group gets TERMINATION_GRACE_PERIOD seconds to exit, which is not waited for here
+        Thread(target=terminate_run, args=(load_job(job_id).process.run_dir,), daemon=True).start()
+
+    return True
+
+
+def cancel(job_id: str) -> JobRecord | None:
+    """
+    Cancels a queued or running job without waiting for it. Waiting jobs leave the queue, running ones are
+    terminated together with all their MPI ranks, such that their cores are free right away, and report the state
+    'cancelled' once ASTRA has exited. Jobs owned by another process sharing JOBS_PATH are cancelled by their owner,
+    which polls for cancellations every CANCEL_POLL_INTERVAL seconds. Jobs in a final state are left unchanged.
+    """
+    record = load_job(job_id)
+    if record is None or record.job.status not in ['queued', 'running']:
+        return record
+    if not _cancel_local(job_id):
+        with open(_cancel_path(job_id), "w"):
+            pass
+
+    return load_job(job_id)
+
+
+def submit(simulation_input: SimulationInput) -> tuple[Job, Future]:
+    """
+    Writes the input files of a simulation and queues its run in the worker pool.
+
+    :return: The queued job and a future resolving to the terminal output of ASTRA.
+    """
+    job = Job(job_id=simulation_input.sim_id, sim_id=os.path.basename(simulation_input.run_dir))
+    register(*simulation_input.cavities, *simulation_input.solenoids)
+    process = simulation_process(simulation_input)
+    if simulation_input.run_specs.segmented:
+        plan_segments(simulation_input, process)
+    if SIMULATION_CACHE and not os.path.exists(process.run_dir):
+        process.cache_key = input_hash(simulation_input)
+        if restore_cached_run(process.cache_key, process.run_dir):
+            job.status, job.cached = 'finished', True
+            job.started = job.finished = datetime.now()
+            _save(JobRecord(job=job, process=process))
+            # the restored summary belongs to the run the result was cached from
+            _summarize(process.run_dir)
+            future = Future()
+            with open(f"{process.run_dir}/run.out", "r") as f:
+                future.set_result(f.read())
+            return job, future
+
+    simulation_input.write_to_disk()
+    if len(process.segments) > 0:
+        restore_segment(simulation_input, process)
+    # job IDs are unique, the claim only marks this process as owner
+    _claim(job.job_id)
+    _save(JobRecord(job=job, process=process))
+
+    return job, _enqueue(job.job_id)
+
+
+def recover_scratch() -> list[str]:
+    """
+    Persists runs left in the scratch directory by API processes which stopped. Only runs whose latest job has no
+    owner or a verifiably orphaned one are recovered, runs of other API processes sharing the scratch directory
+    are left to them.
+
+    :return: Names of the recovered run directories.
+    """
+    # the latest job of every run directory
+    job_ids = {record.job.sim_id: record.job.job_id for record in _records()}
+    sim_ids = []
+    for sim_id in scratch_runs():
+        job_id = job_ids.get(sim_id)
+        if job_id is None or job_id in _futures or not _take_over(job_id):
+            continue
+        try:
+            if recover_run(sim_id): sim_ids.append(sim_id)
+        finally:
+            # pending cancellations are left to restore_jobs
+            try:
+                os.remove(_owner_path(job_id))
+            except FileNotFoundError:
+                pass
+
+    return sim_ids
+
+
+def restore_jobs() -> list[Job]:
+    """
+    Queues jobs again which were queued or running when their process stopped. Only jobs owned by this process or
+    whose owner is verifiably gone are taken over, jobs of other API processes sharing JOBS_PATH are left to them.
+    Interrupted runs start from scratch, jobs cancelled in the meantime are marked as such.
+    """
+    jobs = []
+    for record in _records():
+        job_id = record.job.job_id
+        if record.job.status not in ['queued', 'running'] or job_id in _futures or not _take_over(job_id):
+            continue
+        # the previous owner may have finished the job before releasing it
+        record = load_job(job_id)
+        if record is None or record.job.status not in ['queued', 'running']:
+            _release(job_id)
+            continue
+        if os.path.exists(_cancel_path(job_id)):
+            record.job.status, record.job.finished = 'cancelled', datetime.now()
+            _save(record)
+            _release(job_id)
+            continue
+        record.job.status, record.job.started, record.job.cores = 'queued', None, None
+        _save(record)
+        _enqueue(job_id)
+        jobs.append(record.job)
+
+    return jobs
+
+
+def shutdown() -> None:
+    _stopped.set()
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,108 @@
+import re
+import time
+import asyncio
+from threading import Lock
+from contextlib import contextmanager
+from typing import Iterator
+from .schemas.jobs import RunProgress, SimulationProcess
+
+# ASTRA reports the bunch position as e.g. 'z = 0.2500 m' and time steps as e.g. 'step 1200' or 'Nstep = 1200'
+_NUMBER = r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eEdD][-+]?\d+)?)"
+_Z_PATTERN = re.compile(rf"\bz\s*[=:]\s*{_NUMBER}", re.IGNORECASE)
+_STEP_PATTERN = re.compile(r"\bn?steps?\s*[=:]?\s*(\d+)", re.IGNORECASE)
+# positions are compared with the precision ASTRA prints them with
+_Z_TOLERANCE = 1e-4
+
+
+def _float(value: str) -> float:
+    # Fortran double precision exponents
+    return float(value.replace("D", "E").replace("d", "e"))
+
+
+class ProgressTracker:
+    """
+    Derives the progress of a run from the lines ASTRA writes to stdout.
+    """
+    def __init__(self, process: SimulationProcess):
+        self.z_start = process.z_start
+        self.z_stop = process.z_stop
+        self.start = time.monotonic()
+        self.progress = RunProgress()
+        # last position behind the bunch, e.g. of an element printed in between
+        self.behind = None
+
+    def _position(self, z: float) -> float | None:
+        """
+        Position of the bunch given by a reported z, None if z cannot be one. Positions outside the tracked interval
+        and single positions behind the bunch, e.g. of elements, are ignored. Positions increasing from behind the
+        bunch replace the current one, which was the position of an element listed in the setup then.
+        """
+        if z < self.z_start - _Z_TOLERANCE or (self.z_stop is not None and z > self.z_stop + _Z_TOLERANCE):
+            return None
+        current, behind = self.progress.z, self.behind
+        self.behind = None
+        if current is None or z >= current:
+            return z
+        if behind is not None and z > behind:
+            return z
+        self.behind = z
+        return None
+
+    def update(self, line: str) -> RunProgress | None:
+        """
+        Parses a line of output and returns the updated progress, or None if the line holds no progress information.
+        """
+        z_match, step_match = _Z_PATTERN.search(line), _STEP_PATTERN.search(line)
+        z = None if z_match is None else self._position(_float(z_match.group(1)))
+        step = None if step_match is None else int(step_match.group(1))
+        if step is not None and self.progress.step is not None and step < self.progress.step:
+            step = None
+        if z is None and step is None:
+            return None
+
+        progress = self.progress.model_copy()
+        progress.elapsed = time.monotonic() - self.start
+        if step is not None:
+            progress.step = step
+        if z is not None:
+            progress.z = z
+        if progress.z is not None and self.z_stop is not None and self.z_stop > self.z_start:
+            progress.fraction = min(max((progress.z - self.z_start) / (self.z_stop - self.z_start), 0.0), 1.0)
+            if progress.fraction > 0:
+                progress.eta = progress.elapsed * (1 - progress.fraction) / progress.fraction
+        self.progress = progress
+
+        return progress
+
+
+_subscribers: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_lock = Lock()
+
+
+def publish(channel: str, event: str, data) -> None:
+    """
+    Sends an event to all subscribers of a channel. Safe to call from worker threads.
+    """
+    with _lock:
+        subscribers = list(_subscribers.get(channel, []))
+    for loop, queue in subscribers:
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+
+@contextmanager
+def subscription(channel: str) -> Iterator[asyncio.Queue]:
+    """
+    Returns a queue receiving the events published to a channel as (event, data) tuples while the context is open.
+    Has to be entered from within the event loop.
+    """
+    queue = asyncio.Queue()
+    subscriber = (asyncio.get_running_loop(), queue)
+    with _lock:
+        _subscribers.setdefault(channel, []).append(subscriber)
+    try:
+        yield queue
+    finally:
+        with _lock:
+            _subscribers[channel].remove(subscriber)
+            if len(_subscribers[channel]) == 0:
+                del _subscribers[channel]
@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import Future
+from typing import AsyncIterator
+from fastapi.concurrency import run_in_threadpool
+from .schemas.scan import ScanInput, ScanPoint
+from .statistics import submit_simulation_statistics
+from . import jobs
+
+
+def submit_scan(scan: ScanInput) -> list[tuple[ScanPoint, Future]]:
+    """
+    Expands a scan and submits one job per point. The jobs share the worker pool and core budget with all
+    other simulations.
+    """
+    points = []
+    for idx, (parameters, member) in enumerate(scan.members()):
+        job, future = jobs.submit(member)
+        points.append((ScanPoint(index=idx, sim_id=job.sim_id, parameters=parameters), future))
+
+    return points
+
+
+async def _point_statistics(point: ScanPoint, n_slices: int) -> ScanPoint:
+    # computed by the statistics workers like POST /simulations/statistics, which reuses them from the cache
+    future = await run_in_threadpool(submit_simulation_statistics, point.sim_id, n_slices)
+    statistics = await asyncio.wrap_future(future)
+
+    return point.model_copy(update={"statistics": statistics, "error": statistics.error})
+
+
+async def iter_scan_results(points: list[tuple[ScanPoint, Future]], n_slices: int) -> AsyncIterator[ScanPoint]:
+    """
+    Yields the points of a scan with their statistics in the order the simulations finish.
+    """
+    pending = {asyncio.wrap_future(future): point for point, future in points}
+    try:
+        while len(pending) > 0:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                point = pending.pop(task)
+                if task.cancelled():
+                    yield point.model_copy(update={"error": "Simulation was cancelled."})
+                    continue
+                if task.exception() is not None:
+                    yield point.model_copy(update={"error": f"{type(task.exception()).__name__}: {task.exception()}"})
+                    continue
+                try:
+                    yield await _point_statistics(point, n_slices)
+                except Exception as e:
+                    yield point.model_copy(update={"error": f"{type(e).__name__}: {e}"})
+    finally:
+        # the client stopped reading, the remaining points are of no use
+        for point in pending.values():
+            await run_in_threadpool(jobs.cancel, point.sim_id)
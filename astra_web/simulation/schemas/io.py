@@ -4,11 +4,12 @@ import numpy as np
 from datetime import datetime
 from email.policy import default
 from shortuuid import uuid
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, SerializeAsAny, computed_field, model_validator
 from astra_web.decorators.decorators import ini_exportable
 from astra_web.utils import SIMULATION_DATA_PATH
 from astra_web.generator.schemas.particles import Particles
+from astra_web.generator.schemas.columns import FloatArray, write_npz, read_npz
 from .run import SimulationRunSpecifications
 from .modules import Solenoid, Cavity, Quadrupole
 from .space_charge import SpaceCharge
@@ -70,9 +71,16 @@ class SimulationOutputSpecification(BaseModel):
         validation_alias='generate_complete_particle_output',
         description='If true, the complete particle distribution is saved at z_phase different locations.'
     )
+    screens: list[float] = Field(
+        default=[],
+        exclude=True,
+        description='Longitudinal positions at which the complete particle distribution is saved in addition.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
 
     def to_ini(self) -> str:
-        return "&OUTPUT" + self._to_ini() + "/"
+        screens = "".join(f"    Screen({idx}) = {z}\n" for idx, z in enumerate(sorted(self.screens), start=1))
+        return "&OUTPUT" + self._to_ini() + screens + "/"
 
 
 @ini_exportable
@@ -123,10 +131,18 @@ class SimulationInput(BaseModel):
         for idx, element in enumerate(getattr(self, attribute_key), start=1):
             element.id = idx
 
-    def model_post_init(self, __context) -> None:
+    def reset_ids(self) -> None:
+        """
+        Assigns a new sim_id and numbers the elements in the order of their positions, e.g. for a modified copy
+        of an input.
+        """
         self._sim_id = f"{datetime.now().strftime('%Y-%m-%d')}-{uuid()[:8]}"
-        os.mkdir(self.run_dir)
         any(self.sort_and_set_ids(s) for s in ['cavities', 'solenoids', 'quadrupoles'])
+
+    def model_post_init(self, __context) -> None:
+        self.reset_ids()
+
+    def write_input_json(self) -> None:
         with open(f"{self.run_dir}/input.json", "w") as f:
             data = {
                 "solenoid_strength": self.solenoids[0].MaxB,
@@ -161,6 +177,7 @@ class SimulationInput(BaseModel):
 
     def write_to_disk(self) -> str:
         if not os.path.exists(self.run_dir): os.mkdir(self.run_dir)
+        self.write_input_json()
         ini_string = self.to_ini()
         with open(self.input_filename, "w") as input_file:
             input_file.write(ini_string)
@@ -174,7 +191,8 @@ class SimulationOutput(BaseModel):
     sim_id: str
     input_ini: str
     run_output: str
-    particles: Optional[list[Particles]] = Field(
+    # particles read with a selection keep the attributes left out as null
+    particles: Optional[list[SerializeAsAny[Particles]]] = Field(
         default=[Particles()]
     )
     emittance_x: Optional[XYEmittanceTable] = Field(
@@ -187,12 +205,57 @@ class SimulationOutput(BaseModel):
         default=None
     )
 
+    def to_npz(self) -> bytes:
+        """
+        Flattens the output into a single .npz archive. Text fields are stored as string arrays, table and
+        particle columns under the keys 'emittance_x/mean', 'particles/0/x' etc.
+        """
+        arrays = {key: np.array(getattr(self, key)) for key in ['sim_id', 'input_ini', 'run_output']}
+        for key in ['emittance_x', 'emittance_y', 'emittance_z']:
+            table = getattr(self, key)
+            if table is not None:
+                arrays.update({f"{key}/{column}": value for column, value in table.columns().items()})
+        for idx, particles in enumerate(self.particles or []):
+            if particles is not None:
+                arrays.update({f"particles/{idx}/{column}": value for column, value in particles.columns().items()})
+
+        return write_npz(arrays)
+
+    @classmethod
+    def from_npz(cls, content: bytes):
+        data = {}
+        for key, value in read_npz(content).items():
+            target = data
+            *parents, name = key.split("/")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[name] = value.item() if value.ndim == 0 else value
+        particles = data.pop('particles', {})
+        data['particles'] = [particles[idx] for idx in sorted(particles, key=int)]
+
+        return cls(**data)
+
 
 class StatisticsInput(BaseModel):
     sim_ids: list[str]
-    z_pos: int = Field(
-        default=-1,
-        description='Longitudinal position at which statistics will be calculated.'
+    z_pos: float | None = Field(
+        default=None,
+        description='Longitudinal position at which statistics will be calculated. They are interpolated linearly \
+                     between the two checkpoints enclosing z_pos. The last checkpoint is used if not given.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    n_slices: int = Field(
+        default=20,
+        description='Number of slices to be used for slice emittance calculation.'
+    )
+
+
+class StatisticsEvolutionInput(BaseModel):
+    sim_ids: list[str]
+    checkpoints: list[int] | None = Field(
+        default=None,
+        description='Indices of the checkpoints at which statistics will be calculated, negative indices count from \
+                     the last checkpoint. All checkpoints are used if not given.'
     )
     n_slices: int = Field(
         default=20,
@@ -203,6 +266,7 @@ class StatisticsInput(BaseModel):
 class StatisticsOutput(BaseModel):
     sim_id: str
     particle_counts: dict = Field(
+        default={},
         description='Number of particles - active, inactive, total.'
     )
     z_pos: float = Field(
@@ -241,3 +305,200 @@ class StatisticsOutput(BaseModel):
         default=[],
         description='Bunch twiss parameters.'
     )
+    error: Optional[str] = Field(
+        default=None,
+        description='Error message if the statistics could not be calculated, completely or in part.'
+    )
+
+
+class StatisticsEvolution(BaseModel):
+    sim_id: str
+    checkpoints: list[str] = Field(
+        default=[],
+        description='File names of the checkpoints. All other lists hold one entry per checkpoint in this order.'
+    )
+    particle_counts: list[dict] = Field(
+        default=[],
+        description='Number of particles - active, inactive, total.'
+    )
+    z_pos: list[float] = Field(
+        default=[],
+        description='Longitudinal position at which statistics were calculated.'
+    )
+    ptp_z: list[float] = Field(
+        default=[],
+        description='Bunch length in [mm].'
+    )
+    inputs: dict = Field(
+        default={},
+        description='Dictionary holding initial inputs to the simulation.'
+    )
+    slice_zs: list[list[float]] = Field(
+        default=[],
+        description='Slice positions.'
+    )
+    slice_emittances: list[list[float]] = Field(
+        default=[],
+        description="Slice emittances at slice positions."
+    )
+    slice_densities: list[list[float]] = Field(
+        default=[],
+        description='Slice densities at slice positions.'
+    )
+    slice_mismatch: list[list[float]] = Field(
+        default=[],
+        description='Slice twiss mismatch parameters at slice positions.'
+    )
+    slice_twiss: list = Field(
+        default=[],
+        description='Slice twiss parameters at in x-y planes.'
+    )
+    bunch_twiss: list[list[float]] = Field(
+        default=[],
+        description='Bunch twiss parameters.'
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description='Error message if the statistics could not be calculated, completely or in part.'
+    )
+
+
+class Extremum(BaseModel):
+    min: float = Field(
+        description='Smallest value along the beamline.'
+    )
+    z_min: float = Field(
+        description='Position of the smallest value.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    max: float = Field(
+        description='Largest value along the beamline.'
+    )
+    z_max: float = Field(
+        description='Position of the largest value.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    final: float = Field(
+        description='Value at the end of the run.'
+    )
+
+
+class SimulationSummary(BaseModel):
+    sim_id: str
+    created: datetime = Field(
+        description='Time at which the summary was computed.'
+    )
+    checkpoints: list[str] = Field(
+        default=[],
+        description='File names of all checkpoints of the simulation.'
+    )
+    statistics: dict[str, StatisticsOutput] = Field(
+        default={},
+        description='Statistics of the final or of every checkpoint by file name, without inputs.'
+    )
+    emittance: dict[str, dict[str, Extremum]] = Field(
+        default={},
+        description='Extrema of the emittance and the rms size per coordinate, taken from the emittance tables, \
+                     e.g. emittance["x"]["position_rms"]. The units are those of the tables.'
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description='Error message if the summary could not be computed, completely or in part.'
+    )
+
+
+class HistogramInput(BaseModel):
+    x: Literal['x', 'y', 'z', 'px', 'py', 'pz', 't'] = Field(
+        default='x',
+        description='Coordinate binned along the first axis. z, pz and t are absolute values as in Particles.to_pmd, \
+                     t in [s].'
+    )
+    y: Literal['x', 'y', 'z', 'px', 'py', 'pz', 't'] | None = Field(
+        default=None,
+        description='Coordinate binned along the second axis. A one-dimensional histogram is computed if not given.'
+    )
+    bins_x: int = Field(
+        default=100,
+        gt=0,
+        description='Number of bins along the first axis.'
+    )
+    bins_y: int = Field(
+        default=100,
+        gt=0,
+        description='Number of bins along the second axis.'
+    )
+    x_min: float | None = Field(
+        default=None,
+        description='Lower edge of the first axis. Defaults to the minimal value.'
+    )
+    x_max: float | None = Field(
+        default=None,
+        description='Upper edge of the first axis. Defaults to the maximal value.'
+    )
+    y_min: float | None = Field(
+        default=None,
+        description='Lower edge of the second axis. Defaults to the minimal value.'
+    )
+    y_max: float | None = Field(
+        default=None,
+        description='Upper edge of the second axis. Defaults to the maximal value.'
+    )
+    only_active: bool = Field(
+        default=True,
+        description='If true, lost particles are discarded.'
+    )
+    weighted: bool = Field(
+        default=False,
+        description='If true, particles are weighted by their absolute macro charge in [C] instead of being counted.'
+    )
+    checkpoint: int = Field(
+        default=-1,
+        description='Index of the simulation checkpoint. Negative indices count from the last checkpoint.'
+    )
+
+    @model_validator(mode='after')
+    def check_ranges(self):
+        if self.x_min is not None and self.x_max is not None and self.x_min >= self.x_max:
+            raise ValueError("x_min has to be smaller than x_max.")
+        if self.y_min is not None and self.y_max is not None and self.y_min >= self.y_max:
+            raise ValueError("y_min has to be smaller than y_max.")
+        return self
+
+
+class HistogramOutput(BaseModel):
+    coordinates: list[str] = Field(
+        description='Binned coordinates.'
+    )
+    counts: list = Field(
+        description='Particle counts or charges per bin. Nested as counts[i][j] for two-dimensional histograms.'
+    )
+    edges: list[FloatArray] = Field(
+        description='Bin edges per coordinate.'
+    )
+
+
+class CompactionReport(BaseModel):
+    sim_id: str
+    codec: Optional[str] = Field(
+        default=None,
+        description='Codec used for compression, None if compression is disabled.'
+    )
+    files: int = Field(
+        default=0,
+        description='Number of compressed files.'
+    )
+    bytes_before: int = Field(
+        default=0,
+        description='Size of the compressed files before compression.',
+        json_schema_extra={'format': 'Unit: [B]'}
+    )
+    bytes_after: int = Field(
+        default=0,
+        description='Size of the compressed files after compression.',
+        json_schema_extra={'format': 'Unit: [B]'}
+    )
+
+    @computed_field(return_type=int)
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
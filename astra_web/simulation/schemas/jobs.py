@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+JobStatus = Literal['queued', 'running', 'finished', 'failed', 'cancelled']
+
+
+class SimulationProcess(BaseModel):
+    """
+    Everything needed to (re-)start an ASTRA run whose input files have been written to its run directory.
+    """
+    run_dir: str = Field(
+        description='Directory the simulation is executed in.'
+    )
+    command: list[str] = Field(
+        description='Command line executing ASTRA on the input file in the run directory.'
+    )
+    distribution: str = Field(
+        description='Path of the initial particle distribution.'
+    )
+    threads: int = Field(
+        default=1,
+        description='Number of cores reserved for the run.'
+    )
+    timeout: int = Field(
+        description='The timeout for the simulation run.',
+        json_schema_extra={'format': 'Unit: [s]'}
+    )
+    z_start: float = Field(
+        default=0.0,
+        description='Start of the tracked interval, used for progress estimates.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    z_stop: Optional[float] = Field(
+        default=None,
+        description='Longitudinal stop position, used for progress estimates.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    cache_key: Optional[str] = Field(
+        default=None,
+        description='Input hash under which the result is cached.'
+    )
+    segments: list[tuple[float, str]] = Field(
+        default=[],
+        description='Segment boundaries of a segmented run with the hashes of their upstream configuration.'
+    )
+    restart_z: Optional[float] = Field(
+        default=None,
+        description='Boundary a segmented run was restarted from.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    phase_keys: dict[int, str] = Field(
+        default={},
+        description='Hashes of everything determining the phase of maximum energy gain of every cavity of an \
+                    auto-phased segmented run, by cavity ID.'
+    )
+    phases: dict[str, float] = Field(
+        default={},
+        description='Phases of maximum energy gain pinned in the input of a restarted run, by their phase_keys.',
+        json_schema_extra={'format': 'Unit: [deg]'}
+    )
+
+
+class Job(BaseModel):
+    job_id: str = Field(
+        description='ID of the job.'
+    )
+    sim_id: str = Field(
+        description='ID under which the results can be retrieved from the /simulations endpoints.'
+    )
+    status: JobStatus = Field(
+        default='queued',
+        description='Queued jobs wait for a free worker and free cores. Jobs interrupted by a restart of the API are \
+                    queued again.'
+    )
+    submitted: datetime = Field(
+        default_factory=datetime.now,
+        description='Time of submission.'
+    )
+    started: Optional[datetime] = Field(
+        default=None,
+        description='Start time of the last execution, i.e. the time cores were reserved for the job.'
+    )
+    cores: Optional[list[int]] = Field(
+        default=None,
+        description='IDs of the CPU cores reserved for the last execution.'
+    )
+    finished: Optional[datetime] = Field(
+        default=None,
+        description='Time the job finished, failed or was cancelled.'
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description='Error message of failed jobs.'
+    )
+    cached: bool = Field(
+        default=False,
+        description='True if the result was taken from a previous simulation with identical input.'
+    )
+
+
+class RunProgress(BaseModel):
+    z: Optional[float] = Field(
+        default=None,
+        description='Longitudinal position of the bunch last reported by ASTRA.',
+        json_schema_extra={'format': 'Unit: [m]'}
+    )
+    step: Optional[int] = Field(
+        default=None,
+        description='Step count last reported by ASTRA.'
+    )
+    fraction: Optional[float] = Field(
+        default=None,
+        description='Fraction of the interval z_start to z_stop tracked so far.'
+    )
+    elapsed: float = Field(
+        default=0.0,
+        description='Time since the start of the run.',
+        json_schema_extra={'format': 'Unit: [s]'}
+    )
+    eta: Optional[float] = Field(
+        default=None,
+        description='Estimated remaining run time, extrapolated linearly in z.',
+        json_schema_extra={'format': 'Unit: [s]'}
+    )
+
+
+class JobRecord(BaseModel):
+    """
+    Persisted state of a job.
+    """
+    job: Job
+    process: SimulationProcess
@@ -1,7 +1,8 @@
 from .tables import FieldTable
 from typing import Any
-from pydantic import BaseModel, Field, ConfigDict, computed_field, model_serializer
+from pydantic import BaseModel, Field, ConfigDict, computed_field, model_serializer, model_validator
 from astra_web.decorators.decorators import ini_exportable
+from ..fieldmaps import field_table_exists, field_table_id, register, link_field_table
 
 
 class Module(BaseModel):
@@ -15,13 +16,7 @@ class Module(BaseModel):
         return out_dict
 
 
-@ini_exportable
-class Cavity(Module):
-    id: int = Field(
-        exclude=True,
-        default=None,
-        description="The ID of the cavity.")
-
+class FieldModule(Module):
     field_table: FieldTable = Field(
         exclude=True,
         default=None,
@@ -29,6 +24,44 @@ class Cavity(Module):
                     field amplitudes v in free units.",
         json_schema_extra={'format': 'Unit: [m]'}
     )
+    field_table_id: str = Field(
+        exclude=True,
+        default=None,
+        description="ID of a field table registered via POST /fieldmaps, used instead of field_table."
+    )
+
+    @model_validator(mode='after')
+    def check_field_table(self):
+        if self.field_table is not None and self.field_table_id is not None:
+            raise ValueError("Either field_table or field_table_id can be given, not both.")
+        if self.field_table_id is not None and not field_table_exists(self.field_table_id):
+            raise ValueError(f"Field table '{self.field_table_id}' not found.")
+        return self
+
+    @property
+    def table_id(self) -> str | None:
+        """
+        ID of the field table in the registry. Tables given inline get the ID they are registered under by
+        fieldmaps.register, without being registered here.
+        """
+        if self.field_table_id is None and self.field_table is not None:
+            return field_table_id(self.field_table)
+
+        return self.field_table_id
+
+    def _write_field_table(self, path, file_name) -> None:
+        register(self)
+        if self.field_table_id is None:
+            return
+        link_field_table(self.field_table_id, f"{path}/{file_name}")
+
+
+@ini_exportable
+class Cavity(FieldModule):
+    id: int = Field(
+        exclude=True,
+        default=None,
+        description="The ID of the cavity.")
 
     @computed_field(return_type=str)
     @property
@@ -71,9 +104,7 @@ class Cavity(Module):
     )
 
     def write_to_disk(self, path) -> None:
-        if self.field_table is None:
-            return
-        self.field_table.to_csv(f"{path}/{self.File_Efield}")
+        self._write_field_table(path, self.File_Efield)
 
     @property
     def z_0(self):
@@ -87,7 +118,7 @@ class Cavity(Module):
 
 
 @ini_exportable
-class Solenoid(Module):
+class Solenoid(FieldModule):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     id: int = Field(
@@ -95,14 +126,6 @@ class Solenoid(Module):
         exclude=True,
         description="The ID of the solenoid."
     )
-    field_table: FieldTable = Field(
-        default=None,
-        exclude=True,
-        description="Table containing lists of longitudinal positions z and corresponding \
-                    field amplitudes v in free units.",
-        json_schema_extra={'format': 'Unit: [m]'}
-    )
-
     @computed_field(return_type=str)
     @property
     def File_Bfield(self) -> str:
@@ -137,9 +160,7 @@ class Solenoid(Module):
         return out_dict
 
     def write_to_disk(self, path) -> None:
-        if self.field_table is None:
-            return
-        self.field_table.to_csv(f"{path}/{self.File_Bfield}")
+        self._write_field_table(path, self.File_Bfield)
 
 
 @ini_exportable
@@ -1,9 +1,12 @@
 from pydantic import BaseModel, Field, computed_field
 from astra_web.utils import GENERATOR_DATA_PATH
+from astra_web.scheduler import CORE_BUDGET
 from astra_web.decorators.decorators import ini_exportable
 
 @ini_exportable
 class SimulationRunSpecifications(BaseModel):
+    _distribution: str | None = None
+
     run_dir: str = Field(
         default=None,
         description='Name of the directory the simulation will be executed in.',
@@ -23,10 +26,19 @@ class SimulationRunSpecifications(BaseModel):
     def Head(self) -> str:
         return f"Simulation run with initial particle distribution {self.particle_file_name}"
 
+    segmented: bool = Field(
+        default=False,
+        description='If true, the distributions at the beginning of every element are cached and a later run with \
+                    the same elements upstream of such a boundary restarts from there.',
+        exclude=True
+    )
+
     thread_num: int = Field(
         default=1,
         gt=0,
-        description='The number of concurrent threads used per simulation.',
+        le=CORE_BUDGET,
+        description='The number of concurrent threads used per simulation, i.e. of MPI ranks, each of which gets a \
+                    core of the CORE_BUDGET.',
         exclude=True
     )
 
@@ -59,6 +71,9 @@ class SimulationRunSpecifications(BaseModel):
     )
     @property
     def Distribution(self) -> str:
+        # set for runs restarted from an intermediate distribution
+        if self._distribution is not None:
+            return self._distribution
         file_name = 'example.ini'
         if self.particle_file_name is not None:
             file_name = self.particle_file_name + ".ini"
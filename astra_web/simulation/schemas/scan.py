@@ -0,0 +1,138 @@
+import re
+import itertools
+from typing import Annotated, Any, Optional
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, model_validator
+from .io import SimulationInput, StatisticsOutput
+
+_TOKEN = re.compile(r"([A-Za-z_]\w*)(?:\[(-?\d+)\])?")
+
+
+def _attribute(model: BaseModel, name: str) -> str:
+    # parameters are addressed by ASTRA names (e.g. 'Phi') or by their aliases (e.g. 'phase')
+    if name in model.model_fields:
+        return name
+    for key, field in model.model_fields.items():
+        if field.validation_alias == name:
+            return key
+    raise ValueError(f"{type(model).__name__} has no parameter '{name}'.")
+
+
+def _parse(path: str) -> list[tuple[str, int | None]]:
+    tokens = path.split(".")
+    matches = [_TOKEN.fullmatch(token) for token in tokens]
+    if len(tokens) == 0 or any(match is None for match in matches):
+        raise ValueError(f"Invalid parameter path '{path}'.")
+
+    return [(match.group(1), None if match.group(2) is None else int(match.group(2))) for match in matches]
+
+
+def _resolve(model: SimulationInput, path: str) -> tuple[BaseModel, str]:
+    *parents, (name, index) = _parse(path)
+    target = model
+    for parent, parent_index in parents:
+        target = getattr(target, _attribute(target, parent))
+        if parent_index is not None:
+            if not isinstance(target, list):
+                raise ValueError(f"'{parent}' of '{path}' is not a list.")
+            try:
+                target = target[parent_index]
+            except IndexError:
+                raise ValueError(f"Index {parent_index} of '{path}' out of range.")
+        if not isinstance(target, BaseModel):
+            raise ValueError(f"Invalid parameter path '{path}'.")
+    if index is not None:
+        raise ValueError(f"Parameter path '{path}' has to end with an attribute.")
+
+    return target, _attribute(target, name)
+
+
+def _validate(target: BaseModel, name: str, path: str, value: Any) -> Any:
+    # validated against type and constraints of the field, as if it was part of the request
+    field = target.model_fields[name]
+    annotation = field.annotation if len(field.metadata) == 0 else Annotated[(field.annotation, *field.metadata)]
+    try:
+        return TypeAdapter(annotation).validate_python(value)
+    except ValidationError as e:
+        raise ValueError(f"Invalid value {value} of '{path}': {e.errors()[0]['msg']}.")
+
+
+def set_parameter(model: SimulationInput, path: str, value: Any) -> None:
+    """
+    Sets a parameter of a simulation input given by a path such as 'cavities[0].Phi' or 'solenoids[0].MaxB'.
+    The value is validated like the field in a request.
+    """
+    target, name = _resolve(model, path)
+    setattr(target, name, _validate(target, name, path, value))
+
+
+class ScanInput(BaseModel):
+    base: SimulationInput = Field(
+        description='Simulation input shared by all points of the scan.'
+    )
+    grid: dict[str, list[float]] = Field(
+        default={},
+        description="Values of parameters spanning a grid, e.g. {'cavities[0].Phi': [-10, 0, 10]}. \
+                    Every combination of values is simulated.",
+    )
+    points: list[dict[str, float]] = Field(
+        default=[],
+        description="Explicit list of parameter overrides, e.g. [{'cavities[0].Phi': 0, 'solenoids[0].MaxB': 0.2}]. \
+                    Simulated in addition to the grid.",
+    )
+    n_slices: int = Field(
+        default=20,
+        description='Number of slices to be used for slice emittance calculation.'
+    )
+
+    @model_validator(mode='after')
+    def check_parameters(self):
+        if len(self.parameter_sets()) == 0:
+            raise ValueError("A scan requires a grid or a list of points.")
+        overrides = [(path, value) for path, values in self.grid.items() for value in values]
+        overrides += [override for parameters in self.points for override in parameters.items()]
+        for path, value in overrides:
+            _validate(*_resolve(self.base, path), path, value)
+        return self
+
+    def parameter_sets(self) -> list[dict[str, float]]:
+        grid = []
+        if len(self.grid) > 0:
+            grid = [dict(zip(self.grid, values)) for values in itertools.product(*self.grid.values())]
+
+        return grid + self.points
+
+    def members(self) -> list[tuple[dict[str, float], SimulationInput]]:
+        """
+        Expands the scan into one simulation input with its own ID and run directory per parameter set.
+        """
+        members = []
+        for parameters in self.parameter_sets():
+            member = self.base.model_copy(deep=True)
+            member.run_specs.run_dir = None
+            for path, value in parameters.items():
+                set_parameter(member, path, value)
+            # the copy shares the ID of the base, and the order of elements may have changed with their positions
+            member.reset_ids()
+            members.append((parameters, member))
+
+        return members
+
+
+class ScanPoint(BaseModel):
+    index: int = Field(
+        description='Position of the point in the expanded scan, grid points first.'
+    )
+    sim_id: str = Field(
+        description='ID of the simulation of this point.'
+    )
+    parameters: dict[str, float] = Field(
+        description='Parameter overrides of this point.'
+    )
+    statistics: Optional[StatisticsOutput] = Field(
+        default=None,
+        description='Statistics at the end of the simulation.'
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description='Error message if the simulation or the calculation of statistics failed.'
+    )
@@ -1,8 +1,6 @@
 import pandas as pd
 from pydantic import BaseModel, Field
-from typing import Type, TypeVar
-
-T = TypeVar('T', bound='Parent')
+from astra_web.generator.schemas.columns import ColumnarModel, FloatArray
 
 
 class FieldTable(BaseModel):
@@ -15,77 +13,71 @@ class FieldTable(BaseModel):
         json_schema_extra={'format': 'Unit: free'}
     )
 
+    def to_text(self) -> str:
+        return pd.DataFrame({'z': self.z, "v": self.v}).to_csv(sep=" ", header=False, index=False)
+
     def to_csv(self, file_name) -> None:
-        pd.DataFrame({'z': self.z, "v": self.v}).to_csv(file_name, sep=" ", header=False, index=False)
+        with open(file_name, "w") as f:
+            f.write(self.to_text())
 
 
-class XYEmittanceTable(BaseModel):
-    z: list[float] = Field(
+class XYEmittanceTable(ColumnarModel):
+    z: FloatArray = Field(
         description='Longitudinal positions.',
         json_schema_extra={'format': 'Unit: [m]'}
     )
-    t: list[float] = Field(
+    t: FloatArray = Field(
         description='Time points',
         json_schema_extra={'format': 'Unit: [ns]'}
     )
-    mean: list[float] = Field(
+    mean: FloatArray = Field(
         description='Average transverse position in x or y direction.',
         json_schema_extra={'format': 'Unit: [mm]'}
     )
-    position_rms: list[float] = Field(
+    position_rms: FloatArray = Field(
         description='RMS deviation in x or y direction.',
         json_schema_extra={'format': 'Unit: [mm]'}
     )
-    angle_rms: list[float] = Field(
+    angle_rms: FloatArray = Field(
         description='RMS inclination angle deviation in x or y direction.',
         json_schema_extra={'format': 'Unit: [mrad]'}
     )
-    emittance:  list[float] = Field(
+    emittance: FloatArray = Field(
         description='Normed emittance in x or y direction.',
         json_schema_extra={'format': 'Unit: [pi*mrad*mm]'}
     )
-    correlation: list[float] = Field(
+    correlation: FloatArray = Field(
         description='Correlation of position coordinates and momenta in x or y direction.',
         json_schema_extra={'format': 'Unit: [mrad]'}
     )
 
-    @classmethod
-    def from_csv(cls: Type[T], filename: str) -> T:
-        df = pd.read_csv(filename, names=list(cls.model_fields.keys()), sep=r"\s+")
-        return cls(**df.to_dict("list"))
-
 
-class ZEmittanceTable(BaseModel):
-    z: list[float] = Field(
+class ZEmittanceTable(ColumnarModel):
+    z: FloatArray = Field(
         description='Longitudinal positions.',
         json_schema_extra={'format': 'Unit: [m]'}
     )
-    t: list[float] = Field(
+    t: FloatArray = Field(
         description='Time points',
         json_schema_extra={'format': 'Unit: [ns]'}
     )
-    E_kin: list[float] = Field(
+    E_kin: FloatArray = Field(
         description='Average transverse position in x or y direction.',
         json_schema_extra={'format': 'Unit: [MeV]'}
     )
-    position_rms: list[float] = Field(
+    position_rms: FloatArray = Field(
         description='RMS deviation in x or y direction.',
         json_schema_extra={'format': 'Unit: [mm]'}
     )
-    delta_E_rms: list[float] = Field(
+    delta_E_rms: FloatArray = Field(
         description='RMS inclination angle deviation in x or y direction.',
         json_schema_extra={'format': 'Unit: [keV]'}
     )
-    emittance: list[float] = Field(
+    emittance: FloatArray = Field(
         description='Normed emittance in x or y direction.',
         json_schema_extra={'format': 'Unit: [pi*keV*mm]'}
     )
-    correlation: list[float] = Field(
+    correlation: FloatArray = Field(
         description='Correlation of position coordinates and mean energy in x or y direction.',
         json_schema_extra={'format': 'Unit: [keV]'}
-    )
-
-    @classmethod
-    def from_csv(cls: Type[T], filename: str) -> T:
-        df = pd.read_csv(filename, names=list(cls.model_fields.keys()), sep=r"\s+")
-        return cls(**df.to_dict("list"))
\ No newline at end of file
+    )
\ No newline at end of file
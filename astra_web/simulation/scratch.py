@@ -0,0 +1,129 @@
+import os
+import logging
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Timer
+from typing import Callable
+from astra_web.utils import get_env_var, SIMULATION_DATA_PATH
+
+logger = logging.getLogger(__name__)
+
+# RAM-backed directory, e.g. /dev/shm/astra-web, in which simulations run before they are persisted
+SIMULATION_SCRATCH_PATH = get_env_var("SIMULATION_SCRATCH_PATH") or None
+# time readers which resolved a scratch directory before its results were persisted may still read from it
+_GRACE_PERIOD = 60.0
+
+_persister = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persistence")
+
+
+def scratch_dir(run_dir: str) -> str | None:
+    if SIMULATION_SCRATCH_PATH is None:
+        return None
+
+    return os.path.join(SIMULATION_SCRATCH_PATH, os.path.basename(run_dir))
+
+
+def _persisted(scratch: str) -> bool:
+    return os.path.exists(os.path.join(scratch, ".persisted"))
+
+
+def run_path(sim_id: str) -> str:
+    """
+    Directory holding the results of a simulation: its scratch directory until the results are persisted,
+    the run directory below SIMULATION_DATA_PATH afterwards.
+    """
+    run_dir = os.path.abspath(f"{SIMULATION_DATA_PATH}/{sim_id}")
+    scratch = scratch_dir(run_dir)
+
+    return scratch if scratch is not None and os.path.isdir(scratch) and not _persisted(scratch) else run_dir
+
+
+def stage_run(run_dir: str) -> str:
+    """
+    Prepares the scratch directory of a run, in which the input files of the run directory are linked.
+
+    :return: The directory the simulation has to run in, the run directory itself if staging is disabled.
+    """
+    scratch = scratch_dir(run_dir)
+    if scratch is None:
+        return run_dir
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    for entry in os.scandir(run_dir):
+        os.symlink(os.path.abspath(entry.path), os.path.join(scratch, entry.name))
+
+    return scratch
+
+
+def _remove_persisted(scratch: str) -> None:
+    # the run may have been staged again in the meantime
+    if _persisted(scratch):
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _persist(scratch: str, run_dir: str, on_persisted: Callable[[], None] | None) -> None:
+    try:
+        # the run may have been deleted in the meantime
+        if os.path.isdir(run_dir):
+            for entry in os.scandir(scratch):
+                target = os.path.join(run_dir, entry.name)
+                # staged inputs are links into the run directory
+                if entry.is_symlink():
+                    continue
+                elif entry.is_dir():
+                    shutil.copytree(entry.path, target, dirs_exist_ok=True)
+                else:
+                    shutil.copy2(entry.path, target)
+            # inputs removed from the scratch directory, e.g. particle files replaced by HDF5 storage
+            for entry in os.scandir(run_dir):
+                if not os.path.lexists(os.path.join(scratch, entry.name)) and not entry.is_dir():
+                    os.remove(entry.path)
+        # new readers switch to the run directory, the scratch directory is removed after running reads are done
+        open(os.path.join(scratch, ".persisted"), "w").close()
+        timer = Timer(_GRACE_PERIOD, _remove_persisted, [scratch])
+        timer.daemon = True
+        timer.start()
+        if on_persisted is not None: on_persisted()
+    except Exception:
+        logger.exception("Persisting the results of sim %s failed", os.path.basename(run_dir))
+
+
+def persist_run(scratch: str, run_dir: str, on_persisted: Callable[[], None] | None = None) -> Future:
+    """
+    Copies the results of a finished run from its scratch directory to its run directory in the background.
+    Until then, run_path resolves to the scratch directory.
+
+    :param on_persisted: Called as soon as the results are readable from the run directory.
+    """
+    return _persister.submit(_persist, scratch, run_dir, on_persisted)
+
+
+def scratch_runs() -> list[str]:
+    """
+    Names of the run directories staged in the scratch directory.
+    """
+    if SIMULATION_SCRATCH_PATH is None or not os.path.isdir(SIMULATION_SCRATCH_PATH):
+        return []
+
+    return [entry.name for entry in os.scandir(SIMULATION_SCRATCH_PATH) if entry.is_dir()]
+
+
+def recover_run(sim_id: str) -> bool:
+    """
+    Persists a run left in the scratch directory and removes its scratch directory. The caller has to make sure
+    that no process is still running or persisting it.
+
+    :return: True if results had to be persisted.
+    """
+    scratch = os.path.join(SIMULATION_SCRATCH_PATH, sim_id)
+    recovered = not _persisted(scratch)
+    if recovered:
+        _persist(scratch, f"{SIMULATION_DATA_PATH}/{sim_id}", None)
+    shutil.rmtree(scratch, ignore_errors=True)
+
+    return recovered
+
+
+def shutdown() -> None:
+    # scratch directories in RAM do not survive a restart of the container
+    _persister.shutdown(wait=True)
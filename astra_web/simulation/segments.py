@@ -0,0 +1,269 @@
+import os
+import logging
+import re
+import json
+import hashlib
+import tempfile
+from astra_web.utils import get_env_var, temporary_path, SIMULATION_DATA_PATH
+from astra_web.storage.content import ContentStore, file_digest, link_files
+from astra_web.storage.compression import resolve
+from .schemas.io import SimulationInput
+from .schemas.jobs import SimulationProcess
+from .schemas.modules import Quadrupole
+from .fieldmaps import load_field_table
+from .simulation import astra_binary, emittance_paths, reference_z, particle_paths
+
+logger = logging.getLogger(__name__)
+
+# distributions at the element boundaries of segmented runs, keyed by the configuration upstream of the boundary
+segment_cache = ContentStore(
+    f"{SIMULATION_DATA_PATH}/.segments",
+    max_size=int(get_env_var("SEGMENT_CACHE_SIZE") or 10240) * 2**20,
+    max_age=float(get_env_var("SEGMENT_CACHE_AGE") or 30) * 86400,
+)
+# extent of the fringe field of a quadrupole beyond its effective length in units of the bore radius
+_FRINGE = 2.0
+# tolerance for matching the reference position of a checkpoint to a boundary
+_Z_TOLERANCE = 1e-4
+_RESTART_FILE = "restart.ini"
+_UPSTREAM_PREFIX = "upstream."
+# input file of a restarted run, ASTRA names its output after it
+_RESTART_INPUT = "segment.in"
+# phases of maximum energy gain found by the run a segment was cached from
+_PHASES_FILE = "phases.json"
+# rows of the table ASTRA prints after phasing the cavities: cavity number, energy gain [MeV], phase [deg]
+_PHASE_TABLE = re.compile(r"Cavity phasing completed")
+_PHASE_ROW = re.compile(r"\s*(\d+)\s+([-+\d.EeDd]+)\s+([-+\d.EeDd]+)\s*")
+
+
+def _elements(simulation_input: SimulationInput) -> list:
+    return simulation_input.cavities + simulation_input.solenoids + simulation_input.quadrupoles
+
+
+def _extent(element) -> tuple[float, float] | None:
+    """
+    Positions at which the field of an element begins and ends, None if unknown.
+    """
+    if element.z_0 is None:
+        return None
+    if isinstance(element, Quadrupole):
+        half_length = (element.Q_length or 0.0) / 2 + _FRINGE * element.Q_Bore
+        return element.z_0 - half_length, element.z_0 + half_length
+    # field tables are given relative to the position of the element
+    table = element.field_table
+    if table is None and element.field_table_id is not None:
+        table = load_field_table(element.field_table_id)
+    if table is None:
+        return element.z_0, element.z_0
+
+    return element.z_0 + min(table.z), element.z_0 + max(table.z)
+
+
+def _begin(element) -> float | None:
+    """
+    Position at which the field of an element begins, None if unknown.
+    """
+    extent = _extent(element)
+
+    return None if extent is None else extent[0]
+
+
+def segment_boundaries(simulation_input: SimulationInput) -> list[float]:
+    """
+    Positions at which the field of an element begins, outside the field of every other element. Tracking up to
+    such a boundary depends neither on this element nor on any element further downstream, and a run restarted
+    there enters no field halfway.
+    """
+    extents = [extent for extent in map(_extent, _elements(simulation_input)) if extent is not None]
+    begins = {begin for begin, _ in extents}
+
+    return sorted(z for z in begins if 0.0 < z < simulation_input.output_specs.ZSTOP
+                  and not any(begin < z < end for begin, end in extents))
+
+
+def _upstream_key(simulation_input: SimulationInput, z: float) -> str:
+    hash_ = hashlib.sha256(f"{z}".encode())
+    for specs in [simulation_input.run_specs, simulation_input.output_specs, simulation_input.space_charge]:
+        hash_.update(specs._to_ini().encode())
+    hash_.update(str(sorted(s for s in simulation_input.output_specs.screens if s < z)).encode())
+    hash_.update(os.path.basename(astra_binary(simulation_input)).encode())
+    distribution = resolve(simulation_input.run_specs.Distribution)
+    if os.path.exists(distribution):
+        file_digest(hash_, distribution)
+    for element in _elements(simulation_input):
+        begin = _begin(element)
+        if begin is None or begin < z:
+            hash_.update(element.to_ini().encode())
+            if getattr(element, "table_id", None) is not None:
+                hash_.update(element.table_id.encode())
+
+    return hash_.hexdigest()
+
+
+def _phase_key(simulation_input: SimulationInput, idx: int) -> str | None:
+    """
+    Hash of everything determining the phase of maximum energy gain of a cavity: its own parameters except for
+    its phase and all elements whose field begins before its field ends. None if its position is unknown.
+    """
+    extent = _extent(simulation_input.cavities[idx])
+    if extent is None:
+        return None
+    unphased = simulation_input.model_copy(deep=True)
+    unphased.cavities[idx].Phi = 0.0
+
+    return _upstream_key(unphased, extent[1])
+
+
+def plan_segments(simulation_input: SimulationInput, process: SimulationProcess) -> None:
+    """
+    Places screens at the segment boundaries of a segmented run and records the keys of the boundaries, and of
+    the phases of its cavities if they are auto-phased.
+    """
+    boundaries = segment_boundaries(simulation_input)
+    simulation_input.output_specs.screens = sorted(set(simulation_input.output_specs.screens).union(boundaries))
+    process.segments = [(z, _upstream_key(simulation_input, z)) for z in boundaries]
+    if simulation_input.run_specs.Auto_Phase:
+        keys = {cavity.id: _phase_key(simulation_input, idx) for idx, cavity in enumerate(simulation_input.cavities)}
+        process.phase_keys = {cavity_id: key for cavity_id, key in keys.items() if key is not None}
+
+
+def _cached_phases(entry: dict, simulation_input: SimulationInput, process: SimulationProcess) -> dict | None:
+    """
+    Phases of maximum energy gain of all cavities of an auto-phased run as found by the run a segment was cached
+    from, None if one of them is unknown, e.g. because a cavity downstream of the boundary has changed.
+    """
+    if not simulation_input.run_specs.Auto_Phase or len(simulation_input.cavities) == 0:
+        return {}
+    try:
+        with open(os.path.join(entry["path"], _PHASES_FILE), "r") as f:
+            phases = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if len(process.phase_keys) < len(simulation_input.cavities) or \
+            any(key not in phases for key in process.phase_keys.values()):
+        return None
+
+    return {key: phases[key] for key in process.phase_keys.values()}
+
+
+def restore_segment(simulation_input: SimulationInput, process: SimulationProcess) -> float | None:
+    """
+    Prepares a segmented run to restart from the furthest downstream boundary whose upstream configuration has
+    been simulated before. The cached distribution and the upstream output are linked into the run directory and
+    ASTRA is run on a separate restart input, which pins the phases of auto-phased cavities to those found by
+    the upstream run, as the reference particle of the restart does not pass through the upstream cavities.
+
+    :return: The position of the restart, None if the run starts from scratch.
+    """
+    for z, key in reversed(process.segments):
+        entry = segment_cache.lookup(key)
+        if entry is None or (phases := _cached_phases(entry, simulation_input, process)) is None:
+            continue
+        link_files({name: os.path.join(entry["path"], name) for name in os.listdir(entry["path"])
+                    if name != _PHASES_FILE}, process.run_dir)
+        restart = simulation_input.model_copy(deep=True)
+        restart.run_specs._distribution = os.path.join(process.run_dir, _RESTART_FILE)
+        # the cached distribution has been scaled by the upstream run already
+        restart.run_specs.Qbunch, restart.run_specs.Q_Schottky = 0.0, 0.0
+        restart.run_specs.XYrms, restart.run_specs.Trms = -1.0, -1.0
+        if len(phases) > 0:
+            # phases of auto-phased cavities are given relative to the phase of maximum energy gain
+            restart.run_specs.Auto_Phase = False
+            for cavity in restart.cavities:
+                cavity.Phi += phases[process.phase_keys[cavity.id]]
+        input_filename = os.path.join(process.run_dir, _RESTART_INPUT)
+        with open(input_filename, "w") as input_file:
+            input_file.write(restart.to_ini())
+        process.command = [input_filename if arg == simulation_input.input_filename else arg
+                           for arg in process.command]
+        process.restart_z, process.z_start, process.phases = z, max(process.z_start, z), phases
+        return z
+
+    return None
+
+
+def _found_phases(process: SimulationProcess, work_dir: str) -> dict[str, float]:
+    """
+    Phases of maximum energy gain of the cavities of a run by their phase keys, as printed by ASTRA or as pinned
+    in the input of a restarted run.
+    """
+    if process.restart_z is not None:
+        return process.phases
+    phases, in_table = {}, False
+    with open(os.path.join(work_dir, "run.out"), "r") as f:
+        for line in f:
+            if _PHASE_TABLE.search(line):
+                in_table = True
+            elif in_table and (match := _PHASE_ROW.fullmatch(line.rstrip("\n"))) is not None:
+                if int(match.group(1)) in process.phase_keys:
+                    phases[process.phase_keys[int(match.group(1))]] = float(match.group(3).replace("D", "E"))
+            elif in_table and len(phases) > 0 and line.strip():
+                break
+
+    return phases
+
+
+def _rename_restart_output(work_dir: str) -> None:
+    # ASTRA names the output of the restart input after it, the run keeps the names of a complete run
+    root = os.path.splitext(_RESTART_INPUT)[0]
+    for name in os.listdir(work_dir):
+        if name.startswith(root + ".") and name != _RESTART_INPUT:
+            os.replace(os.path.join(work_dir, name), os.path.join(work_dir, "run" + name[len(root):]))
+
+
+def _merge_emittance(work_dir: str) -> None:
+    for path in emittance_paths(work_dir):
+        upstream = os.path.join(work_dir, _UPSTREAM_PREFIX + os.path.basename(path))
+        if not os.path.lexists(upstream):
+            continue
+        with open(upstream, "r") as f:
+            rows = f.read()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                rows += f.read()
+        tmp_path = temporary_path(path)
+        with open(tmp_path, "w") as f:
+            f.write(rows)
+        os.replace(tmp_path, path)
+        os.remove(upstream)
+
+
+def _upstream_rows(path: str, z: float) -> str:
+    with open(path, "r") as f:
+        return "".join(line for line in f if line.strip() and float(line.split()[0]) < z - _Z_TOLERANCE)
+
+
+def complete_segments(process: SimulationProcess, work_dir: str) -> None:
+    """
+    Completes the output of a restarted run by the upstream output and caches the distributions at all
+    boundaries downstream of the restart, together with the output upstream of them.
+    """
+    if process.restart_z is not None:
+        _rename_restart_output(work_dir)
+        _merge_emittance(work_dir)
+    phases = _found_phases(process, work_dir) if len(process.phase_keys) > 0 else {}
+    # the initial distribution is linked by every run anyway
+    positions = {path: reference_z(work_dir, os.path.basename(path)) for path in particle_paths(work_dir)
+                 if not os.path.basename(path).startswith("run.0000.")}
+    for z, key in process.segments:
+        at_boundary = [path for path, z_ref in positions.items() if abs(z_ref - z) < _Z_TOLERANCE]
+        if (process.restart_z is not None and z <= process.restart_z) or len(at_boundary) == 0:
+            continue
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                # the checkpoint at the boundary itself is written again by the restarted run
+                files = {os.path.basename(path): path for path, z_ref in positions.items() if z_ref < z - _Z_TOLERANCE}
+                files[_RESTART_FILE] = at_boundary[0]
+                for path in filter(os.path.exists, emittance_paths(work_dir)):
+                    name = _UPSTREAM_PREFIX + os.path.basename(path)
+                    with open(os.path.join(tmp_dir, name), "w") as f:
+                        f.write(_upstream_rows(path, z))
+                    files[name] = os.path.join(tmp_dir, name)
+                with open(os.path.join(tmp_dir, _PHASES_FILE), "w") as f:
+                    json.dump(phases, f)
+                files[_PHASES_FILE] = os.path.join(tmp_dir, _PHASES_FILE)
+                segment_cache.store(key, files, z=z)
+        except OSError as e:
+            # the cache is an optimization only
+            logger.warning("Caching the segment boundary at z=%s of sim %s failed: %s", z,
+                           os.path.basename(process.run_dir), e)
@@ -1,46 +1,188 @@
 import os
 import glob
-import pandas as pd
-from subprocess import run
-from .schemas.io import SimulationInput, SimulationOutput
+import signal
+from subprocess import CalledProcessError, Popen, PIPE, DEVNULL, TimeoutExpired
+from threading import Event, Lock, Timer
+from typing import Callable, Iterator
+from .schemas.io import SimulationInput, SimulationOutput, CompactionReport
+from .schemas.jobs import SimulationProcess
 from .schemas.tables import XYEmittanceTable, ZEmittanceTable
 from astra_web.utils import get_env_var, SIMULATION_DATA_PATH
+from astra_web.scheduler import Cancelled, reserve, pin, pinning_env
 from astra_web.generator.generator import read_particle_file
+from astra_web.generator.schemas.particles import Particles, ParticleSelection
+from astra_web.storage.parser import EmptyFileError
+from astra_web.storage.cache import remove_sidecars
+from astra_web.storage.compression import SIMULATION_COMPRESSION, SUFFIXES, codec, compress_file, exists, \
+    open_text, resolve, strip_suffix
+from .scratch import stage_run, persist_run
+from .hdf5 import hdf5_path, write_run_hdf5, hdf5_checkpoints, read_hdf5_particles, read_hdf5_reference_z, \
+    read_hdf5_tables
 
 ASTRA_BINARY_PATH = get_env_var("ASTRA_BINARY_PATH")
+# 'ascii' keeps the files written by ASTRA, 'hdf5' replaces particle and emittance files by a single run.h5
+SIMULATION_STORAGE = get_env_var("SIMULATION_STORAGE") or "ascii"
+# time processes get to exit after SIGTERM before the process group is killed
+TERMINATION_GRACE_PERIOD = float(get_env_var("TERMINATION_GRACE_PERIOD") or 5)
 
+# processes of the running simulations by run directory
+_processes: dict[str, Popen] = {}
+_processes_lock = Lock()
 
-def link_initial_particle_distribution(simulation_input: SimulationInput):
-    os.symlink(simulation_input.run_specs.Distribution,
-               f"{simulation_input.run_dir}/run.0000.001")
+
+def link_initial_particle_distribution(process: SimulationProcess):
+    link = f"{process.run_dir}/run.0000.001"
+    # a run restarted after an interruption already holds the link
+    if os.path.islink(link): os.remove(link)
+    os.symlink(process.distribution, link)
+
+
+def simulation_process(simulation_input: SimulationInput) -> SimulationProcess:
+    return SimulationProcess(
+        run_dir=simulation_input.run_dir,
+        command=_run_command(simulation_input),
+        distribution=simulation_input.run_specs.Distribution,
+        threads=simulation_input.run_specs.thread_num,
+        timeout=simulation_input.run_specs.timeout,
+        z_start=simulation_input.output_specs.ZSTART,
+        z_stop=simulation_input.output_specs.ZSTOP,
+    )
 
 
 def process_simulation_input(simulation_input: SimulationInput) -> str:
-    link_initial_particle_distribution(simulation_input)
-    raw_process_output = run(
-        _run_command(simulation_input),
-        cwd=simulation_input.run_dir,
-        capture_output=True,
-        timeout=simulation_input.run_specs.timeout
-    ).stdout
-
-    terminal_output = raw_process_output.decode()
-    output_file_name = f"{simulation_input.run_dir}/run.out"
-    with open(output_file_name, "w") as file:
-        file.write(terminal_output)
+    return run_simulation_process(simulation_process(simulation_input))
+
+
+def _kill_group(proc: Popen, grace_period: float = 0.0) -> None:
+    # every run is the leader of its own process group, which contains all MPI ranks
+    try:
+        if grace_period > 0:
+            os.killpg(proc.pid, signal.SIGTERM)
+            try:
+                proc.wait(grace_period)
+            except TimeoutExpired:
+                pass
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def terminate_run(run_dir: str) -> bool:
+    """
+    Terminates the process group of a running simulation.
+
+    :return: False if no process is running in the run directory.
+    """
+    with _processes_lock:
+        proc = _processes.get(run_dir)
+    if proc is None:
+        return False
+    _kill_group(proc, TERMINATION_GRACE_PERIOD)
+
+    return True
+
+
+def _stream_output(process: SimulationProcess, work_dir: str, cores: list[int],
+                   on_output: Callable[[str], None] | None = None, cancelled: Event | None = None) -> str:
+    # Fortran runtimes buffer stdout if it is not a terminal, which would delay every line until the run ends
+    env = os.environ | {"GFORTRAN_UNBUFFERED_PRECONNECTED": "y", "FORT_BUFFERED": "false"} | pinning_env(cores)
+    # ASTRA writes its output next to the input file, which has to point into the working directory
+    command = [work_dir + arg[len(process.run_dir):] if arg.startswith(process.run_dir + "/") else arg
+               for arg in process.command]
+    lines, expired = [], Event()
+    with Popen(pin(command, cores), cwd=work_dir, stdout=PIPE, stderr=DEVNULL, env=env, start_new_session=True,
+               encoding="utf-8", errors="replace") as proc, open(f"{work_dir}/run.out", "w") as file:
+        with _processes_lock:
+            _processes[process.run_dir] = proc
+        timer = Timer(process.timeout, lambda: (expired.set(), _kill_group(proc)))
+        timer.start()
+        try:
+            # a cancellation before the registration did not find the process
+            if cancelled is not None and cancelled.is_set(): _kill_group(proc)
+            for line in proc.stdout:
+                file.write(line)
+                file.flush()
+                lines.append(line)
+                if on_output is not None: on_output(line)
+            proc.wait()
+        finally:
+            timer.cancel()
+            with _processes_lock:
+                del _processes[process.run_dir]
+            # MPI ranks orphaned by a crashed launcher
+            _kill_group(proc)
+    if expired.is_set():
+        raise TimeoutExpired(process.command, process.timeout, output="".join(lines))
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled(f"Simulation {os.path.basename(process.run_dir)} was cancelled.")
+    # a crashed run must neither be converted nor cached as result
+    if proc.returncode != 0:
+        raise CalledProcessError(proc.returncode, process.command, output="".join(lines))
+
+    return "".join(lines)
+
+
+def finalize_run(run_dir: str) -> None:
+    """
+    Converts and compresses the output of a finished run according to the storage settings.
+    """
+    if SIMULATION_STORAGE == "hdf5":
+        store_run_hdf5(run_dir)
+    if codec(SIMULATION_COMPRESSION) is not None:
+        compact_run(run_dir)
+
+
+def run_simulation_process(process: SimulationProcess, on_output: Callable[[str], None] | None = None,
+                           on_start: Callable[[list[int]], None] | None = None,
+                           on_exit: Callable[[str], None] | None = None,
+                           on_persisted: Callable[[], None] | None = None, cancelled: Event | None = None) -> str:
+    """
+    Runs ASTRA as soon as enough cores are free and writes its terminal output to run.out while it is produced.
+    With SIMULATION_SCRATCH_PATH set, the run takes place in a scratch directory and its results are copied to
+    the run directory in the background.
+
+    :param process: The run to execute.
+    :param on_output: Called with every line of terminal output as soon as it is written.
+    :param on_start: Called with the reserved cores when the run is admitted.
+    :param on_exit: Called with the working directory when ASTRA exited successfully, before its output is converted.
+    :param on_persisted: Called when the results are stored in the run directory.
+    :param cancelled: Event cancelling the run, set by the caller before calling terminate_run and interrupt.
+    :return: The complete terminal output.
+    :raises CalledProcessError: If ASTRA exits with a nonzero return code, before on_exit is called.
+    """
+    link_initial_particle_distribution(process)
+    work_dir = stage_run(process.run_dir)
+    try:
+        with reserve(process.threads, os.path.basename(process.run_dir), cancelled) as cores:
+            if on_start is not None: on_start(cores)
+            terminal_output = _stream_output(process, work_dir, cores, on_output, cancelled)
+    except Exception:
+        # keeps the output of failed runs
+        if work_dir != process.run_dir: persist_run(work_dir, process.run_dir)
+        raise
+    if on_exit is not None: on_exit(work_dir)
+    # output is converted before it becomes readable, in the scratch directory this is a matter of memory only
+    finalize_run(work_dir)
+    if work_dir != process.run_dir:
+        persist_run(work_dir, process.run_dir, on_persisted)
+    elif on_persisted is not None:
+        on_persisted()
 
     return terminal_output
 
 
 def _run_command(simulation_input: SimulationInput) -> list[str]:
-    cmd = [_astra_binary(simulation_input), simulation_input.input_filename]
+    cmd = [astra_binary(simulation_input), simulation_input.input_filename]
 
     if simulation_input.run_specs.thread_num > 1:
         cmd = ['mpirun', "-n", str(simulation_input.run_specs.thread_num)] + cmd
     return cmd
 
 
-def _astra_binary(simulation_input: SimulationInput) -> str:
+def astra_binary(simulation_input: SimulationInput) -> str:
+    """
+    Path of the ASTRA binary running a simulation, the parallel build for more than one thread.
+    """
     binary = "astra"
     if simulation_input.run_specs.thread_num > 1:
         binary = "parallel_" + binary
@@ -50,15 +192,25 @@ def _astra_binary(simulation_input: SimulationInput) -> str:
 
 def load(file_path: str, model_cls):
     try:
-        if os.path.exists(file_path):
-            return model_cls.from_csv(file_path)
+        if exists(file_path):
+            return model_cls.from_csv(file_path, cached=True)
         else:
             return None
-    except pd.errors.EmptyDataError:
+    except EmptyFileError:
         return None
 
 
+def emittance_paths(run_dir: str) -> list[str]:
+    """
+    Paths of the X, Y and Z emittance tables of a run, whether they exist or not.
+    """
+    return [f"{run_dir}/run.{coordinate}emit.001" for coordinate in ['X', 'Y', 'Z']]
+
+
 def load_emittance_output(run_dir: str) -> list[XYEmittanceTable]:
+    if not any(map(exists, emittance_paths(run_dir))) and os.path.exists(hdf5_path(run_dir)):
+        return read_hdf5_tables(run_dir)
+
     tables = []
     for coordinate in ['x', 'y', 'z']:
         file_name = f"{run_dir}/run.{coordinate.upper()}emit.001"
@@ -68,17 +220,131 @@ def load_emittance_output(run_dir: str) -> list[XYEmittanceTable]:
     return tables
 
 
-def load_simulation_output(path: str, sim_id: str) -> SimulationOutput:
-    x_table, y_table, z_table = load_emittance_output(path)
+def particle_paths(run_dir: str) -> list[str]:
+    """
+    Paths of the particle checkpoints of a run. Compressed checkpoints are listed under their uncompressed name.
+    """
+    paths = set()
+    for suffix in [""] + list(SUFFIXES.values()):
+        paths.update(map(strip_suffix, glob.glob(f"{run_dir}/run.*[0-9].001{suffix}")))
+
+    return sorted(paths, key=lambda s: os.path.basename(s).split(".")[1])
+
+
+def checkpoints(run_dir: str) -> list[str]:
+    """
+    File names of the particle checkpoints of a run, e.g. 'run.0100.001', independent of the storage mode.
+    """
+    paths = particle_paths(run_dir)
+    if len(paths) == 0 and os.path.exists(hdf5_path(run_dir)):
+        return hdf5_checkpoints(run_dir)
+
+    return [os.path.basename(path) for path in paths]
+
+
+def read_checkpoint(run_dir: str, name: str, selection: ParticleSelection | None = None) -> Particles:
+    path = f"{run_dir}/{name}"
+    if exists(path):
+        return read_particle_file(path, selection)
+
+    return read_hdf5_particles(run_dir, name, selection)
+
+
+def checkpoint_source(run_dir: str, name: str) -> str:
+    """
+    Path of the file holding a checkpoint: the particle file, possibly compressed, or the HDF5 file of the run.
+    """
+    path = f"{run_dir}/{name}"
+
+    return resolve(path) if exists(path) else hdf5_path(run_dir)
+
+
+def reference_z(run_dir: str, name: str) -> float:
+    """
+    Position of the reference particle of a checkpoint, read from its first row or from run.h5.
+    """
+    path = f"{run_dir}/{name}"
+    if not exists(path):
+        return read_hdf5_reference_z(run_dir, name)
+    # the first row of a particle file holds the reference particle
+    with open_text(path) as f:
+        return float(f.readline().split()[2])
+
+
+def select_checkpoints(run_dir: str, selection: ParticleSelection | None = None) -> list[str]:
+    names = checkpoints(run_dir)
+    if selection is None:
+        return names
+
+    names = [names[idx] for idx in selection.checkpoint_indices(len(names))]
+    if selection.z_min is not None or selection.z_max is not None:
+        z_min = -float('inf') if selection.z_min is None else selection.z_min
+        z_max = float('inf') if selection.z_max is None else selection.z_max
+        names = [name for name in names if z_min <= reference_z(run_dir, name) <= z_max]
+
+    return names
+
+
+def export_run_hdf5(run_dir: str) -> str:
+    """
+    Returns the path of the HDF5 file of a run, writing it first if it does not exist yet.
+    """
+    path = hdf5_path(run_dir)
+    if not os.path.exists(path):
+        write_run_hdf5(run_dir, particle_paths(run_dir), load_emittance_output(run_dir))
+
+    return path
+
+
+def store_run_hdf5(run_dir: str) -> None:
+    """
+    Replaces the particle and emittance files of a finished run by a single HDF5 file.
+    """
+    paths = particle_paths(run_dir)
+    write_run_hdf5(run_dir, paths, load_emittance_output(run_dir))
+    for path in paths + [p for p in emittance_paths(run_dir) if exists(p)]:
+        remove_sidecars(path)
+        os.remove(resolve(path))
+
+
+def compact_run(run_dir: str, name: str = SIMULATION_COMPRESSION) -> CompactionReport:
+    """
+    Compresses the particle and emittance files of a finished run. Readers decompress them transparently.
+    Links to initial distributions and files compressed before are skipped.
+
+    :param run_dir: Run directory.
+    :param name: Codec setting, 'zstd' or 'gzip'.
+    :return: Report of the number of compressed files and their sizes.
+    """
+    report = CompactionReport(sim_id=os.path.basename(run_dir), codec=codec(name))
+    if report.codec is None:
+        return report
+
+    for path in particle_paths(run_dir) + emittance_paths(run_dir):
+        if not os.path.isfile(path) or os.path.islink(path):
+            continue
+        remove_sidecars(path)
+        before, after = compress_file(path, report.codec)
+        report.files += 1
+        report.bytes_before += before
+        report.bytes_after += after
+
+    return report
+
+
+def _load_run_text(path: str) -> tuple[str, str]:
     with open(f"{path}/run.out", "r") as f:
         output = f.read()
     with open(f"{path}/run.in", "r") as f:
         input_ini = f.read()
-    particle_paths = sorted(
-        glob.glob(f"{path}/run.*[0-9].001"),
-        key=lambda s: s.split(".")[1]
-    )
-    particles = [read_particle_file(path) for path in particle_paths]
+
+    return input_ini, output
+
+
+def load_simulation_output(path: str, sim_id: str, selection: ParticleSelection | None = None) -> SimulationOutput:
+    x_table, y_table, z_table = load_emittance_output(path)
+    input_ini, output = _load_run_text(path)
+    particles = [read_checkpoint(path, name, selection) for name in select_checkpoints(path, selection)]
     return SimulationOutput(
         sim_id=sim_id,
         input_ini=input_ini,
@@ -87,4 +353,17 @@ def load_simulation_output(path: str, sim_id: str) -> SimulationOutput:
         emittance_x=x_table,
         emittance_y=y_table,
         emittance_z=z_table,
-    )
\ No newline at end of file
+    )
+
+
+def iter_simulation_output(path: str, sim_id: str, selection: ParticleSelection | None = None) -> Iterator[dict]:
+    """
+    Lazy counterpart of load_simulation_output. Yields the header fields, each emittance table and then
+    one particle checkpoint after another, such that only a single checkpoint is held in memory.
+    """
+    input_ini, output = _load_run_text(path)
+    yield {"sim_id": sim_id, "input_ini": input_ini, "run_output": output}
+    for key, table in zip(["emittance_x", "emittance_y", "emittance_z"], load_emittance_output(path)):
+        yield {key: table}
+    for idx, name in enumerate(select_checkpoints(path, selection)):
+        yield {"index": idx, "particles": read_checkpoint(path, name, selection)}
\ No newline at end of file
@@ -0,0 +1,193 @@
+import numpy as np
+from typing import Iterable
+from pmd_beamphysics import ParticleGroup
+
+# keys of the Twiss and dispersion parameters as computed by pmd_beamphysics.statistics.twiss_dispersion_calc
+TWISS_KEYS = ['alpha', 'beta', 'gamma', 'emit', 'eta', 'etap', 'norm_emit']
+# number of particles whose moments are accumulated by one bincount in batched statistics
+BATCH_SIZE = 2**22
+
+
+def _slices(values: np.ndarray, n_slice: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Assigns particles to n_slice slices of equal particle count along values, in the same way as
+    ParticleGroup.split, i.e. np.array_split of the sorting order.
+
+    :return: Slice index of every particle and peak-to-peak extent of every slice.
+    """
+    order = np.argsort(values)
+    quotient, remainder = divmod(values.size, n_slice)
+    sizes = np.full(n_slice, quotient)
+    sizes[:remainder] += 1
+    labels = np.empty(values.size, dtype=np.intp)
+    labels[order] = np.repeat(np.arange(n_slice), sizes)
+
+    ends = np.cumsum(sizes)
+    occupied = sizes > 0
+    ptp = np.full(n_slice, np.nan)
+    ptp[occupied] = values[order[ends[occupied] - 1]] - values[order[ends[occupied] - sizes[occupied]]]
+
+    return labels, ptp
+
+
+def _columns(particle_group: ParticleGroup, slice_key: str, planes: str) -> tuple[dict[str, np.ndarray], dict]:
+    """
+    Coordinates entering the moments relative to the bunch mean, which limits cancellation, and the means of
+    slice_key and p, which are needed in absolute terms.
+    """
+    columns, means = {"weight": particle_group.weight}, {}
+    for key in [slice_key, "p"]:
+        values = particle_group[key]
+        means[key] = values.mean()
+        columns[key] = values - means[key]
+    for x in planes:
+        for key in [x, "p" + x]:
+            values = particle_group[key]
+            columns[key] = values - values.mean()
+
+    return columns, means
+
+
+def _sums(columns: dict[str, np.ndarray], labels: np.ndarray, n_bins: int, slice_key: str,
+          planes: str) -> dict[str, np.ndarray]:
+    """
+    Accumulates the weighted and unweighted first and second moments of all bins with one bincount each.
+    """
+    def total(values=None):
+        return np.bincount(labels, weights=values, minlength=n_bins)
+
+    weight, p = columns["weight"], columns["p"]
+    sums = {"n": total(), "w": total(weight), "ww": total(weight ** 2), "wp": total(weight * p), "p": total(p),
+            "pp": total(p * p), "w" + slice_key: total(weight * columns[slice_key])}
+    for x in planes:
+        px = "p" + x
+        x_values, px_values = columns[x], columns[px]
+        wx, wpx = weight * x_values, weight * px_values
+        sums |= {
+            "w" + x: total(wx), "w" + px: total(wpx),
+            f"w{x}{x}": total(wx * x_values), f"w{px}{px}": total(wpx * px_values), f"w{x}{px}": total(wx * px_values),
+            x: total(x_values), px: total(px_values),
+            x + x: total(x_values ** 2), px + px: total(px_values ** 2), x + px: total(x_values * px_values),
+            x + "p": total(x_values * p), px + "p": total(px_values * p),
+        }
+
+    return sums
+
+
+def _statistics(sums: dict, means: dict, mass: float, planes: str) -> dict[str, np.ndarray]:
+    """
+    Derives normalized emittances and Twiss parameters from moment sums with the conventions of
+    pmd_beamphysics: emittances from the weighted covariance of (x, px), Twiss parameters from the unweighted
+    covariance of (x, px / p0, p / p0) with the weighted mean momentum p0.
+    """
+    n, v1, v2 = sums["n"], sums["w"], sums["ww"]
+    mean_p = sums["wp"] / v1 + means["p"]
+
+    def weighted_cov(a, b):
+        return (sums[f"w{a}{b}"] - sums["w" + a] * sums["w" + b] / v1) / (v1 - v2 / v1)
+
+    def cov(a, b):
+        return (sums[a + b] - sums[a] * sums[b] / n) / (n - 1)
+
+    data = {"mean_p": mean_p}
+    for x in planes:
+        px = "p" + x
+        data[f"norm_emit_{x}"] = np.sqrt(weighted_cov(x, x) * weighted_cov(px, px) - weighted_cov(x, px) ** 2) / mass
+
+        # covariance of (x, x', delta) with x' = px / p0 and delta = p / p0
+        sigma_xx = cov(x, x)
+        sigma_xpxp = cov(px, px) / mean_p ** 2
+        sigma_xxp = cov(x, px) / mean_p
+        sigma_xd = cov(x, "p") / mean_p
+        sigma_xpd = cov(px, "p") / mean_p ** 2
+        sigma_dd = cov("p", "p") / mean_p ** 2
+
+        eb = sigma_xx - sigma_xd ** 2 / sigma_dd
+        eg = sigma_xpxp - sigma_xpd ** 2 / sigma_dd
+        ea = -sigma_xxp + sigma_xd * sigma_xpd / sigma_dd
+        emit = np.sqrt(eb * eg - ea ** 2)
+        twiss = {
+            "alpha": ea / emit,
+            "beta": eb / emit,
+            "gamma": eg / emit,
+            "emit": emit,
+            "eta": sigma_xd / sigma_dd,
+            "etap": sigma_xpd / sigma_dd,
+            "norm_emit": emit * mean_p / mass,
+        }
+        data |= {f"twiss_{key}_{x}": value for key, value in twiss.items()}
+
+    return data
+
+
+def batch_slice_statistics(particle_groups: Iterable[ParticleGroup], n_slice: int, slice_key: str | None = None,
+                           planes: str = "xy") -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """
+    Slice statistics of several particle groups, e.g. the checkpoints of a run. Groups are consumed one by one,
+    and the moments of up to BATCH_SIZE particles of consecutive groups are accumulated together.
+
+    :return: The same as slice_statistics, stacked along a first axis over the particle groups.
+    """
+    batches, batch, means, ptps, extents = [], [], [], [], []
+
+    def flush():
+        columns = {key: np.concatenate([group[key] for group, _ in batch]) for key in batch[0][0]}
+        labels = np.concatenate([group_labels + idx * n_slice for idx, (_, group_labels) in enumerate(batch)])
+        sums = _sums(columns, labels, len(batch) * n_slice, slice_key, planes)
+        batches.append({key: value.reshape(len(batch), n_slice) for key, value in sums.items()})
+        batch.clear()
+
+    mass = None
+    for particle_group in particle_groups:
+        if particle_group.n_particle == 0:
+            raise ValueError("Slice statistics of an empty particle group.")
+        if slice_key is None:
+            slice_key = "z" if np.ptp(particle_group.t) == 0 else "t"
+        mass = particle_group.mass
+        columns, group_means = _columns(particle_group, slice_key, planes)
+        labels, ptp = _slices(columns[slice_key], n_slice)
+        batch.append((columns, labels))
+        means.append(group_means)
+        ptps.append(ptp)
+        extents.append(np.ptp(columns[slice_key]))
+        if sum(group_labels.size for _, group_labels in batch) >= BATCH_SIZE:
+            flush()
+    if len(batch) > 0:
+        flush()
+    if len(batches) == 0:
+        raise ValueError("Slice statistics of no particle groups.")
+
+    sums = {key: np.concatenate([sums[key] for sums in batches]) for key in batches[0]}
+    means = {key: np.array([group_means[key] for group_means in means]) for key in means[0]}
+    ptp = np.array(ptps)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        data = _statistics(sums, {key: value[:, None] for key, value in means.items()}, mass, planes)
+        data[f"mean_{slice_key}"] = sums["w" + slice_key] / sums["w"] + means[slice_key][:, None]
+        data[f"ptp_{slice_key}"] = ptp
+        data["charge"] = sums["w"]
+        data["current" if slice_key == "t" else "density"] = sums["w"] / ptp
+
+        bunch_sums = {key: value.sum(axis=1) for key, value in sums.items()}
+        bunch = _statistics(bunch_sums, means, mass, planes)
+        bunch = {f"{key}_{x}": bunch[f"twiss_{key}_{x}"] for x in planes for key in TWISS_KEYS}
+        bunch[f"mean_{slice_key}"] = bunch_sums["w" + slice_key] / bunch_sums["w"] + means[slice_key]
+        bunch[f"ptp_{slice_key}"] = np.array(extents)
+
+    return data, bunch
+
+
+def slice_statistics(particle_group: ParticleGroup, n_slice: int, slice_key: str | None = None,
+                     planes: str = "xy") -> tuple[dict[str, np.ndarray], dict[str, float]]:
+    """
+    Vectorized counterpart of ParticleGroup.slice_statistics('norm_emit_x', 'norm_emit_y', 'twiss_xy') and of
+    particle_twiss_dispersion for the whole bunch. Particles are sorted once and binned into slices of equal
+    particle count, the moments of all slices are accumulated with np.bincount instead of building a
+    ParticleGroup per slice. The moments of the bunch are the sums over the slices.
+
+    :return: Arrays over the slices under the keys of pmd_beamphysics, i.e. 'mean_z', 'ptp_z', 'charge',
+        'density', 'norm_emit_x', 'twiss_beta_x' etc., and the Twiss parameters, mean and extent of the bunch
+        under the keys of particle_twiss_dispersion, e.g. 'beta_x', and 'mean_z' and 'ptp_z'.
+    """
+    data, bunch = batch_slice_statistics([particle_group], n_slice, slice_key, planes)
+
+    return {key: value[0] for key, value in data.items()}, {key: float(value[0]) for key, value in bunch.items()}
@@ -1,72 +1,283 @@
 import numpy as np
 import json
+import bisect
+import itertools
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
 from pmd_beamphysics import ParticleGroup
-from pmd_beamphysics.statistics import particle_twiss_dispersion
-from astra_web.generator.schemas.particles import Particles
-from astra_web.simulation.schemas.io import StatisticsInput, StatisticsOutput
-from astra_web.utils import SIMULATION_DATA_PATH
+from astra_web.generator.schemas.particles import Particles, ParticleSelection
+from astra_web.simulation.schemas.io import StatisticsInput, StatisticsOutput, StatisticsEvolutionInput, \
+    StatisticsEvolution, HistogramInput, HistogramOutput
+from astra_web.utils import get_env_var, SIMULATION_DATA_PATH
+from astra_web.scheduler import CORE_BUDGET
+from astra_web.simulation import slices
+from astra_web.simulation.simulation import checkpoints, read_checkpoint, reference_z
+from astra_web.simulation.scratch import run_path
+from astra_web.simulation.statistics_cache import load_statistics, store_statistics, signature, recall, remember
 
 C = 299792458
 M0 = 9.10938356e-31
+# number of processes computing the statistics of several simulations in parallel
+STATISTICS_WORKERS = int(get_env_var("STATISTICS_WORKERS") or CORE_BUDGET)
 
+# worker processes are spawned, since forking would copy the threads of the API in an arbitrary state
+_executor = ProcessPoolExecutor(max_workers=STATISTICS_WORKERS, mp_context=get_context("spawn"))
 
-def get_statistics(sim_id: str, n_slices: int, particles: Particles) -> StatisticsOutput:
+
+def _inputs(sim_id: str) -> dict:
     with open(f"{SIMULATION_DATA_PATH}/{sim_id}/input.json", 'r') as f:
-        sim_input = json.load(f)
+        return json.load(f)
+
+
+def _particle_counts(particles: Particles) -> dict:
+    return {
+        'total': particles.x.size,
+        'active': int(np.count_nonzero(particles.active_particles)),
+        'lost': int(np.count_nonzero(particles.lost_particles))}
+
 
+def get_statistics(sim_id: str, n_slices: int, particles: Particles) -> StatisticsOutput:
     particle_group = particles.to_pmd(only_active=True)
     try:
-        slice_data = sl_emittance(particle_group, n_slices)
-        z_pos = particle_group.avg("z")
-        ptp_z = particle_group.ptp("z")
+        statistics = sl_emittance(particle_group, n_slices)
     except (ZeroDivisionError, ValueError) as e:
-        print(f"Calculation of slice statistics for sim {sim_id} raised {type(e)}. Message: {e}")
-        z_pos = particles.z[0]
-        ptp_z = max(particles.z) - min(particles.z)
-        slice_data = {}
+        statistics = {'z_pos': particles.z[0], 'ptp_z': np.ptp(particles.z) * 1e3,
+                      'error': f"Calculation of slice statistics raised {type(e).__name__}: {e}"}
 
     return StatisticsOutput(
-        z_pos=z_pos,
-        ptp_z=ptp_z * 1e3,
-        inputs=sim_input,
+        inputs=_inputs(sim_id),
+        sim_id=sim_id,
+        particle_counts=_particle_counts(particles),
+        **statistics
+    )
+
+
+def _stack(outputs: list[StatisticsOutput | None]) -> dict:
+    """
+    Fields of StatisticsEvolution from the statistics of single checkpoints, NaN for checkpoints without.
+    """
+    present = [output for output in outputs if output is not None]
+    if len(present) == 0:
+        return {}
+    stacked = {}
+    for key in ['z_pos', 'ptp_z', 'slice_zs', 'slice_emittances', 'slice_densities', 'slice_mismatch', 'slice_twiss',
+                'bunch_twiss']:
+        missing = np.full(np.shape(getattr(present[0], key)), np.nan)
+        stacked[key] = np.array([missing if output is None else getattr(output, key) for output in outputs]).tolist()
+
+    return stacked
+
+
+def get_statistics_evolution(sim_id: str, n_slices: int, run_dir: str, names: list[str]) -> StatisticsEvolution:
+    """
+    Statistics of several checkpoints of a run. Statistics persisted before are reused, the slice moments of all
+    other checkpoints are accumulated in batches, see slices.batch_slice_statistics. Checkpoints without active
+    particles yield NaN, errors of the calculation are raised.
+    """
+    inputs = _inputs(sim_id)
+    outputs = {name: load_statistics(sim_id, run_dir, name, n_slices) for name in names}
+    particle_counts = {name: output.particle_counts for name, output in outputs.items() if output is not None}
+    sources, active = {}, []
+
+    def particle_groups():
+        for name in [name for name in names if outputs[name] is None]:
+            sources[name] = signature(run_dir, name)
+            particles = read_checkpoint(run_dir, name)
+            particle_counts[name] = _particle_counts(particles)
+            if particle_counts[name]['active'] > 0:
+                active.append(name)
+                yield particles.to_pmd(only_active=True)
+
+    groups = particle_groups()
+    # nothing is computed if the statistics of all checkpoints holding active particles are persisted
+    if (first := next(groups, None)) is not None:
+        statistics = _slice_output(*slices.batch_slice_statistics(itertools.chain([first], groups), n_slices,
+                                                                  slice_key="z"))
+        for idx, name in enumerate(active):
+            outputs[name] = StatisticsOutput(inputs=inputs, sim_id=sim_id, particle_counts=particle_counts[name],
+                                             **{key: value[idx] for key, value in statistics.items()})
+            store_statistics(run_dir, name, n_slices, outputs[name], sources[name])
+    error = None
+    if len(names) > 0 and all(output is None for output in outputs.values()):
+        error = "None of the checkpoints holds active particles."
+
+    return StatisticsEvolution(
+        inputs=inputs,
         sim_id=sim_id,
-        particle_counts={
-            'total': len(particles.x),
-            'active': int(sum(particles.active_particles)),
-            'lost': int(sum(particles.lost_particles))},
-        **slice_data
+        checkpoints=names,
+        particle_counts=[particle_counts[name] for name in names],
+        error=error,
+        **_stack([outputs[name] for name in names])
     )
 
-def mismatch(p_group, slice_data):
-    twiss = particle_twiss_dispersion(p_group, plane="x")
-    twiss.update(particle_twiss_dispersion(p_group, plane="y"))
+
+def get_interpolated_statistics(sim_id: str, n_slices: int, run_dir: str, z_pos: float) -> StatisticsOutput:
+    """
+    Statistics at z_pos, linearly interpolated between the two checkpoints whose reference particles enclose it.
+    """
+    names = checkpoints(run_dir)
+    positions = [reference_z(run_dir, name) for name in names]
+    if len(names) == 0:
+        raise FileNotFoundError(f"Simulation '{sim_id}' has no particle output.")
+    if not positions[0] <= z_pos <= positions[-1]:
+        raise ValueError(f"z_pos={z_pos} is outside of the checkpoints of simulation '{sim_id}'.")
+    upper = bisect.bisect_left(positions, z_pos)
+    lower = upper if positions[upper] == z_pos else upper - 1
+    fraction = 0.0 if lower == upper else (z_pos - positions[lower]) / (positions[upper] - positions[lower])
+
+    evolution = get_statistics_evolution(sim_id, n_slices, run_dir, names[lower:upper + 1])
+    data = evolution.model_dump(exclude={'sim_id', 'inputs', 'checkpoints', 'particle_counts', 'error'})
+    statistics = {key: ((1 - fraction) * np.asarray(value[0]) + fraction * np.asarray(value[-1])).tolist()
+                  for key, value in data.items() if len(value) > 0}
+    counts = evolution.particle_counts
+    particle_counts = {key: round((1 - fraction) * counts[0][key] + fraction * counts[-1][key]) for key in counts[0]}
+
+    return StatisticsOutput(inputs=evolution.inputs, sim_id=sim_id, particle_counts=particle_counts,
+                            error=evolution.error, **statistics)
+
+
+def checkpoint_statistics(sim_id: str, n_slices: int, run_dir: str, name: str) -> StatisticsOutput:
+    """
+    Statistics of a checkpoint, persisted ones if the checkpoint has not changed since.
+    """
+    if (statistics := load_statistics(sim_id, run_dir, name, n_slices)) is not None:
+        return statistics
+
+    source = signature(run_dir, name)
+    statistics = get_statistics(sim_id, n_slices, read_checkpoint(run_dir, name))
+    if statistics.error is None:
+        store_statistics(run_dir, name, n_slices, statistics, source)
+
+    return statistics
+
+
+def _last_statistics(sim_id: str, n_slices: int, run_dir: str, z_pos: float | None) -> StatisticsOutput:
+    if z_pos is not None:
+        return get_interpolated_statistics(sim_id, n_slices, run_dir, z_pos)
+    names = checkpoints(run_dir)
+    if len(names) == 0:
+        raise FileNotFoundError(f"Simulation '{sim_id}' has no particle output.")
+
+    return checkpoint_statistics(sim_id, n_slices, run_dir, names[-1])
+
+
+def _statistics_evolution(sim_id: str, n_slices: int, run_dir: str, indices: list[int] | None) -> StatisticsEvolution:
+    names = checkpoints(run_dir)
+    selection = ParticleSelection(checkpoints=indices)
+
+    return get_statistics_evolution(sim_id, n_slices, run_dir,
+                                    [names[idx] for idx in selection.checkpoint_indices(len(names))])
+
+
+def _report_errors(compute, model_cls, sim_id: str, *args):
+    """
+    Runs in a worker process. Failures are reported in the error field of the result instead of being raised,
+    so they concern only the simulation they occurred for.
+    """
+    try:
+        return compute(sim_id, *args)
+    except Exception as e:
+        return model_cls(sim_id=sim_id, error=f"{type(e).__name__}: {e}")
+
+
+def submit_simulation_statistics(sim_id: str, n_slices: int, z_pos: float | None = None) -> Future:
+    """
+    Computes the statistics of the last checkpoint of a simulation, or at z_pos, in the pool of statistics workers.
+    Statistics of an unchanged checkpoint are answered from memory or from the statistics persisted in the run.
+
+    :return: A future resolving to a StatisticsOutput, holding an error message if they cannot be calculated.
+    """
+    run_dir = run_path(sim_id)
+    if z_pos is not None or len(names := checkpoints(run_dir)) == 0:
+        return _executor.submit(_report_errors, _last_statistics, StatisticsOutput, sim_id, n_slices, run_dir, z_pos)
+
+    source = signature(run_dir, names[-1])
+    if (statistics := recall(run_dir, names[-1], n_slices, source)) is not None:
+        future = Future()
+        future.set_result(statistics)
+        return future
+
+    def remember_result(future: Future) -> None:
+        if not future.cancelled() and future.exception() is None and future.result().error is None:
+            remember(run_dir, names[-1], n_slices, source, future.result())
+
+    future = _executor.submit(_report_errors, _last_statistics, StatisticsOutput, sim_id, n_slices, run_dir, z_pos)
+    future.add_done_callback(remember_result)
+
+    return future
+
+
+def submit_statistics(statistics_input: StatisticsInput) -> list[Future]:
+    """
+    Computes the statistics of every simulation in a pool of STATISTICS_WORKERS processes. Statistics of the
+    last checkpoint are answered from memory if the checkpoint has not changed since they were computed, and
+    are persisted in the run directory by the workers.
+
+    :return: One future per simulation in the order of statistics_input.sim_ids, resolving to a StatisticsOutput.
+    """
+    return [submit_simulation_statistics(sim_id, statistics_input.n_slices, statistics_input.z_pos)
+            for sim_id in statistics_input.sim_ids]
+
+
+def submit_statistics_evolution(statistics_input: StatisticsEvolutionInput) -> list[Future]:
+    """
+    Same as submit_statistics for the statistics evolution of every simulation.
+    """
+    return [_executor.submit(_report_errors, _statistics_evolution, StatisticsEvolution, sim_id,
+                             statistics_input.n_slices, run_path(sim_id), statistics_input.checkpoints)
+            for sim_id in statistics_input.sim_ids]
+
+
+def submit_task(function, *args) -> Future:
+    """
+    Runs a module-level function in the pool of statistics workers.
+    """
+    return _executor.submit(function, *args)
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def mismatch(twiss, slice_data):
     betas = np.sqrt(slice_data["twiss_beta_y"] * slice_data["twiss_beta_x"])
     alphas = np.sign(slice_data["twiss_alpha_x"])*np.sign(slice_data["twiss_alpha_y"])*np.sqrt(np.abs(slice_data["twiss_alpha_x"] * slice_data["twiss_alpha_y"]))
     gammas = np.sqrt(slice_data["twiss_gamma_x"] * slice_data["twiss_gamma_y"])
     alpha_0 = np.sign(twiss['alpha_x'])*np.sign(twiss["alpha_y"])*np.sqrt(np.abs(twiss['alpha_x'] * twiss["alpha_y"]))
     beta_0 = np.sqrt(twiss['beta_x'] * twiss["beta_y"])
     gamma_0 = np.sqrt(twiss['gamma_x'] * twiss["gamma_y"])
+    bunch_twiss = np.stack([alpha_0, beta_0, gamma_0, np.sqrt(twiss["norm_emit_x"] * twiss["norm_emit_y"]) * 1e6], axis=-1)
+    # bunch parameters of several bunches broadcast along the slices
+    alpha_0, beta_0, gamma_0 = (np.expand_dims(value, -1) for value in [alpha_0, beta_0, gamma_0])
 
-    return (np.vstack([alphas, betas, gammas]).tolist(),
-            (alpha_0, beta_0, gamma_0, np.sqrt(twiss["norm_emit_x"] * twiss["norm_emit_y"]) * 1e6),
+    return (np.stack([alphas, betas, gammas], axis=-2),
+            bunch_twiss,
             0.5 * (beta_0*gammas - 2*alpha_0*alphas + gamma_0*betas))
 
-def sl_emittance(particle_group: ParticleGroup, n_slice):
-    slice_data = particle_group.slice_statistics("norm_emit_x", "norm_emit_y", "twiss_xy", n_slice=n_slice)
-    slice_zs = (slice_data['mean_z'] - particle_group.avg("z")) * 1e3
+def _slice_output(slice_data: dict, twiss: dict) -> dict:
+    """
+    Fields of StatisticsOutput from the slice statistics of one bunch, or of StatisticsEvolution from those of
+    several bunches stacked along a first axis.
+    """
+    slice_zs = (slice_data['mean_z'] - np.expand_dims(twiss['mean_z'], -1)) * 1e3
     slice_densities = slice_data['density']
     emittances = np.sqrt(slice_data["norm_emit_x"] * slice_data["norm_emit_y"]) * 1e6
-    slice_twiss, bunch_twiss, slice_mismatch = mismatch(particle_group, slice_data)
+    slice_twiss, bunch_twiss, slice_mismatch = mismatch(twiss, slice_data)
 
     return {
-        "slice_zs": slice_zs,
-        "slice_emittances": emittances,
-        "slice_densities": slice_densities,
-        "slice_mismatch": slice_mismatch,
-        "slice_twiss": slice_twiss,
-        "bunch_twiss": bunch_twiss
+        "z_pos": np.asarray(twiss['mean_z']).tolist(),
+        "ptp_z": (np.asarray(twiss['ptp_z']) * 1e3).tolist(),
+        "slice_zs": slice_zs.tolist(),
+        "slice_emittances": emittances.tolist(),
+        "slice_densities": slice_densities.tolist(),
+        "slice_mismatch": slice_mismatch.tolist(),
+        "slice_twiss": slice_twiss.tolist(),
+        "bunch_twiss": bunch_twiss.tolist()
     }
 
+def sl_emittance(particle_group: ParticleGroup, n_slice):
+    return _slice_output(*slices.slice_statistics(particle_group, n_slice, slice_key="z"))
+
 
 
 def slice_emittance(particles: Particles, n_slices: 20) -> list[tuple[float, float]]:
@@ -87,11 +298,11 @@ def slice_emittance(particles: Particles, n_slices: 20) -> list[tuple[float, flo
 
 def active_data(particles: Particles):
     active = particles.active_particles
-    x = np.array(particles.x)[active]
-    px = np.array(particles.px)[active]
-    y = np.array(particles.y)[active]
-    py = np.array(particles.py)[active]
-    z = np.array(particles.z)[active]
+    x = particles.x[active]
+    px = particles.px[active]
+    y = particles.y[active]
+    py = particles.py[active]
+    z = particles.z[active]
     z[1:] = z[0] + z[1:]
 
     return x, px, y, py, z
@@ -108,3 +319,48 @@ def projected_emittance(x, p) -> float:
 
     return eps
 
+
+def histogram_columns(histogram_input: HistogramInput) -> list[str]:
+    """
+    Particle attributes which have to be read to compute the requested histogram.
+    """
+    coordinates = [c for c in [histogram_input.x, histogram_input.y] if c is not None]
+    return ['t_clock' if c == 't' else c for c in coordinates] + ['macro_charge', 'status']
+
+
+def _axis_range(values: np.ndarray, lower: float | None, upper: float | None) -> tuple[float, float]:
+    """
+    Range of a histogram axis, edges not given are the extrema of the values. An edge derived on the wrong side
+    of the given one, e.g. if all values are below a given lower edge, is placed one unit beyond the given one.
+    """
+    if lower is None and upper is None:
+        return (values.min(), values.max()) if values.size > 0 else (0.0, 1.0)
+    if lower is None:
+        return (values.min() if values.size > 0 and values.min() < upper else upper - 1.0), upper
+    if upper is None:
+        return lower, (values.max() if values.size > 0 and values.max() > lower else lower + 1.0)
+
+    return lower, upper
+
+
+def histogram(particles: Particles, histogram_input: HistogramInput) -> HistogramOutput:
+    """
+    Computes a one- or two-dimensional histogram of particle coordinates. Coordinates are shifted by the
+    reference particle in the same way as in Particles.to_pmd.
+    """
+    mask = particles.active_particles if histogram_input.only_active else slice(None)
+    weights = np.abs(particles.macro_charge[mask]) * 1e-9 if histogram_input.weighted else None
+    x = particles.coordinate(histogram_input.x)[mask]
+    x_range = _axis_range(x, histogram_input.x_min, histogram_input.x_max)
+
+    if histogram_input.y is None:
+        counts, x_edges = np.histogram(x, bins=histogram_input.bins_x, range=x_range, weights=weights)
+        return HistogramOutput(coordinates=[histogram_input.x], counts=counts.tolist(), edges=[x_edges])
+
+    y = particles.coordinate(histogram_input.y)[mask]
+    y_range = _axis_range(y, histogram_input.y_min, histogram_input.y_max)
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=[histogram_input.bins_x, histogram_input.bins_y],
+                                              range=[x_range, y_range], weights=weights)
+
+    return HistogramOutput(coordinates=[histogram_input.x, histogram_input.y], counts=counts.tolist(),
+                           edges=[x_edges, y_edges])
@@ -0,0 +1,115 @@
+import os
+import logging
+import json
+from collections import OrderedDict
+from threading import Lock
+from astra_web.utils import get_env_var, get_env_flag, temporary_path
+from .schemas.io import StatisticsOutput
+from .simulation import checkpoint_source
+
+logger = logging.getLogger(__name__)
+
+# persists the statistics of every checkpoint and number of slices in a '.statistics' folder of the run
+STATISTICS_CACHE = get_env_flag("STATISTICS_CACHE", default=True)
+# number of statistics kept in memory by the API process
+STATISTICS_CACHE_ENTRIES = int(get_env_var("STATISTICS_CACHE_ENTRIES") or 1024)
+STATISTICS_FOLDER = ".statistics"
+
+_memory: OrderedDict[tuple[str, str, int], tuple[tuple, StatisticsOutput]] = OrderedDict()
+_lock = Lock()
+
+
+def signature(run_dir: str, name: str) -> tuple | None:
+    """
+    Identifies the state of the file holding a checkpoint by its name, modification time and size. None if the
+    checkpoint does not exist.
+    """
+    source = checkpoint_source(run_dir, name)
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+
+    return os.path.basename(source), stat.st_mtime_ns, stat.st_size
+
+
+def _path(run_dir: str, name: str, n_slices: int) -> str:
+    return os.path.join(run_dir, STATISTICS_FOLDER, f"{name}.{n_slices}.json")
+
+
+def load_statistics(sim_id: str, run_dir: str, name: str, n_slices: int) -> StatisticsOutput | None:
+    """
+    Statistics of a checkpoint persisted by store_statistics, None if there are none or the checkpoint has
+    changed since.
+    """
+    path = _path(run_dir, name, n_slices)
+    if not STATISTICS_CACHE or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+        statistics = StatisticsOutput.model_validate(entry["statistics"])
+    except (OSError, ValueError, KeyError):
+        return None
+    # runs restored from the result cache hold the statistics of the run they were copied from
+    if tuple(entry["source"]) != signature(run_dir, name) or statistics.sim_id != sim_id:
+        return None
+
+    return statistics
+
+
+def store_statistics(run_dir: str, name: str, n_slices: int, statistics: StatisticsOutput,
+                     source: tuple | None = None) -> None:
+    """
+    Persists the statistics of a checkpoint together with the signature of the checkpoint, by default its
+    current one.
+    """
+    source = source or signature(run_dir, name)
+    if not STATISTICS_CACHE or source is None:
+        return
+    path = _path(run_dir, name, n_slices)
+    tmp_path = temporary_path(path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump({"source": source, "statistics": statistics.model_dump()}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # the cache is an optimization only
+        logger.warning("Caching the statistics of %s of sim %s failed: %s", name, statistics.sim_id, e)
+
+
+def recall(run_dir: str, name: str, n_slices: int, source: tuple | None) -> StatisticsOutput | None:
+    """
+    Statistics of a checkpoint held in memory, if the checkpoint still has the given signature.
+    """
+    with _lock:
+        entry = _memory.get((run_dir, name, n_slices))
+        if entry is None or source is None or entry[0] != source:
+            return None
+        _memory.move_to_end((run_dir, name, n_slices))
+
+    return entry[1]
+
+
+def remember(run_dir: str, name: str, n_slices: int, source: tuple | None, statistics: StatisticsOutput) -> None:
+    """
+    Keeps the statistics of a checkpoint in memory, dropping the least recently used ones beyond
+    STATISTICS_CACHE_ENTRIES.
+    """
+    if source is None or STATISTICS_CACHE_ENTRIES <= 0:
+        return
+    with _lock:
+        _memory[(run_dir, name, n_slices)] = (source, statistics)
+        _memory.move_to_end((run_dir, name, n_slices))
+        while len(_memory) > STATISTICS_CACHE_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def forget(run_dir: str) -> None:
+    """
+    Drops the statistics of a run from memory, e.g. when it is deleted.
+    """
+    with _lock:
+        for key in [key for key in _memory if key[0] == run_dir]:
+            del _memory[key]
@@ -0,0 +1,99 @@
+import os
+import logging
+import numpy as np
+from concurrent.futures import Future
+from datetime import datetime
+from astra_web.utils import get_env_var, temporary_path
+from .schemas.io import SimulationSummary, Extremum
+from .simulation import checkpoints, load_emittance_output
+from .statistics import checkpoint_statistics, get_statistics_evolution, submit_task
+from .statistics_cache import STATISTICS_CACHE
+
+logger = logging.getLogger(__name__)
+
+# checkpoints summarized after every run: 'final', 'all' or 'none'
+SIMULATION_SUMMARY = (get_env_var("SIMULATION_SUMMARY") or "final").lower()
+# number of slices of the summarized statistics, the statistics cache answers requests with the same number
+SUMMARY_SLICES = int(get_env_var("SUMMARY_SLICES") or 20)
+SUMMARY_FILE = "summary.json"
+
+
+def summary_path(run_dir: str) -> str:
+    return os.path.join(run_dir, SUMMARY_FILE)
+
+
+def _extrema(z: np.ndarray, values: np.ndarray) -> Extremum:
+    lower, upper = int(np.argmin(values)), int(np.argmax(values))
+
+    return Extremum(min=values[lower], z_min=z[lower], max=values[upper], z_max=z[upper], final=values[-1])
+
+
+def _emittance_extrema(run_dir: str) -> dict[str, dict[str, Extremum]]:
+    extrema = {}
+    for coordinate, table in zip(['x', 'y', 'z'], load_emittance_output(run_dir)):
+        if table is not None and table.z.size > 0:
+            extrema[coordinate] = {column: _extrema(table.z, getattr(table, column))
+                                   for column in ['emittance', 'position_rms']}
+
+    return extrema
+
+
+def summarize_run(sim_id: str, run_dir: str, mode: str = SIMULATION_SUMMARY,
+                  n_slices: int = SUMMARY_SLICES) -> SimulationSummary:
+    """
+    Computes the summary of a finished run, i.e. the statistics of its final or of every checkpoint and the
+    extrema of its emittance tables, and writes it to summary.json in the run directory. The statistics are
+    persisted in the statistics cache as well.
+    """
+    names = checkpoints(run_dir)
+    selected = names if mode == "all" else names[-1:]
+    summary = SimulationSummary(sim_id=sim_id, created=datetime.now(), checkpoints=names)
+    try:
+        if STATISTICS_CACHE and len(selected) > 1:
+            # fills the statistics cache of all checkpoints in one batched pass
+            get_statistics_evolution(sim_id, n_slices, run_dir, selected)
+        summary.statistics = {name: checkpoint_statistics(sim_id, n_slices, run_dir, name).model_copy(
+            update={'inputs': {}}) for name in selected}
+        summary.emittance = _emittance_extrema(run_dir)
+    except Exception as e:
+        summary.error = f"{type(e).__name__}: {e}"
+
+    path = summary_path(run_dir)
+    tmp_path = temporary_path(path)
+    with open(tmp_path, "w") as f:
+        f.write(summary.model_dump_json())
+    os.replace(tmp_path, path)
+
+    return summary
+
+
+def load_summary(sim_id: str, run_dir: str) -> SimulationSummary | None:
+    path = summary_path(run_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            summary = SimulationSummary.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+    # runs restored from the result cache hold the summary of the run they were copied from
+    return summary if summary.sim_id == sim_id else None
+
+
+def _summarize(sim_id: str, run_dir: str) -> SimulationSummary | None:
+    try:
+        return summarize_run(sim_id, run_dir, SIMULATION_SUMMARY if SIMULATION_SUMMARY != "none" else "final")
+    except OSError as e:
+        # the run may have been deleted in the meantime
+        logger.warning("Summarizing sim %s failed: %s", sim_id, e)
+        return None
+
+
+def submit_summary(run_dir: str) -> Future:
+    """
+    Summarizes a run in the pool of statistics workers.
+
+    :return: A future resolving to the summary, None if it could not be written.
+    """
+    return submit_task(_summarize, os.path.basename(run_dir), run_dir)
@@ -0,0 +1,65 @@
+import os
+import glob
+import numpy as np
+from astra_web.utils import get_env_flag, temporary_path
+from .parser import read_columns
+from .compression import SUFFIXES, resolve
+
+SIDECAR_CACHE = get_env_flag("SIDECAR_CACHE", default=True)
+SIDECAR_DIR = ".cache"
+
+
+def _sidecar_prefix(filename: str) -> str:
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, SIDECAR_DIR, name)
+
+
+def sidecar_path(filename: str) -> str:
+    """
+    Path of the binary twin of an ASTRA file. The name encodes size and modification time of the
+    source file, so a changed source never matches an outdated twin.
+    """
+    stat = os.stat(filename)
+    return f"{_sidecar_prefix(filename)}.{stat.st_size}-{stat.st_mtime_ns}.npy"
+
+
+def remove_sidecars(filename: str) -> None:
+    for name in [filename] + [filename + suffix for suffix in SUFFIXES.values()]:
+        for path in glob.glob(f"{glob.escape(_sidecar_prefix(name))}.*.npy"):
+            os.remove(path)
+
+
+def _write_sidecar(path: str, filename: str, columns: np.ndarray) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        remove_sidecars(filename)
+        tmp_path = temporary_path(path)
+        with open(tmp_path, "wb") as f:
+            np.save(f, columns)
+        os.replace(tmp_path, path)
+    except OSError:
+        # the cache is an optimization only, e.g. read-only data volumes are still served
+        pass
+
+
+def cached_columns(filename: str, n_columns: int) -> np.ndarray:
+    """
+    Same as read_columns, but the parsed columns are stored in a .npy twin next to the source file.
+    Subsequent calls memory-map the twin instead of parsing the text file again.
+    """
+    if not SIDECAR_CACHE:
+        return read_columns(filename, n_columns)
+
+    filename = resolve(filename)
+    path = sidecar_path(filename)
+    try:
+        columns = np.load(path, mmap_mode="r")
+        if columns.shape[0] == n_columns:
+            return columns
+    except (OSError, ValueError):
+        pass
+
+    columns = read_columns(filename, n_columns)
+    _write_sidecar(path, filename, columns)
+
+    return columns
@@ -0,0 +1,93 @@
+import io
+import os
+import gzip
+import shutil
+from typing import TextIO
+from astra_web.utils import get_env_var, temporary_path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 'none' keeps finished runs as written by ASTRA, 'zstd' or 'gzip' compress their particle and emittance files
+SIMULATION_COMPRESSION = get_env_var("SIMULATION_COMPRESSION") or "none"
+SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+_ZSTD_LEVEL = 3
+_GZIP_LEVEL = 4
+
+
+def codec(name: str) -> str | None:
+    """
+    Codec used for the given setting. zstd falls back to gzip if the zstandard package is not installed.
+    """
+    if name == "zstd" and zstandard is None:
+        return "gzip"
+    return name if name in SUFFIXES else None
+
+
+def resolve(path: str) -> str:
+    """
+    Returns the path of the file actually stored for path, i.e. path itself or its compressed variant.
+    Paths that exist in neither form are returned unchanged.
+    """
+    if os.path.exists(path):
+        return path
+    for suffix in SUFFIXES.values():
+        if os.path.exists(path + suffix):
+            return path + suffix
+
+    return path
+
+
+def exists(path: str) -> bool:
+    return os.path.exists(resolve(path))
+
+
+def strip_suffix(path: str) -> str:
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+
+    return path
+
+
+def open_text(path: str) -> TextIO:
+    """
+    Opens path or its compressed variant for reading text, decompressing on the fly.
+    """
+    path = resolve(path)
+    if path.endswith(SUFFIXES["gzip"]):
+        return gzip.open(path, "rt")
+    if path.endswith(SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise OSError(f"Reading '{path}' requires the zstandard package.")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+
+    return open(path, "r")
+
+
+def compress_file(path: str, name: str) -> tuple[int, int]:
+    """
+    Replaces a file by its compressed variant, keeping the modification time.
+
+    :param path: Path of the uncompressed file.
+    :param name: Codec setting, 'zstd' or 'gzip'.
+    :return: Sizes of the file before and after compression in bytes.
+    """
+    name = codec(name)
+    target = path + SUFFIXES[name]
+    # the temporary name does not match any reader pattern, so concurrent reads never see partial files
+    tmp_path = temporary_path(os.path.join(os.path.dirname(path), f".{os.path.basename(target)}"))
+    with open(path, "rb") as source, open(tmp_path, "wb") as f:
+        if name == "zstd":
+            zstandard.ZstdCompressor(level=_ZSTD_LEVEL).copy_stream(source, f)
+        else:
+            with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=_GZIP_LEVEL, mtime=0) as compressed:
+                shutil.copyfileobj(source, compressed)
+    shutil.copystat(path, tmp_path)
+    os.replace(tmp_path, target)
+    size = os.path.getsize(path)
+    os.remove(path)
+
+    return size, os.path.getsize(target)
@@ -0,0 +1,202 @@
+import os
+import time
+import json
+import shutil
+from threading import Lock
+from pydantic import BaseModel, Field
+from astra_web.utils import temporary_path
+
+
+class ContentStoreStatus(BaseModel):
+    entries: int = Field(
+        description='Number of cached entries.'
+    )
+    size: int = Field(
+        description='Total size of the cached entries.',
+        json_schema_extra={'format': 'Unit: [B]'}
+    )
+    hits: int = Field(
+        description='Number of lookups answered from the cache since the start of the API.'
+    )
+    misses: int = Field(
+        description='Number of lookups not found in the cache since the start of the API.'
+    )
+    hit_rate: float = Field(
+        description='Fraction of lookups answered from the cache.'
+    )
+    evictions: int = Field(
+        description='Number of entries evicted since the start of the API.'
+    )
+
+
+def file_digest(hash_, path: str, chunk_size: int = 1 << 20) -> None:
+    """
+    Feeds the content of a file into a hashlib object.
+    """
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hash_.update(chunk)
+
+
+def link_tree(source: str, target: str) -> int:
+    """
+    Replicates a directory by hard links, falling back to copies across file systems. Symbolic links are
+    recreated as such.
+
+    :return: Total size of the replicated files in bytes.
+    """
+    size = 0
+    os.makedirs(target, exist_ok=True)
+    for entry in os.scandir(source):
+        path = os.path.join(target, entry.name)
+        if entry.is_symlink():
+            os.symlink(os.readlink(entry.path), path)
+        elif entry.is_dir():
+            size += link_tree(entry.path, path)
+        else:
+            try:
+                os.link(entry.path, path)
+            except OSError:
+                shutil.copy2(entry.path, path)
+            size += entry.stat().st_size
+
+    return size
+
+
+def link_files(files: dict[str, str], target: str) -> int:
+    """
+    Same as link_tree for single files, given as mapping of target names to source paths.
+    """
+    size = 0
+    os.makedirs(target, exist_ok=True)
+    for name, source in files.items():
+        path = os.path.join(target, name)
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copy2(source, path)
+        size += os.path.getsize(path)
+
+    return size
+
+
+class ContentStore:
+    """
+    Directory based, content-addressed store. Every entry is a directory named by a key, usually a hash of the
+    inputs that produced it. Entries are replicated by hard links, so storing and restoring an entry does not
+    copy data on the same file system.
+    Entries older than max_age are dropped, and the least recently used entries are dropped as long as the
+    store exceeds max_size.
+    """
+    def __init__(self, root: str, max_size: int, max_age: float):
+        self.root = root
+        self.max_size = max_size
+        self.max_age = max_age
+        self._lock = Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def _read_meta(self, key: str) -> dict | None:
+        try:
+            with open(self._meta_path(key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove(self, key: str) -> None:
+        if os.path.exists(self._meta_path(key)):
+            os.remove(self._meta_path(key))
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def _entry(self, key: str) -> dict | None:
+        # called with the lock held
+        meta = self._read_meta(key)
+        if meta is not None and time.time() - meta["created"] > self.max_age:
+            self._remove(key)
+            self._stats["evictions"] += 1
+            meta = None
+        if meta is None or not os.path.isdir(self._path(key)):
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        # the modification time of the metadata tracks the last use
+        os.utime(self._meta_path(key))
+
+        return meta | {"path": self._path(key)}
+
+    def lookup(self, key: str) -> dict | None:
+        """
+        Returns the metadata of an entry, extended by its 'path', or None if there is no valid entry.
+        """
+        with self._lock:
+            return self._entry(key)
+
+    def restore(self, key: str, target: str, files: dict[str, str] | None = None) -> dict | None:
+        """
+        Replicates an entry into the directory target like link_tree, or only the files of the entry given as
+        mapping of target names to names in the entry like link_files. This process does not evict the entry
+        while it is replicated, removal by another process sharing the store raises an OSError.
+
+        :return: The metadata of the entry as returned by lookup, None if there is no valid entry.
+        """
+        with self._lock:
+            entry = self._entry(key)
+            if entry is not None and files is None:
+                link_tree(entry["path"], target)
+            elif entry is not None:
+                link_files({name: os.path.join(entry["path"], source) for name, source in files.items()}, target)
+
+        return entry
+
+    def store(self, key: str, source: str | dict[str, str], **meta) -> None:
+        """
+        Stores a copy of a directory, or of files given as mapping of names to paths, under key together
+        with arbitrary metadata.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = temporary_path(os.path.join(self.root, f".{key}"))
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        size = link_tree(source, tmp_path) if isinstance(source, str) else link_files(source, tmp_path)
+        with self._lock:
+            self._remove(key)
+            os.replace(tmp_path, self._path(key))
+            with open(self._meta_path(key), "w") as f:
+                json.dump(meta | {"size": size, "created": time.time()}, f)
+            self._evict()
+
+    def _entries(self) -> list[tuple[str, float, int, float]]:
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".json") and not name.startswith("."):
+                key = name[:-len(".json")]
+                meta = self._read_meta(key)
+                if meta is not None:
+                    entries.append((key, os.path.getmtime(self._meta_path(key)), meta["size"], meta["created"]))
+
+        return entries
+
+    def _evict(self) -> None:
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        size = sum(entry[2] for entry in entries)
+        for key, last_used, entry_size, created in entries:
+            if now - created > self.max_age or size > self.max_size:
+                self._remove(key)
+                self._stats["evictions"] += 1
+                size -= entry_size
+
+    def status(self) -> ContentStoreStatus:
+        with self._lock:
+            entries = self._entries() if os.path.isdir(self.root) else []
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return ContentStoreStatus(
+                entries=len(entries),
+                size=sum(entry[2] for entry in entries),
+                hit_rate=self._stats["hits"] / lookups if lookups > 0 else 0.0,
+                **self._stats
+            )
@@ -0,0 +1,49 @@
+import warnings
+import numpy as np
+from itertools import islice
+from typing import Iterator
+from .compression import open_text
+
+
+class EmptyFileError(ValueError):
+    pass
+
+
+def _parse(lines, filename: str, n_columns: int) -> np.ndarray:
+    with warnings.catch_warnings():
+        # empty input is reported by the callers via EmptyFileError
+        warnings.simplefilter("ignore", UserWarning)
+        table = np.loadtxt(lines, dtype=np.float64, ndmin=2)
+    if table.size > 0 and table.shape[1] != n_columns:
+        raise ValueError(f"Expected {n_columns} columns in '{filename}', found {table.shape[1]}.")
+
+    return table
+
+
+def read_columns(filename: str, n_columns: int) -> np.ndarray:
+    """
+    Parses an ASTRA output file consisting of whitespace separated numeric columns, e.g. particle
+    distributions (10 columns) or emittance tables (7 columns). Compressed variants of the file are read transparently.
+
+    :param filename: Path to the ASTRA file.
+    :param n_columns: Expected number of columns.
+    :return: C-contiguous float64 array of shape (n_columns, n_rows), i.e. every column is contiguous in memory.
+    """
+    with open_text(filename) as f:
+        table = _parse(f, filename, n_columns)
+    if table.size == 0:
+        raise EmptyFileError(f"File '{filename}' contains no data.")
+
+    return np.ascontiguousarray(table.T)
+
+
+def iter_columns(filename: str, n_columns: int, chunk_size: int = 100_000) -> Iterator[np.ndarray]:
+    """
+    Chunked variant of read_columns, parsing at most chunk_size lines at a time. Memory consumption is
+    bounded by the chunk size rather than by the file size.
+    """
+    with open_text(filename) as f:
+        while lines := list(islice(f, chunk_size)):
+            table = _parse(lines, filename, n_columns)
+            if table.size > 0:
+                yield np.ascontiguousarray(table.T)
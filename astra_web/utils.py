@@ -1,4 +1,5 @@
 import os
+import threading
 from dotenv import load_dotenv
 
 
@@ -18,4 +19,20 @@ SIMULATION_DATA_PATH = f"{DATA_PATH}{get_env_var('SIMULATION_DATA_PATH')}"
 
 
 def default_filename(timestamp) -> str:
-    return os.path.join(GENERATOR_DATA_PATH, timestamp)
\ No newline at end of file
+    return os.path.join(GENERATOR_DATA_PATH, timestamp)
+
+
+def temporary_path(path: str) -> str:
+    """
+    Path of a temporary file which is moved onto path with os.replace once it is complete. The path is unique per
+    process and thread, so concurrent writers of the same file never write to the same temporary file.
+    """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def get_env_flag(variable_name: str, default: bool = False) -> bool:
+    var = get_env_var(variable_name)
+    if var is None:
+        return default
+
+    return var.strip().lower() in ["1", "true", "yes", "on"]
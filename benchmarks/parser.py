@@ -0,0 +1,46 @@
+"""
+Compares the pandas based parsing of ASTRA particle files with the dedicated parser in astra_web.storage.parser.
+
+Run from the repository root:
+
+    python -m benchmarks.parser [n_lines]
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from astra_web.generator.schemas.particles import Particles
+from astra_web.storage.parser import iter_columns
+
+
+def write_particle_file(filename: str, n: int) -> None:
+    rng = np.random.default_rng(0)
+    table = np.column_stack([rng.normal(size=(n, 8)), np.ones(n), np.full(n, 5)])
+    np.savetxt(filename, table, fmt=['%20.12E'] * 8 + ['%4d', '%4d'])
+
+
+def pandas_read(filename: str) -> Particles:
+    df = pd.read_csv(filename, names=list(Particles.model_fields.keys()), sep=r"\s+")
+    return Particles(**{key: column.to_numpy() for key, column in df.items()})
+
+
+def chunked_read(filename: str) -> Particles:
+    return Particles.from_columns(np.concatenate(list(iter_columns(filename, 10)), axis=1))
+
+
+def main(n: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, "run.0100.001")
+        write_particle_file(filename, n)
+        print(f"{n} lines, {os.path.getsize(filename) / 2**20:.0f} MiB")
+        for name, read in [('pandas read_csv', pandas_read), ('read_columns', Particles.from_csv),
+                           ('iter_columns', chunked_read)]:
+            start = time.perf_counter()
+            read(filename)
+            print(f"{name:<20}{time.perf_counter() - start:>8.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
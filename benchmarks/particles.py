@@ -0,0 +1,95 @@
+"""
+Compares the list based particle model with the NumPy backed Particles model.
+
+Run from the repository root:
+
+    python -m benchmarks.particles
+"""
+import time
+import orjson
+import tracemalloc
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from astra_web.generator.schemas.particles import Particles
+
+
+class ListParticles(BaseModel):
+    x: list[float] = []
+    y: list[float] = []
+    z: list[float] = []
+    px: list[float] = []
+    py: list[float] = []
+    pz: list[float] = []
+    t_clock: list[float] | None = []
+    macro_charge: list[float] = []
+    species: list[int] | None = []
+    status: list[int] | None = []
+
+
+def columns(n: int) -> dict:
+    rng = np.random.default_rng(0)
+    data = {key: rng.normal(size=n) for key in ['x', 'y', 'z', 'px', 'py', 'pz', 't_clock', 'macro_charge']}
+    data['species'] = np.ones(n, dtype=np.int64)
+    data['status'] = np.full(n, 5, dtype=np.int64)
+
+    return data
+
+
+def measure(model_cls, payload: bytes) -> tuple[float, float, float]:
+    tracemalloc.start()
+    particles = model_cls.model_validate_json(payload)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del particles
+
+    start = time.perf_counter()
+    particles = model_cls.model_validate_json(payload)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    particles.model_dump_json()
+    dump_time = time.perf_counter() - start
+
+    return memory / 2**20, build_time, dump_time
+
+
+def measure_file(model_cls, df: pd.DataFrame) -> tuple[float, float]:
+    if model_cls is ListParticles:
+        build = lambda: model_cls(**df.to_dict("list"))
+    else:
+        build = lambda: model_cls(**{key: column.to_numpy() for key, column in df.items()})
+
+    tracemalloc.start()
+    particles = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del particles
+
+    start = time.perf_counter()
+    build()
+
+    return memory / 2**20, time.perf_counter() - start
+
+
+def main():
+    models = [('list[float]', ListParticles), ('numpy', Particles)]
+    print("JSON request body -> model -> JSON response")
+    print(f"{'model':<16}{'particles':>12}{'memory [MiB]':>16}{'parse [s]':>12}{'json [s]':>12}")
+    for n in [100_000, 1_000_000]:
+        payload = orjson.dumps({k: v.tolist() for k, v in columns(n).items()})
+        for name, model_cls in models:
+            memory, build_time, dump_time = measure(model_cls, payload)
+            print(f"{name:<16}{n:>12}{memory:>16.1f}{build_time:>12.3f}{dump_time:>12.3f}")
+
+    print("\nParsed particle file (DataFrame) -> model, as in Particles.from_csv")
+    print(f"{'model':<16}{'particles':>12}{'memory [MiB]':>16}{'build [s]':>12}")
+    for n in [100_000, 1_000_000]:
+        df = pd.DataFrame(columns(n))
+        for name, model_cls in models:
+            memory, build_time = measure_file(model_cls, df)
+            print(f"{name:<16}{n:>12}{memory:>16.1f}{build_time:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Compares the slice statistics of pmd_beamphysics, i.e. one ParticleGroup per slice, with the vectorized
+implementation in astra_web.simulation.slices, together with the largest relative deviation of their results.
+
+Run from the repository root:
+
+    python -m benchmarks.slice_statistics [n_particles] [n_slices]
+"""
+import sys
+import time
+import numpy as np
+from pmd_beamphysics import ParticleGroup
+from pmd_beamphysics.statistics import particle_twiss_dispersion
+from astra_web.simulation import slices
+from .to_pmd import particles
+
+
+def pmd_slice_statistics(particle_group: ParticleGroup, n_slice: int) -> tuple[dict, dict]:
+    twiss = particle_twiss_dispersion(particle_group, plane="x")
+    twiss.update(particle_twiss_dispersion(particle_group, plane="y"))
+
+    return particle_group.slice_statistics("norm_emit_x", "norm_emit_y", "twiss_xy", n_slice=n_slice), twiss
+
+
+def vectorized_slice_statistics(particle_group: ParticleGroup, n_slice: int) -> tuple[dict, dict]:
+    return slices.slice_statistics(particle_group, n_slice)
+
+
+def deviation(reference: dict, result: dict) -> float:
+    # pmd_beamphysics adds an uninitialized entry for the requested 'twiss_xy'
+    keys = [key for key in reference if key in result and key != 'twiss_xy']
+    return max(np.nanmax(np.abs(result[key] - reference[key]) / np.abs(reference[key])) for key in keys)
+
+
+def main(n: int, n_slice: int):
+    particle_group = particles(n).to_pmd(only_active=True)
+    print(f"{particle_group.n_particle} particles, {n_slice} slices")
+    print(f"{'implementation':<16}{'time [s]':>12}{'deviation':>14}")
+    reference = None
+    for name, compute in [('pmd', pmd_slice_statistics), ('vectorized', vectorized_slice_statistics)]:
+        start = time.perf_counter()
+        slice_data, twiss = compute(particle_group, n_slice)
+        duration = time.perf_counter() - start
+        reference = reference or (slice_data, twiss)
+        error = max(deviation(reference[0], slice_data), deviation(reference[1], twiss))
+        print(f"{name:<16}{duration:>12.3f}{error:>14.1e}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
@@ -0,0 +1,69 @@
+"""
+Compares the former pandas based Particles.to_pmd with the current NumPy implementation.
+Peak memory is given relative to the size of the particle distribution, i.e. as number of copies.
+
+Run from the repository root:
+
+    python -m benchmarks.to_pmd [n_particles]
+"""
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from pmd_beamphysics import ParticleGroup
+from astra_web.generator.schemas.particles import Particles
+
+
+def pandas_to_pmd(particles: Particles, ref=None, only_active=False) -> ParticleGroup:
+    data = pd.DataFrame(dict(particles))
+    ref = ref if ref is not None else data.iloc[0]
+
+    if only_active:
+        data = data[particles.active_particles]
+
+    data['weight'] = np.abs(data.pop('macro_charge')) * 1e-9
+    data.loc[1:, 'z'] = data.loc[1:, 'z'] + ref['z']
+    data.loc[1:, 'pz'] = data.loc[1:, 'pz'] + ref['pz']
+    data.loc[1:, 't_clock'] = (data.loc[1:, 't_clock'] + ref['t_clock']) * 1e-9
+    data.loc[data['status'] == 1, 'status'] = 2
+    data.loc[data['status'] == 5, 'status'] = 1
+
+    data_dict = data.to_dict('list')
+    data_dict['n_particles'] = data.size
+    data_dict['species'] = 'electron'
+    data_dict['t'] = ref['t_clock'] * 1e-9
+
+    return ParticleGroup(data=data_dict)
+
+
+def particles(n: int) -> Particles:
+    rng = np.random.default_rng(0)
+    status = np.full(n, 3)
+    status[0] = 5
+    status[rng.random(n) < 0.05] = -1
+
+    return Particles(**{key: rng.normal(size=n) for key in ['x', 'y', 'z', 'px', 'py', 'pz', 't_clock', 'macro_charge']},
+                     species=np.ones(n, dtype=np.int64), status=status)
+
+
+def main(n: int):
+    distribution = particles(n)
+    size = sum(column.nbytes for column in distribution.columns().values())
+    print(f"{n} particles, {size / 2**20:.0f} MiB")
+    print(f"{'implementation':<16}{'only_active':>12}{'time [s]':>12}{'peak / size':>14}")
+    for name, convert in [('pandas', pandas_to_pmd), ('numpy', Particles.to_pmd)]:
+        for only_active in [False, True]:
+            start = time.perf_counter()
+            convert(distribution, only_active=only_active)
+            duration = time.perf_counter() - start
+
+            tracemalloc.start()
+            convert(distribution, only_active=only_active)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{name:<16}{str(only_active):>12}{duration:>12.3f}{peak / size:>14.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
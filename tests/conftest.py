@@ -0,0 +1,121 @@
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = tempfile.mkdtemp(prefix="astra-web-tests-")
+
+# configured before astra_web is imported, data paths are given relative to the repository root
+os.environ |= {
+    "GENERATOR_DATA_PATH": "/" + os.path.relpath(os.path.join(DATA, "generator"), ROOT),
+    "SIMULATION_DATA_PATH": "/" + os.path.relpath(os.path.join(DATA, "simulation"), ROOT),
+    "ASTRA_BINARY_PATH": os.path.join(ROOT, "tests", "bin"),
+    "API_KEY": "test",
+    "CORE_BUDGET": "1",
+    "SIMULATION_WORKERS": "1",
+    "SIMULATION_SUMMARY": "none",
+}
+os.makedirs(os.path.join(DATA, "simulation"))
+os.makedirs(os.path.join(DATA, "generator"))
+shutil.copy(os.path.join(ROOT, "data", "generator", "example.ini"), os.path.join(DATA, "generator"))
+
+from astra_web.generator.schemas.particles import Particles
+
+
+@pytest.fixture(scope="session", autouse=True)
+def data_paths():
+    yield
+    shutil.rmtree(DATA, ignore_errors=True)
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from astra_web.main import app
+
+    return TestClient(app, headers={"x-api-key": "test"})
+
+
+def make_particles(n: int, seed: int = 0, z_ref: float = 0.0) -> Particles:
+    """
+    Bunch with a reference particle at 2.5 MeV/c, correlated transverse phase spaces and 5% lost particles.
+    """
+    rng = np.random.default_rng(seed)
+    x, y = rng.normal(scale=1e-3, size=(2, n))
+    z = rng.normal(scale=1e-3, size=n)
+    status = np.full(n, 3)
+    status[0] = 5
+    status[1:][rng.random(n - 1) < 0.05] = -1
+    particles = Particles(
+        x=x, y=y, z=z,
+        px=2e3 * x / 1e-3 + rng.normal(scale=5e2, size=n),
+        py=-1e3 * y / 1e-3 + rng.normal(scale=5e2, size=n),
+        pz=rng.normal(scale=1e4, size=n) + 3e6 * z,
+        t_clock=rng.normal(scale=1e-3, size=n),
+        macro_charge=np.full(n, -1e-5),
+        species=np.ones(n, dtype=np.int64),
+        status=status,
+    )
+    particles.x[0] = particles.y[0] = particles.px[0] = particles.py[0] = particles.t_clock[0] = 0.0
+    particles.z[0], particles.pz[0] = z_ref, 2.5e6
+
+    return particles
+
+
+def write_run(sim_id: str, positions: tuple = (0.0, 0.5, 1.0), n: int = 2000) -> str:
+    """
+    Writes the run directory of a finished simulation with a particle checkpoint at every position and
+    emittance tables, as written by ASTRA.
+    """
+    from astra_web.utils import SIMULATION_DATA_PATH
+
+    run_dir = f"{SIMULATION_DATA_PATH}/{sim_id}"
+    os.makedirs(run_dir)
+    with open(f"{run_dir}/run.in", "w") as f:
+        f.write("&NEWRUN\n    Distribution = 'example.ini'\n/\n")
+    with open(f"{run_dir}/run.out", "w") as f:
+        f.write(" finished simulation\n")
+    with open(f"{run_dir}/input.json", "w") as f:
+        f.write('{"solenoid_strength": 0.2, "spot_size": 1.0, "emission_time": 0.01, "gun_phase": 0.0, '
+                '"gun_gradient": 60.0, "input_distribution": "example"}')
+    for idx, z in enumerate(positions):
+        make_particles(n, seed=idx, z_ref=z).to_csv(f"{run_dir}/run.{round(z * 100):04d}.001")
+    z = np.linspace(positions[0], positions[-1], 11)
+    for coordinate in "XYZ":
+        np.savetxt(f"{run_dir}/run.{coordinate}emit.001", np.column_stack([z] + [z + i for i in range(1, 7)]))
+
+    return run_dir
+
+
+def simulation_request(z_stop: float, phase: float = 0.0, segmented: bool = False) -> dict:
+    """
+    Input of a run through a cavity and a solenoid at z=0.3, whose field tables begin 0.1 in front of them.
+    """
+    return {
+        "run_specs": {"segmented": segmented},
+        "output_specs": {"z_stop": z_stop},
+        "cavities": [{
+            "z_0": 0.3, "phase": phase, "frequency": 1.3, "max_field_strength": 20.0,
+            "field_table": {"z": [-0.1, 0.0, 0.1], "v": [0.0, 1.0, 0.0]},
+        }],
+        "solenoids": [{
+            "z_0": 0.3, "max_field_strength": 0.2,
+            "field_table": {"z": [-0.1, 0.0, 0.1], "v": [0.0, 1.0, 0.0]},
+        }],
+    }
+
+
+def simulation_input(z_stop: float, phase: float = 0.0, segmented: bool = False):
+    from astra_web.simulation.schemas.io import SimulationInput
+
+    return SimulationInput.model_validate(simulation_request(z_stop, phase, segmented))
+
+
+def wait_for(condition, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Condition not met in time."
+        time.sleep(0.05)
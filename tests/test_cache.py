@@ -0,0 +1,75 @@
+import os
+import pytest
+from subprocess import CalledProcessError
+from astra_web.simulation import jobs
+from astra_web.simulation.cache import input_hash, result_cache
+from astra_web.simulation.scratch import run_path
+from astra_web.storage import content
+from conftest import simulation_input
+
+
+def test_input_hash():
+    assert input_hash(simulation_input(0.5)) == input_hash(simulation_input(0.5))
+    assert input_hash(simulation_input(0.5)) != input_hash(simulation_input(0.5, phase=10.0))
+    assert input_hash(simulation_input(0.5)) != input_hash(simulation_input(0.6))
+
+
+def test_result_cache_miss_and_hit():
+    misses = result_cache.status().misses
+    job, future = jobs.submit(simulation_input(0.7))
+    output = future.result(timeout=60)
+    assert not job.cached
+    assert result_cache.status().misses == misses + 1
+
+    hits = result_cache.status().hits
+    cached_job, cached_future = jobs.submit(simulation_input(0.7))
+    assert cached_job.cached and cached_job.status == 'finished'
+    assert cached_job.sim_id != job.sim_id
+    assert cached_future.result(timeout=0) == output
+    assert result_cache.status().hits == hits + 1
+    assert jobs.load_job(cached_job.job_id).job.cached
+
+
+def test_cached_run_directory():
+    job, future = jobs.submit(simulation_input(0.71))
+    future.result(timeout=60)
+    cached_job, _ = jobs.submit(simulation_input(0.71))
+
+    assert sorted(os.listdir(run_path(cached_job.sim_id))) == sorted(os.listdir(run_path(job.sim_id)))
+
+
+def test_crashed_runs_are_not_cached(monkeypatch):
+    monkeypatch.setenv("FAKE_ASTRA_EXIT", "3")
+    entries = result_cache.status().entries
+    job, future = jobs.submit(simulation_input(0.72))
+    with pytest.raises(CalledProcessError) as e:
+        future.result(timeout=60)
+
+    assert e.value.returncode == 3
+    record = jobs.load_job(job.job_id)
+    assert record.job.status == 'failed' and record.job.error.startswith("CalledProcessError")
+    assert result_cache.status().entries == entries
+
+    monkeypatch.delenv("FAKE_ASTRA_EXIT")
+    job, future = jobs.submit(simulation_input(0.72))
+    assert not job.cached
+    future.result(timeout=60)
+    assert jobs.load_job(job.job_id).job.status == 'finished'
+
+
+def test_failed_restore_runs_the_simulation(monkeypatch):
+    job, future = jobs.submit(simulation_input(0.73))
+    output = future.result(timeout=60)
+
+    def evicted(source, target):
+        # the entry disappears while it is replicated
+        os.makedirs(target)
+        open(os.path.join(target, "run.in"), "w").close()
+        raise FileNotFoundError(source)
+
+    monkeypatch.setattr(content, "link_tree", evicted)
+    job, future = jobs.submit(simulation_input(0.73))
+
+    assert not job.cached
+    assert future.result(timeout=60) == output
+    assert jobs.load_job(job.job_id).job.status == 'finished'
@@ -0,0 +1,63 @@
+import os
+import json
+import time
+import pytest
+from concurrent.futures import wait
+from astra_web.scheduler import Cancelled
+from astra_web.simulation import jobs
+from conftest import simulation_input, simulation_request, wait_for
+
+
+def status(job) -> str:
+    return jobs.load_job(job.job_id).job.status
+
+
+def test_cancel_queued_and_running_jobs(monkeypatch):
+    monkeypatch.setenv("FAKE_ASTRA_SLEEP", "30")
+    running, running_future = jobs.submit(simulation_input(0.41))
+    wait_for(lambda: status(running) == 'running')
+    # the single worker is busy, so this one stays in the queue
+    queued, queued_future = jobs.submit(simulation_input(0.42))
+
+    assert jobs.cancel(queued.job_id).job.status == 'cancelled'
+    assert queued_future.cancelled()
+    assert not os.path.exists(jobs._owner_path(queued.job_id))
+
+    start = time.monotonic()
+    jobs.cancel(running.job_id)
+    assert time.monotonic() - start < 1.0
+    with pytest.raises(Cancelled):
+        running_future.result(timeout=30)
+    assert status(running) == 'cancelled'
+    assert not os.path.exists(jobs._owner_path(running.job_id))
+
+
+def test_cancel_job_of_other_process(monkeypatch):
+    monkeypatch.setenv("FAKE_ASTRA_SLEEP", "30")
+    job, future = jobs.submit(simulation_input(0.43))
+    assert jobs.cancel(job.job_id) is not None
+    wait([future], timeout=30)
+
+    # a queued job owned by an API process on another host
+    record = jobs.load_job(job.job_id)
+    record.job.status = 'queued'
+    jobs._save(record)
+    with open(jobs._owner_path(job.job_id), "w") as f:
+        json.dump({"hostname": "elsewhere", "pid": 1, "token": "foreign"}, f)
+    try:
+        assert jobs.cancel(job.job_id).job.status == 'queued'
+        assert os.path.exists(jobs._cancel_path(job.job_id))
+        assert job.job_id not in [restored.job_id for restored in jobs.restore_jobs()]
+        assert status(job) == 'queued'
+    finally:
+        jobs._release(job.job_id)
+
+
+def test_cancel_endpoint(client, monkeypatch):
+    monkeypatch.setenv("FAKE_ASTRA_SLEEP", "30")
+    job = client.post('/jobs', json=simulation_request(0.44)).json()
+    wait_for(lambda: client.get(f"/jobs/{job['job_id']}").json()['status'] == 'running')
+
+    assert client.post(f"/jobs/{job['job_id']}/cancel").status_code == 200
+    wait_for(lambda: client.get(f"/jobs/{job['job_id']}").json()['status'] == 'cancelled')
+    assert client.post('/jobs/missing/cancel').status_code == 404
@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import pytest
+from astra_web.simulation.simulation import checkpoints, compact_run, load_emittance_output, read_checkpoint
+from astra_web.storage.compression import compress_file, open_text, resolve
+from conftest import DATA, write_run
+
+
+@pytest.mark.parametrize("codec, suffix", [("gzip", ".gz"), ("zstd", ".zst")])
+def test_compress_file(tmp_path, codec, suffix):
+    path = tmp_path / "run.Xemit.001"
+    path.write_text("  0.0000E+00  1.0000E+00\n" * 1000)
+    mtime = os.path.getmtime(path)
+
+    before, after = compress_file(str(path), codec)
+
+    assert not path.exists() and resolve(str(path)) == str(path) + suffix
+    assert after < before == 25000
+    assert os.path.getmtime(str(path) + suffix) == mtime
+    with open_text(str(path)) as f:
+        assert f.read() == "  0.0000E+00  1.0000E+00\n" * 1000
+
+
+def test_compacted_run_reads_unchanged(client):
+    run_dir = write_run("compaction")
+    # the initial distribution is linked into every run
+    os.remove(f"{run_dir}/run.0000.001")
+    os.symlink(os.path.join(DATA, "generator", "example.ini"), f"{run_dir}/run.0000.001")
+    expected = [read_checkpoint(run_dir, name) for name in checkpoints(run_dir)]
+    tables = load_emittance_output(run_dir)
+
+    response = client.post('/simulations/compaction/compact', params={'codec': 'gzip'})
+    assert response.status_code == 200
+    report = response.json()
+
+    assert report['codec'] == 'gzip' and report['files'] == 5
+    assert report['bytes_after'] < report['bytes_before']
+    assert sorted(name for name in os.listdir(run_dir) if name.startswith("run.0")) == \
+           ['run.0000.001', 'run.0050.001.gz', 'run.0100.001.gz']
+    assert checkpoints(run_dir) == ['run.0000.001', 'run.0050.001', 'run.0100.001']
+    for name, particles in zip(checkpoints(run_dir), expected):
+        np.testing.assert_array_equal(read_checkpoint(run_dir, name).pz, particles.pz)
+    for result, table in zip(load_emittance_output(run_dir), tables):
+        np.testing.assert_array_equal(result.z, table.z)
+    assert client.get('/simulations/compaction', params={'checkpoints': -1}).status_code == 200
+
+    # files compressed before are skipped
+    assert compact_run(run_dir, 'gzip').files == 0
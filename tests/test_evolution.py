@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from astra_web.simulation import slices
+from astra_web.simulation.simulation import checkpoints, read_checkpoint
+from astra_web.simulation.statistics import get_interpolated_statistics, get_statistics, get_statistics_evolution
+from conftest import write_run
+
+
+def test_evolution_equals_single_statistics():
+    run_dir = write_run("evolution")
+    names = checkpoints(run_dir)
+
+    evolution = get_statistics_evolution("evolution", 5, run_dir, names)
+
+    assert evolution.error is None and evolution.checkpoints == names
+    for idx, name in enumerate(names):
+        single = get_statistics("evolution", 5, read_checkpoint(run_dir, name))
+        assert evolution.particle_counts[idx] == single.particle_counts
+        for key in ['z_pos', 'ptp_z', 'slice_zs', 'slice_emittances', 'slice_mismatch', 'bunch_twiss']:
+            np.testing.assert_allclose(getattr(evolution, key)[idx], getattr(single, key), rtol=1e-9, err_msg=key)
+
+
+def test_checkpoints_without_active_particles():
+    run_dir = write_run("evolution-lost")
+    names = checkpoints(run_dir)
+    particles = read_checkpoint(run_dir, names[1])
+    particles.status[:] = -1
+    particles.to_csv(f"{run_dir}/{names[1]}")
+
+    evolution = get_statistics_evolution("evolution-lost", 5, run_dir, names)
+
+    assert evolution.error is None and evolution.particle_counts[1]['active'] == 0
+    assert np.isnan(evolution.z_pos[1]) and not np.isnan(evolution.z_pos[2])
+
+
+def test_interpolated_statistics():
+    run_dir = write_run("interpolation")
+    evolution = get_statistics_evolution("interpolation", 5, run_dir, checkpoints(run_dir))
+
+    statistics = get_interpolated_statistics("interpolation", 5, run_dir, 0.25)
+
+    assert statistics.z_pos == pytest.approx((evolution.z_pos[0] + evolution.z_pos[1]) / 2)
+    np.testing.assert_allclose(statistics.slice_emittances,
+                               (np.array(evolution.slice_emittances[0]) + evolution.slice_emittances[1]) / 2)
+    assert get_interpolated_statistics("interpolation", 5, run_dir, 0.5).z_pos == pytest.approx(evolution.z_pos[1])
+    with pytest.raises(ValueError):
+        get_interpolated_statistics("interpolation", 5, run_dir, 1.5)
+
+
+def test_evolution_endpoint(client):
+    write_run("evolution-endpoint")
+    response = client.post('/simulations/statistics/evolution',
+                           json={"sim_ids": ["evolution-endpoint"], "checkpoints": [0, -1], "n_slices": 5})
+    assert response.status_code == 200
+
+    evolution = response.json()[0]
+    assert evolution['error'] is None and evolution['checkpoints'] == ['run.0000.001', 'run.0100.001']
+    assert len(evolution['slice_emittances']) == 2 and len(evolution['slice_emittances'][0]) == 5
+
+
+def test_persisted_statistics_are_not_recomputed(monkeypatch):
+    run_dir = write_run("evolution-persisted")
+    names = checkpoints(run_dir)
+    evolution = get_statistics_evolution("evolution-persisted", 5, run_dir, names)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Slice statistics computed again.")
+
+    monkeypatch.setattr(slices, "batch_slice_statistics", fail)
+    assert get_statistics_evolution("evolution-persisted", 5, run_dir, names) == evolution
+
+
+def test_errors_are_raised(monkeypatch):
+    run_dir = write_run("evolution-error")
+
+    def fail(*args, **kwargs):
+        raise ValueError("broken checkpoint")
+
+    monkeypatch.setattr(slices, "batch_slice_statistics", fail)
+    with pytest.raises(ValueError, match="broken checkpoint"):
+        get_statistics_evolution("evolution-error", 5, run_dir, checkpoints(run_dir))
+
+
+def test_no_active_particles():
+    run_dir = write_run("evolution-all-lost", positions=(0.0, 0.5))
+    for name in checkpoints(run_dir):
+        particles = read_checkpoint(run_dir, name)
+        particles.status[:] = -1
+        particles.to_csv(f"{run_dir}/{name}")
+
+    evolution = get_statistics_evolution("evolution-all-lost", 5, run_dir, checkpoints(run_dir))
+
+    assert evolution.error == "None of the checkpoints holds active particles."
+    assert evolution.z_pos == [] and [counts['active'] for counts in evolution.particle_counts] == [0, 0]
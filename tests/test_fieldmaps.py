@@ -0,0 +1,73 @@
+import os
+from astra_web.simulation import jobs
+from astra_web.simulation.fieldmaps import field_table_exists, field_table_id, field_table_path, field_tables
+from astra_web.simulation.schemas.io import SimulationInput
+from astra_web.simulation.schemas.tables import FieldTable
+from astra_web.simulation.scratch import run_path
+from conftest import simulation_input, simulation_request
+
+TABLE = {"z": [-0.2, 0.0, 0.2], "v": [0.0, 1.0, 0.0]}
+
+
+def test_field_table_registry(client):
+    response = client.post('/fieldmaps', json=TABLE)
+    assert response.status_code == 200
+    table_id = response.json()['field_table_id']
+
+    assert client.post('/fieldmaps', json=TABLE).json()['field_table_id'] == table_id
+    assert client.post('/fieldmaps', json={"z": [0.0, 1.0], "v": [1.0, 1.0]}).json()['field_table_id'] != table_id
+    assert table_id in client.get('/fieldmaps').json()
+    assert client.get(f'/fieldmaps/{table_id}').json() == TABLE
+    assert client.get('/fieldmaps/unknown').status_code == 404
+
+
+def test_table_id_of_inline_table():
+    request = simulation_request(0.5)
+    request["cavities"][0]["field_table"] = {"z": [-0.3, 0.0, 0.3], "v": [0.0, 0.5, 0.0]}
+    cavity = SimulationInput.model_validate(request).cavities[0]
+
+    assert cavity.table_id == field_table_id(FieldTable(z=[-0.3, 0.0, 0.3], v=[0.0, 0.5, 0.0]))
+    assert cavity.field_table_id is None and not field_table_exists(cavity.table_id)
+
+
+def test_unknown_field_table_id(client):
+    request = simulation_request(0.5)
+    del request["cavities"][0]["field_table"]
+    request["cavities"][0]["field_table_id"] = "unknown"
+
+    assert client.post('/jobs', json=request).status_code == 422
+
+
+def test_runs_link_registered_tables(client):
+    table_id = client.post('/fieldmaps', json=TABLE).json()['field_table_id']
+    request = simulation_request(0.36)
+    del request["cavities"][0]["field_table"]
+    request["cavities"][0]["field_table_id"] = table_id
+    job = client.post('/jobs', json=request).json()
+    jobs._futures[job['job_id']].result(timeout=30)
+
+    run_dir = run_path(job['sim_id'])
+    assert os.path.samefile(f"{run_dir}/C1_E.dat", field_table_path(table_id))
+    # inline tables are moved to the registry as well
+    solenoid = simulation_input(0.36).solenoids[0]
+    assert os.path.samefile(f"{run_dir}/{solenoid.File_Bfield}", field_table_path(solenoid.table_id))
+
+
+def test_field_table_eviction(client, monkeypatch):
+    table_id = client.post('/fieldmaps', json=TABLE).json()['field_table_id']
+    request = simulation_request(0.45)
+    del request["cavities"][0]["field_table"]
+    request["cavities"][0]["field_table_id"] = table_id
+    job = client.post('/jobs', json=request).json()
+    jobs._futures[job['job_id']].result(timeout=30)
+
+    # registering another table evicts the least recently used ones beyond the size limit
+    monkeypatch.setattr(field_tables, "max_size", 0)
+    evictions = client.get('/fieldmaps/cache').json()['evictions']
+    client.post('/fieldmaps', json={"z": [0.0, 0.5], "v": [0.5, 0.5]})
+
+    assert client.get('/fieldmaps/cache').json()['evictions'] > evictions
+    assert table_id not in client.get('/fieldmaps').json()
+    assert client.post('/jobs', json=request).status_code == 422
+    with open(f"{run_path(job['sim_id'])}/C1_E.dat", "r") as f:
+        assert f.read() == FieldTable.model_validate(TABLE).to_text()
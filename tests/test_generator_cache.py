@@ -0,0 +1,31 @@
+import os
+from astra_web.generator.cache import generator_cache
+from astra_web.utils import default_filename
+
+
+def generate(client, quasi_random: bool = True) -> dict:
+    response = client.post('/particles', json={"particle_count": 100, "quasi_random": quasi_random})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_generator_cache(client):
+    hits = generator_cache.status().hits
+    first = generate(client)
+    assert generator_cache.status().hits == hits
+    second = generate(client)
+
+    assert generator_cache.status().hits == hits + 1
+    assert second['gen_id'] != first['gen_id']
+    assert second['run_output'] == first['run_output']
+    assert second['particles'] == first['particles'] and len(first['particles']['x']) == 100
+    assert os.path.samefile(default_filename(first['gen_id']) + '.ini', default_filename(second['gen_id']) + '.ini')
+    assert client.get('/particles/cache').json()['hits'] == hits + 1
+
+
+def test_pseudo_random_distributions_are_not_cached(client):
+    entries = generator_cache.status().entries
+    generate(client, quasi_random=False)
+    generate(client, quasi_random=False)
+
+    assert generator_cache.status().entries == entries
@@ -0,0 +1,54 @@
+import io
+import os
+import h5py
+import numpy as np
+from astra_web.simulation.simulation import checkpoints, export_run_hdf5, load_emittance_output, read_checkpoint, \
+    select_checkpoints, store_run_hdf5
+from astra_web.generator.schemas.particles import ParticleSelection
+from conftest import write_run
+
+
+def test_store_run_hdf5():
+    run_dir = write_run("hdf5-storage")
+    names = checkpoints(run_dir)
+    expected = [read_checkpoint(run_dir, name) for name in names]
+    tables = load_emittance_output(run_dir)
+
+    store_run_hdf5(run_dir)
+
+    assert sorted(os.listdir(run_dir)) == ['.cache', 'input.json', 'run.h5', 'run.in', 'run.out']
+    assert checkpoints(run_dir) == names
+    for name, particles in zip(names, expected):
+        result = read_checkpoint(run_dir, name)
+        for key in particles.model_fields:
+            np.testing.assert_array_equal(getattr(result, key), getattr(particles, key), err_msg=key)
+    for result, table in zip(load_emittance_output(run_dir), tables):
+        np.testing.assert_array_equal(result.emittance, table.emittance)
+
+
+def test_selection_from_hdf5():
+    run_dir = write_run("hdf5-selection")
+    store_run_hdf5(run_dir)
+    selection = ParticleSelection(z_min=0.4, columns=['x'], stride=100)
+
+    assert select_checkpoints(run_dir, selection) == ['run.0050.001', 'run.0100.001']
+    particles = read_checkpoint(run_dir, 'run.0100.001', selection)
+    assert particles.x.size == 21 and particles.y is None
+
+
+def test_export(client):
+    run_dir = write_run("hdf5-export")
+    response = client.get('/simulations/hdf5-export/export')
+    assert response.status_code == 200
+
+    with h5py.File(io.BytesIO(response.content), "r") as h5:
+        assert h5.attrs["openPMD"] == b"2.0.0"
+        assert list(h5["data"]) == ['0', '1', '2']
+        assert h5["data/2/astra"].attrs["name"] == "run.0100.001"
+        electrons = h5["data/2/particles/electron"]
+        assert electrons.attrs["numParticles"] == 2000
+        np.testing.assert_array_equal(electrons["position/x"][()], read_checkpoint(run_dir, 'run.0100.001').x)
+        assert h5["astra/files/run.in"][()].decode().startswith("&NEWRUN")
+    # exporting keeps the ASTRA files
+    assert checkpoints(run_dir) == ['run.0000.001', 'run.0050.001', 'run.0100.001']
+    assert os.path.exists(f"{run_dir}/run.0100.001") and export_run_hdf5(run_dir) == f"{run_dir}/run.h5"
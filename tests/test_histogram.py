@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from astra_web.simulation.schemas.io import HistogramInput
+from astra_web.simulation.statistics import histogram
+from conftest import make_particles, write_run
+
+
+@pytest.fixture(scope="module")
+def histogram_run():
+    write_run("histogram")
+    return "histogram"
+
+
+def test_one_dimensional_histogram():
+    particles = make_particles(2000)
+    result = histogram(particles, HistogramInput(x='x', bins_x=20))
+
+    assert len(result.counts) == 20 and len(result.edges[0]) == 21
+    assert sum(result.counts) == np.count_nonzero(particles.status >= 0)
+    assert result.edges[0][0] == particles.x[particles.status >= 0].min()
+
+
+def test_weighted_histogram_of_all_particles():
+    particles = make_particles(2000)
+    result = histogram(particles, HistogramInput(x='px', only_active=False, weighted=True))
+
+    assert sum(result.counts) == pytest.approx(2000 * 1e-5 * 1e-9)
+
+
+def test_absolute_coordinates():
+    particles = make_particles(2000, z_ref=1.0)
+    result = histogram(particles, HistogramInput(x='z', x_min=0.99, x_max=1.01, bins_x=4))
+
+    # z is shifted by the reference particle as in Particles.to_pmd
+    assert sum(result.counts) == np.count_nonzero(particles.status >= 0)
+    np.testing.assert_allclose(result.edges[0], [0.99, 0.995, 1.0, 1.005, 1.01])
+
+
+def test_two_dimensional_histogram(client, histogram_run):
+    response = client.get('/simulations/histogram/histogram',
+                          params={'x': 'x', 'y': 'px', 'bins_x': 10, 'bins_y': 5, 'checkpoint': 0})
+    assert response.status_code == 200
+    result = response.json()
+
+    assert result['coordinates'] == ['x', 'px']
+    assert np.shape(result['counts']) == (10, 5)
+    assert np.sum(result['counts']) == np.count_nonzero(make_particles(2000).status >= 0)
+
+
+def test_particle_distribution_histogram(client):
+    result = client.get('/particles/example/histogram', params={'x': 'pz', 'bins_x': 8}).json()
+
+    assert len(result['counts']) == 8 and sum(result['counts']) == 10000
+
+
+def test_missing_checkpoint(client, histogram_run):
+    response = client.get('/simulations/histogram/histogram', params={'checkpoint': 3})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("params", [{'x_min': 1.0, 'x_max': 1.0}, {'x_min': 2.0, 'x_max': 1.0},
+                                    {'y': 'px', 'y_min': 0.0, 'y_max': -1.0}, {'bins_x': 0}])
+def test_invalid_ranges(client, histogram_run, params):
+    assert client.get('/simulations/histogram/histogram', params=params).status_code == 422
+
+
+@pytest.mark.parametrize("params, edges", [({'x_min': 5.0}, (5.0, 6.0)), ({'x_max': -5.0}, (-6.0, -5.0)),
+                                           ({'x_min': 0.0}, (0.0, None)), ({'x_max': 0.0}, (None, 0.0))])
+def test_one_sided_ranges(client, histogram_run, params, edges):
+    response = client.get('/simulations/histogram/histogram', params={'x': 'x', 'bins_x': 10, **params})
+    assert response.status_code == 200
+    result = response.json()
+    particles = make_particles(2000, seed=2)
+    x = particles.x[particles.status >= 0]
+
+    assert result['edges'][0][0] == (x.min() if edges[0] is None else edges[0])
+    assert result['edges'][0][-1] == (x.max() if edges[1] is None else edges[1])
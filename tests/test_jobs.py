@@ -0,0 +1,66 @@
+import os
+import json
+import socket
+from astra_web.simulation import jobs
+from conftest import simulation_input, simulation_request, wait_for
+
+
+def test_job_lifecycle(client):
+    response = client.post('/jobs', json=simulation_request(0.31))
+    assert response.status_code == 202
+    job = response.json()
+    assert job['status'] in ['queued', 'running']
+
+    wait_for(lambda: client.get(f"/jobs/{job['job_id']}").json()['status'] == 'finished')
+    finished = client.get(f"/jobs/{job['job_id']}").json()
+    assert finished['started'] is not None and finished['finished'] is not None
+    assert job['job_id'] in [j['job_id'] for j in client.get('/jobs', params={'status': 'finished'}).json()]
+    assert not os.path.exists(jobs._owner_path(job['job_id']))
+
+    result = client.get(f"/jobs/{job['job_id']}/result")
+    assert result.status_code == 200
+    assert result.json()['run_output'].endswith(" finished simulation\n")
+    assert [p['z'][0] for p in result.json()['particles']] == [0.0, 0.31]
+
+
+def test_missing_job(client):
+    assert client.get('/jobs/missing').status_code == 404
+    assert client.get('/jobs/missing/result').status_code == 404
+
+
+def queued_record(z_stop: float, owner: dict) -> str:
+    # a job left queued by another API process
+    job, future = jobs.submit(simulation_input(z_stop))
+    future.result(timeout=30)
+    record = jobs.load_job(job.job_id)
+    record.job.status = 'queued'
+    jobs._save(record)
+    with open(jobs._owner_path(job.job_id), "w") as f:
+        json.dump(owner, f)
+
+    return job.job_id
+
+
+def test_restore_jobs_of_orphaned_owner():
+    # no process with this PID is alive on this host
+    job_id = queued_record(0.32, {"hostname": socket.gethostname(), "pid": 2**22 + 1, "token": "gone"})
+
+    assert job_id in [job.job_id for job in jobs.restore_jobs()]
+    jobs._futures[job_id].result(timeout=30)
+    assert jobs.load_job(job_id).job.status == 'finished'
+    assert not os.path.exists(jobs._owner_path(job_id))
+
+
+def test_restore_jobs_leaves_jobs_of_other_hosts():
+    job_id = queued_record(0.33, {"hostname": "elsewhere", "pid": 1, "token": "foreign"})
+    try:
+        assert job_id not in [job.job_id for job in jobs.restore_jobs()]
+        assert jobs.load_job(job_id).job.status == 'queued'
+        with open(jobs._owner_path(job_id), "r") as f:
+            assert json.load(f)["token"] == "foreign"
+    finally:
+        # the record must not be restored by later API processes of the test session
+        record = jobs.load_job(job_id)
+        record.job.status = 'finished'
+        jobs._save(record)
+        jobs._release(job_id)
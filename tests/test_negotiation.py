@@ -0,0 +1,68 @@
+import numpy as np
+from astra_web.negotiation import NPZ_MEDIA_TYPE
+from astra_web.generator.schemas.particles import Particles
+from astra_web.simulation.schemas.io import SimulationOutput
+from astra_web.simulation.schemas.tables import XYEmittanceTable
+from conftest import make_particles
+
+
+def assert_equal_particles(result: Particles, expected: Particles):
+    for key in Particles.model_fields:
+        np.testing.assert_array_equal(getattr(result, key), getattr(expected, key), err_msg=key)
+
+
+def test_npz_round_trip():
+    particles = make_particles(1000)
+    result = Particles.from_npz(particles.to_npz())
+
+    assert_equal_particles(result, particles)
+    assert result.status.dtype == particles.status.dtype
+
+
+def test_npz_upload_and_json_download(client):
+    particles = make_particles(1000)
+    response = client.put('/particles/npz-upload', content=particles.to_npz(),
+                          headers={'content-type': NPZ_MEDIA_TYPE})
+    assert response.status_code == 200
+
+    response = client.get('/particles/npz-upload')
+    assert response.headers['content-type'] == 'application/json'
+    # written as text by to_csv, which keeps the values up to float precision
+    result = Particles(**response.json())
+    for key in Particles.model_fields:
+        np.testing.assert_allclose(getattr(result, key), getattr(particles, key), rtol=1e-12, err_msg=key)
+
+    response = client.get('/particles/npz-upload', headers={'accept': NPZ_MEDIA_TYPE})
+    assert response.headers['content-type'] == NPZ_MEDIA_TYPE
+    assert_equal_particles(Particles.from_npz(response.content), result)
+
+
+def test_json_upload_and_npz_download(client):
+    particles = make_particles(100)
+    response = client.put('/particles/json-upload', json=particles.model_dump(mode='json'))
+    assert response.status_code == 200
+
+    response = client.get('/particles/json-upload', headers={'accept': NPZ_MEDIA_TYPE})
+    result = Particles.from_npz(response.content)
+    for key in Particles.model_fields:
+        np.testing.assert_allclose(getattr(result, key), getattr(particles, key), rtol=1e-12, err_msg=key)
+
+
+def test_invalid_npz_upload(client):
+    response = client.put('/particles/invalid', content=b'no archive', headers={'content-type': NPZ_MEDIA_TYPE})
+
+    assert response.status_code == 422
+    assert response.json()['detail'].startswith('Invalid .npz payload')
+
+
+def test_simulation_output_npz_round_trip():
+    table = XYEmittanceTable(**{key: np.linspace(0, 1, 5) + idx for idx, key in enumerate(XYEmittanceTable.model_fields)})
+    output = SimulationOutput(sim_id='sim', input_ini='&NEWRUN\n/', run_output='finished',
+                              particles=[make_particles(10), make_particles(20, seed=1)], emittance_x=table)
+    result = SimulationOutput.from_npz(output.to_npz())
+
+    assert (result.sim_id, result.input_ini, result.run_output) == ('sim', '&NEWRUN\n/', 'finished')
+    assert result.emittance_y is None
+    np.testing.assert_array_equal(result.emittance_x.emittance, table.emittance)
+    assert len(result.particles) == 2
+    assert_equal_particles(result.particles[1], output.particles[1])
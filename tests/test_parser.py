@@ -0,0 +1,43 @@
+import os
+import numpy as np
+import pytest
+from astra_web.storage.parser import EmptyFileError, read_columns, iter_columns
+from conftest import ROOT
+
+EXAMPLE = os.path.join(ROOT, "data", "generator", "example.ini")
+
+
+def test_read_columns():
+    columns = read_columns(EXAMPLE, 10)
+
+    assert columns.shape == (10, 10000) and columns.dtype == np.float64
+    assert all(column.flags.c_contiguous for column in columns)
+    # reference particle in the first row
+    assert columns[5, 0] == 2.4585e6 and columns[9, 0] == 5
+    assert columns[0, 1] == 3.75e-4
+
+
+def test_read_fortran_formatted_file(tmp_path):
+    path = tmp_path / "run.Xemit.001"
+    path.write_text("  0.0000E+00  1.2500E-03 -3.4100E-05\n  1.0000E-01  1.2600E-03 -3.4000E-05\n")
+
+    np.testing.assert_array_equal(read_columns(str(path), 3), [[0.0, 0.1], [1.25e-3, 1.26e-3], [-3.41e-5, -3.4e-5]])
+
+
+def test_wrong_number_of_columns():
+    with pytest.raises(ValueError, match="Expected 7 columns"):
+        read_columns(EXAMPLE, 7)
+
+
+def test_empty_file(tmp_path):
+    (tmp_path / "empty").write_text("")
+
+    with pytest.raises(EmptyFileError):
+        read_columns(str(tmp_path / "empty"), 10)
+
+
+def test_chunks_equal_whole_file():
+    chunks = list(iter_columns(EXAMPLE, 10, chunk_size=3000))
+
+    assert [chunk.shape[1] for chunk in chunks] == [3000, 3000, 3000, 1000]
+    np.testing.assert_array_equal(np.concatenate(chunks, axis=1), read_columns(EXAMPLE, 10))
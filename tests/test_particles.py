@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from astra_web.generator.schemas.particles import Particles
+from conftest import make_particles
+
+
+def particles_of(**columns) -> Particles:
+    # attributes not given are zero
+    n = len(next(iter(columns.values())))
+    return Particles(**{key: columns.get(key, np.zeros(n)) for key in Particles.model_fields})
+
+
+def test_columns_are_contiguous_arrays():
+    particles = particles_of(x=[1, 2, 3], status=[5, 3, -1])
+
+    assert isinstance(particles.x, np.ndarray) and particles.x.dtype == np.float64
+    assert particles.x.flags.c_contiguous
+    assert particles.status.dtype == np.int64
+    assert Particles().y.size == 0
+
+
+def test_json_keeps_lists():
+    particles = particles_of(x=[1.5, 2.5], status=[5, 3])
+    data = particles.model_dump(mode='json')
+
+    assert data['x'] == [1.5, 2.5] and data['status'] == [5, 3]
+    assert Particles.model_validate_json(particles.model_dump_json()).x.tolist() == [1.5, 2.5]
+
+
+def test_csv_round_trip(tmp_path):
+    particles = make_particles(100)
+    particles.to_csv(tmp_path / "particles.ini")
+    result = Particles.from_csv(str(tmp_path / "particles.ini"))
+
+    for key in Particles.model_fields:
+        np.testing.assert_allclose(getattr(result, key), getattr(particles, key), rtol=1e-12, err_msg=key)
+    assert result.status.dtype == np.int64
+
+
+def test_active_and_lost_particles():
+    particles = particles_of(x=[0, 1, 2, 3], status=[5, 3, -1, -15])
+
+    assert particles.active_particles.tolist() == [True, True, False, False]
+    assert particles.lost_particles.tolist() == [False, False, True, True]
+
+
+def test_unequal_columns_are_rejected():
+    with pytest.raises(ValidationError, match="unequal length"):
+        particles_of(x=[1.0, 2.0], status=[5])
+
+
+def test_upload_requires_complete_columns(client):
+    data = make_particles(10).model_dump(mode='json')
+
+    assert client.put('/particles/uploaded', json=data).status_code == 200
+    assert client.put('/particles/uploaded', json={**data, 'y': None}).status_code == 422
+    assert client.put('/particles/uploaded', json={**data, 'y': [0.0]}).status_code == 422
+    assert client.put('/particles/uploaded', json={key: data[key] for key in ['x', 'status']}).status_code == 422
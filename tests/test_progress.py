@@ -0,0 +1,72 @@
+import os
+import orjson
+from astra_web.simulation.progress import ProgressTracker
+from astra_web.simulation.schemas.jobs import SimulationProcess
+from conftest import ROOT, simulation_request
+
+
+def tracker(z_start: float = 0.0, z_stop: float = 2.0) -> ProgressTracker:
+    return ProgressTracker(SimulationProcess(run_dir="run", command=[], distribution="example.ini", threads=1,
+                                             timeout=600, z_start=z_start, z_stop=z_stop))
+
+
+def test_progress_from_output():
+    progress = tracker()
+
+    assert progress.update(" Astra is running\n") is None
+    update = progress.update(" Particle output at z = 0.5000 m, step 1200\n")
+    assert (update.z, update.step, update.fraction) == (0.5, 1200, 0.25)
+    assert update.eta == update.elapsed * 3
+    update = progress.update(" z =  1.0D+00, Nstep = 2400\n")
+    assert (update.z, update.step, update.fraction) == (1.0, 2400, 0.5)
+
+
+def test_progress_from_astra_output():
+    # output of a run from z=0 to z=1 with a cavity at z=0.3 and a solenoid beyond ZSTOP
+    progress = tracker(0.0, 1.0)
+    with open(os.path.join(ROOT, "tests", "data", "astra_run.out"), "r") as f:
+        updates = [update for line in f if (update := progress.update(line)) is not None]
+
+    # the cavity listed in the setup is replaced by the bunch once tracking starts
+    assert [update.z for update in updates] == [0.3, 0.1, 0.2, 0.2, 0.3, 0.3, 0.5, 0.5, 0.75, 1.0, 1.0]
+    assert [update.step for update in updates][-3:] == [4500, 6000, 6000]
+    assert updates[-1].fraction == 1.0 and updates[-1].eta == 0.0
+
+
+def test_progress_ignores_positions_outside_the_run():
+    progress = tracker(0.5, 1.0)
+
+    assert progress.update(" Cathode at z = 0.0000 m\n") is None
+    assert progress.update(" Solenoid 1 at z = 1.2500 m\n") is None
+    assert progress.update(" z = 0.7500 m\n").fraction == 0.5
+    assert progress.update(" leaving field of cavity 1 at z = 0.6000 m\n") is None
+    assert progress.update(" z = 0.8000 m\n").z == 0.8
+
+
+def parse_events(text: str) -> list[tuple[str, object]]:
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], orjson.loads(lines["data"])))
+
+    return events
+
+
+def test_job_events(client, monkeypatch):
+    monkeypatch.setenv("FAKE_ASTRA_SLEEP", "1")
+    job = client.post('/jobs', json=simulation_request(0.34)).json()
+
+    with client.stream('GET', f"/jobs/{job['job_id']}/events") as response:
+        assert response.headers['content-type'].startswith('text/event-stream')
+        events = parse_events(response.read().decode())
+
+    assert events[0][0] == 'status' and events[-1] == ('status', events[-1][1])
+    assert events[-1][1]['status'] == 'finished'
+    assert ('output', ' finished simulation') in events
+    progress = [data for event, data in events if event == 'progress']
+    assert progress[-1]['z'] == 0.34 and progress[-1]['fraction'] == 1.0
+
+
+def test_events_of_missing_job(client):
+    assert client.get('/jobs/missing/events').status_code == 404
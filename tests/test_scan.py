@@ -0,0 +1,43 @@
+import orjson
+import pytest
+from pydantic import ValidationError
+from astra_web.simulation.schemas.scan import ScanInput
+from conftest import simulation_request
+
+
+def test_expansion():
+    scan = ScanInput.model_validate({
+        "base": simulation_request(0.31),
+        "grid": {"cavities[0].phase": [-10, 10], "solenoids[0].MaxB": [0.1, 0.2]},
+        "points": [{"cavities[0].Phi": 5}],
+    })
+    members = scan.members()
+
+    assert [parameters for parameters, _ in members][:2] == [
+        {"cavities[0].phase": -10, "solenoids[0].MaxB": 0.1}, {"cavities[0].phase": -10, "solenoids[0].MaxB": 0.2}]
+    assert [member.cavities[0].Phi for _, member in members] == [-10, -10, 10, 10, 5]
+    assert [member.solenoids[0].MaxB for _, member in members][:2] == [0.1, 0.2]
+    assert len({member.sim_id for _, member in members}) == 5
+    assert scan.base.cavities[0].Phi == 0
+
+
+@pytest.mark.parametrize("grid", [{}, {"cavities[1].phase": [0]}, {"cavities[0].unknown": [0]},
+                                  {"cavities.phase": [0]}, {"cavities[0].smoothing_iterations": [1.5]}])
+def test_invalid_scans(client, grid):
+    with pytest.raises(ValidationError):
+        ScanInput.model_validate({"base": simulation_request(0.31), "grid": grid})
+    assert client.post('/simulations/scan', json={"base": simulation_request(0.31), "grid": grid}).status_code == 422
+
+
+def test_scan(client):
+    scan = {"base": simulation_request(0.35), "grid": {"cavities[0].phase": [-5, 5]}, "n_slices": 5}
+    response = client.post('/simulations/scan', json=scan)
+    assert response.status_code == 200
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+
+    assert len(lines) == 3 and len(lines[0]["points"]) == 2
+    assert sorted(point["index"] for point in lines[1:]) == [0, 1]
+    for point in lines[1:]:
+        assert point["error"] is None
+        assert point["sim_id"] == lines[0]["points"][point["index"]]["sim_id"]
+        assert point["statistics"]["particle_counts"]["total"] > 0
@@ -0,0 +1,61 @@
+import pytest
+from threading import Event, Thread
+from astra_web import scheduler
+from astra_web.scheduler import Cancelled, reserve
+from conftest import simulation_request, wait_for
+
+
+def test_reservation_blocks_until_released():
+    admitted = []
+
+    def second():
+        with reserve(1, "second") as cores:
+            admitted.append(cores)
+
+    with reserve(1, "first") as cores:
+        assert scheduler.status().reserved_cores == 1
+        assert [r.name for r in scheduler.status().reservations] == ["first"]
+        thread = Thread(target=second)
+        thread.start()
+        wait_for(lambda: scheduler.status().waiting == 1)
+        assert admitted == []
+    thread.join(timeout=5)
+
+    assert admitted == [cores]
+    status = scheduler.status()
+    assert status.reserved_cores == 0 and status.waiting == 0
+
+
+def test_cancel_while_waiting():
+    cancelled = Event()
+    errors = []
+
+    def waiting():
+        try:
+            with reserve(1, "waiting", cancelled):
+                pass
+        except Cancelled as e:
+            errors.append(e)
+
+    with reserve(1, "running"):
+        thread = Thread(target=waiting)
+        thread.start()
+        wait_for(lambda: scheduler.status().waiting == 1)
+        cancelled.set()
+        scheduler.interrupt()
+        thread.join(timeout=5)
+        assert len(errors) == 1 and scheduler.status().waiting == 0
+
+
+def test_requests_larger_than_budget():
+    with pytest.raises(ValueError):
+        with reserve(scheduler.CORE_BUDGET + 1, "too large"):
+            pass
+
+
+def test_thread_num_limited_by_budget(client):
+    request = simulation_request(0.3)
+    request["run_specs"]["thread_num"] = scheduler.CORE_BUDGET + 1
+
+    assert client.post('/jobs', json=request).status_code == 422
+    assert client.get('/jobs/scheduler').json()['core_budget'] == scheduler.CORE_BUDGET
@@ -0,0 +1,89 @@
+import os
+import json
+import socket
+import pytest
+from astra_web.simulation import jobs, scratch
+from astra_web.simulation.scratch import persist_run, run_path, stage_run
+from astra_web.utils import SIMULATION_DATA_PATH
+from conftest import simulation_input
+
+
+@pytest.fixture
+def scratch_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(scratch, "SIMULATION_SCRATCH_PATH", str(tmp_path))
+    return tmp_path
+
+
+def run_dir(sim_id: str) -> str:
+    path = os.path.abspath(f"{SIMULATION_DATA_PATH}/{sim_id}")
+    os.makedirs(path)
+    with open(f"{path}/run.in", "w") as f:
+        f.write("&NEWRUN\n/\n")
+    return path
+
+
+def test_stage_and_persist(scratch_path):
+    path = run_dir("staged")
+    work_dir = stage_run(path)
+
+    assert work_dir == str(scratch_path / "staged") and os.path.islink(f"{work_dir}/run.in")
+    with open(f"{work_dir}/run.out", "w") as f:
+        f.write(" finished simulation\n")
+    assert run_path("staged") == work_dir
+
+    persisted = []
+    persist_run(work_dir, path, lambda: persisted.append(True)).result(timeout=10)
+
+    assert persisted == [True] and run_path("staged") == path
+    assert sorted(os.listdir(path)) == ['run.in', 'run.out'] and not os.path.islink(f"{path}/run.out")
+    assert os.path.exists(f"{work_dir}/.persisted")
+
+
+def test_staging_disabled():
+    path = run_dir("unstaged")
+    assert stage_run(path) == path and run_path("unstaged") == path
+
+
+def interrupted_run(z_stop: float) -> tuple[str, str]:
+    # a job whose results were not persisted when its process stopped
+    job, future = jobs.submit(simulation_input(z_stop))
+    future.result(timeout=30)
+    scratch._persister.submit(lambda: None).result(timeout=10)
+    work_dir = stage_run(os.path.abspath(f"{SIMULATION_DATA_PATH}/{job.sim_id}"))
+    with open(f"{work_dir}/run.out", "w") as f:
+        f.write(" interrupted simulation\n")
+
+    return job.job_id, work_dir
+
+
+def test_recover_scratch(scratch_path):
+    job_id, work_dir = interrupted_run(0.38)
+    path = os.path.abspath(f"{SIMULATION_DATA_PATH}/{job_id}")
+
+    assert jobs.recover_scratch() == [job_id]
+    assert not os.path.exists(work_dir) and not os.path.exists(jobs._owner_path(job_id))
+    with open(f"{path}/run.out", "r") as f:
+        assert f.read() == " interrupted simulation\n"
+
+
+def test_recover_scratch_leaves_live_runs(scratch_path):
+    job_id, work_dir = interrupted_run(0.39)
+    # the job is owned by a live process on this host
+    with open(jobs._owner_path(job_id), "w") as f:
+        json.dump({"hostname": socket.gethostname(), "pid": os.getppid(), "token": "live"}, f)
+    os.makedirs(scratch_path / "unknown")
+    try:
+        assert jobs.recover_scratch() == []
+        assert os.path.exists(f"{work_dir}/run.out") and os.path.isdir(scratch_path / "unknown")
+    finally:
+        jobs._release(job_id)
+
+
+def test_simulation_in_scratch(scratch_path):
+    job, future = jobs.submit(simulation_input(0.37))
+    future.result(timeout=30)
+
+    path = os.path.abspath(f"{SIMULATION_DATA_PATH}/{job.sim_id}")
+    scratch._persister.submit(lambda: None).result(timeout=10)
+    assert run_path(job.sim_id) == path
+    assert os.path.exists(f"{path}/run.0037.001") and os.path.exists(f"{path}/run.out")
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pytest
+from astra_web.simulation import jobs
+from astra_web.simulation.segments import segment_boundaries
+from conftest import simulation_input
+
+
+def test_segment_boundaries():
+    # the field table of the cavity at z=0.3 begins at z=0.2
+    assert segment_boundaries(simulation_input(1.0)) == [pytest.approx(0.2)]
+    assert segment_boundaries(simulation_input(0.15)) == []
+
+
+def test_no_boundaries_inside_upstream_fields():
+    overlapping = simulation_input(1.0)
+    # the field of the solenoid reaches into the field of the cavity, which begins at z=0.2
+    overlapping.solenoids[0].S_pos = 0.15
+    overlapping.solenoids[0].field_table.z = [-0.1, 0.0, 0.2]
+
+    assert segment_boundaries(overlapping) == [pytest.approx(0.05)]
+
+
+def test_restart_from_cached_segment():
+    upstream, future = jobs.submit(simulation_input(1.01, segmented=True))
+    future.result(timeout=60)
+    assert jobs.load_job(upstream.job_id).process.restart_z is None
+    assert os.path.exists(f"{jobs.load_job(upstream.job_id).process.run_dir}/run.0020.001")
+
+    # the phase of the cavity only changes the result downstream of its field
+    job, future = jobs.submit(simulation_input(1.01, phase=10.0, segmented=True))
+    future.result(timeout=60)
+    record = jobs.load_job(job.job_id)
+    assert not record.job.cached and record.job.status == 'finished'
+    assert record.process.restart_z == pytest.approx(0.2)
+
+    run_dir = record.process.run_dir
+    assert os.path.exists(f"{run_dir}/restart.ini")
+    # the input of the simulation is kept, ASTRA restarts from its own input with the phase found upstream
+    with open(f"{run_dir}/run.in", "r") as f:
+        assert "Auto_Phase = true" in f.read()
+    with open(f"{run_dir}/segment.in", "r") as f:
+        restart = f.read()
+    assert "Auto_Phase = false" in restart and "Phi(1) = 111.0" in restart
+    assert not any(name.startswith("segment.") and name != "segment.in" for name in os.listdir(run_dir))
+    assert os.path.exists(f"{run_dir}/run.0020.001")
+    assert os.path.exists(f"{run_dir}/run.0101.001")
+    # the emittance of the restarted run continues the upstream part
+    z = np.loadtxt(f"{run_dir}/run.Xemit.001", ndmin=2)[:, 0]
+    assert z[0] == 0.0 and z[-1] == 1.01
+    assert np.all(np.diff(z) > 0)
+
+
+def test_no_restart_with_changed_phasing():
+    upstream, future = jobs.submit(simulation_input(1.02, segmented=True))
+    future.result(timeout=60)
+
+    # the phase of maximum energy gain depends on the amplitude of the cavity
+    changed = simulation_input(1.02, segmented=True)
+    changed.cavities[0].MaxE = 25.0
+    job, future = jobs.submit(changed)
+    future.result(timeout=60)
+    record = jobs.load_job(job.job_id)
+
+    assert record.job.status == 'finished' and record.process.restart_z is None
+    with open(f"{record.process.run_dir}/run.in", "r") as f:
+        assert "MaxE(1) = 25.0" in f.read()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from astra_web.generator.schemas.particles import ParticleSelection
+from conftest import make_particles, write_run
+
+
+@pytest.fixture(scope="module")
+def selection_run():
+    write_run("selection")
+    return "selection"
+
+
+def particles(client, **params) -> list[dict]:
+    response = client.get('/simulations/selection', params=params)
+    assert response.status_code == 200
+    return response.json()['particles']
+
+
+def test_checkpoints_by_index_and_position(client, selection_run):
+    assert [p['z'][0] for p in particles(client, checkpoints=[0, -1])] == [0.0, 1.0]
+    assert [p['z'][0] for p in particles(client, z_min=0.4)] == [0.5, 1.0]
+    assert [p['z'][0] for p in particles(client, z_min=0.4, z_max=0.6)] == [0.5]
+    assert particles(client, checkpoints=[5]) == []
+
+
+def test_columns(client, selection_run):
+    [checkpoint] = particles(client, checkpoints=-1, columns=['x', 'status'])
+
+    assert len(checkpoint['x']) == len(checkpoint['status']) == 2000
+    assert checkpoint['y'] is None and checkpoint['pz'] is None
+
+
+def test_unknown_column(client, selection_run):
+    response = client.get('/simulations/selection', params={'columns': ['energy']})
+
+    assert response.status_code == 422
+
+
+def test_rows():
+    expected = make_particles(2000, seed=2, z_ref=1.0)
+    full = {key: getattr(expected, key) for key in expected.model_fields}
+    active = ParticleSelection(only_active=True).select(full)
+    strided = ParticleSelection(stride=10).select(full)
+
+    assert np.all(active['status'] >= 0)
+    assert active['x'].size == np.count_nonzero(expected.status >= 0)
+    # the reference particle is always kept
+    np.testing.assert_array_equal(strided['x'], np.concatenate([expected.x[:1], expected.x[1::10]]))
+    assert strided['z'][0] == 1.0
+
+
+def test_random_sample(client, selection_run):
+    [first] = particles(client, checkpoints=-1, sample=100, seed=7)
+    [second] = particles(client, checkpoints=-1, sample=100, seed=7)
+    [other] = particles(client, checkpoints=-1, sample=100, seed=8)
+
+    assert len(first['x']) == 101 and first['z'][0] == 1.0
+    assert first == second and first != other
@@ -0,0 +1,56 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from astra_web.storage.cache import SIDECAR_DIR, cached_columns, remove_sidecars, sidecar_path
+from astra_web.storage.parser import read_columns
+from conftest import make_particles
+
+
+def write_particles(path, seed: int = 0) -> str:
+    make_particles(200, seed=seed).to_csv(path)
+    return str(path)
+
+
+def test_sidecar_is_memory_mapped(tmp_path):
+    path = write_particles(tmp_path / "run.0100.001")
+    columns = cached_columns(path, 10)
+
+    assert os.path.exists(sidecar_path(path))
+    assert os.listdir(tmp_path / SIDECAR_DIR) == [os.path.basename(sidecar_path(path))]
+    cached = cached_columns(path, 10)
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, columns)
+    np.testing.assert_array_equal(cached, read_columns(path, 10))
+
+
+def test_changed_file_replaces_sidecar(tmp_path):
+    path = write_particles(tmp_path / "run.0100.001")
+    before = cached_columns(path, 10)
+    outdated = sidecar_path(path)
+    time.sleep(0.01)
+    write_particles(path, seed=1)
+
+    after = cached_columns(path, 10)
+    assert not np.array_equal(after, before)
+    np.testing.assert_array_equal(after, read_columns(path, 10))
+    assert not os.path.exists(outdated)
+
+
+def test_remove_sidecars(tmp_path):
+    path = write_particles(tmp_path / "run.0100.001")
+    cached_columns(path, 10)
+    remove_sidecars(path)
+
+    assert os.listdir(tmp_path / SIDECAR_DIR) == []
+
+
+def test_concurrent_readers(tmp_path):
+    path = write_particles(tmp_path / "run.0100.001")
+    expected = read_columns(path, 10)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda _: np.array(cached_columns(path, 10)), range(16)))
+
+    assert all(np.array_equal(result, expected) for result in results)
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path / SIDECAR_DIR))
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from pmd_beamphysics.statistics import particle_twiss_dispersion
+from astra_web.simulation import slices
+from conftest import make_particles
+
+
+def relative_deviation(reference: dict, result: dict) -> float:
+    # pmd_beamphysics adds an uninitialized entry for the requested 'twiss_xy'
+    keys = [key for key in reference if key in result and key != 'twiss_xy']
+    assert len(keys) > 0
+    return max(np.nanmax(np.abs(np.asarray(result[key]) - reference[key]) / np.abs(reference[key])) for key in keys)
+
+
+@pytest.mark.parametrize("n_slice", [1, 10, 50])
+def test_slice_statistics_match_pmd_beamphysics(n_slice):
+    particle_group = make_particles(20_000).to_pmd(only_active=True)
+    reference = particle_group.slice_statistics("norm_emit_x", "norm_emit_y", "twiss_xy", n_slice=n_slice)
+    twiss = particle_twiss_dispersion(particle_group, plane="x")
+    twiss.update(particle_twiss_dispersion(particle_group, plane="y"))
+
+    data, bunch = slices.slice_statistics(particle_group, n_slice)
+
+    assert all(len(value) == n_slice for value in data.values())
+    assert relative_deviation(reference, data) < 1e-8
+    assert relative_deviation(twiss, bunch) < 1e-8
+
+
+def test_batch_equals_single_statistics():
+    particle_groups = [make_particles(5_000, seed=seed).to_pmd(only_active=True) for seed in [1, 2]]
+
+    data, bunch = slices.batch_slice_statistics(particle_groups, 20)
+
+    for idx, particle_group in enumerate(particle_groups):
+        single_data, single_bunch = slices.slice_statistics(particle_group, 20)
+        for key, value in single_data.items():
+            np.testing.assert_allclose(data[key][idx], value, rtol=1e-12, err_msg=key)
+        for key, value in single_bunch.items():
+            np.testing.assert_allclose(bunch[key][idx], value, rtol=1e-12, err_msg=key)
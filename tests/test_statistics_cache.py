@@ -0,0 +1,54 @@
+import os
+from astra_web.simulation import statistics_cache
+from astra_web.simulation.scratch import run_path
+from astra_web.simulation.simulation import checkpoints, read_checkpoint
+from astra_web.simulation.statistics import checkpoint_statistics, get_statistics, submit_simulation_statistics
+from astra_web.simulation.statistics_cache import load_statistics, recall, remember, signature, store_statistics
+from conftest import wait_for, write_run
+
+
+def test_store_and_load():
+    run_dir = write_run("persisted-statistics")
+    name = checkpoints(run_dir)[-1]
+    statistics = get_statistics("persisted-statistics", 5, read_checkpoint(run_dir, name))
+
+    assert load_statistics("persisted-statistics", run_dir, name, 5) is None
+    store_statistics(run_dir, name, 5, statistics)
+
+    assert os.path.exists(f"{run_dir}/.statistics/{name}.5.json")
+    assert load_statistics("persisted-statistics", run_dir, name, 5) == statistics
+    assert load_statistics("persisted-statistics", run_dir, name, 10) is None
+    # statistics copied along with a cached run belong to another simulation
+    assert load_statistics("other", run_dir, name, 5) is None
+
+
+def test_changed_checkpoint_invalidates_statistics():
+    run_dir = write_run("changed-statistics")
+    name = checkpoints(run_dir)[-1]
+    statistics = checkpoint_statistics("changed-statistics", 5, run_dir, name)
+    assert load_statistics("changed-statistics", run_dir, name, 5) == statistics
+
+    particles = read_checkpoint(run_dir, name)
+    particles.status[:1000] = -1
+    particles.to_csv(f"{run_dir}/{name}")
+
+    assert load_statistics("changed-statistics", run_dir, name, 5) is None
+    assert checkpoint_statistics("changed-statistics", 5, run_dir, name).particle_counts['active'] < \
+           statistics.particle_counts['active']
+
+
+def test_recall_and_remember(monkeypatch):
+    run_dir = run_path(os.path.basename(write_run("remembered-statistics")))
+    name = checkpoints(run_dir)[-1]
+    source = signature(run_dir, name)
+    statistics = submit_simulation_statistics("remembered-statistics", 5).result(timeout=60)
+    # remembered by a callback of the future
+    wait_for(lambda: recall(run_dir, name, 5, source) is not None)
+
+    assert recall(run_dir, name, 5, source) == statistics
+    assert recall(run_dir, name, 5, ("other", 0, 0)) is None
+    assert submit_simulation_statistics("remembered-statistics", 5).result(timeout=0) == statistics
+
+    monkeypatch.setattr(statistics_cache, "STATISTICS_CACHE_ENTRIES", 1)
+    remember(run_dir, "other", 5, source, statistics)
+    assert recall(run_dir, name, 5, source) is None
@@ -0,0 +1,31 @@
+import orjson
+from astra_web.simulation.schemas.io import StatisticsInput
+from astra_web.simulation.statistics import submit_statistics
+from conftest import write_run
+
+
+def test_statistics_of_several_simulations():
+    for sim_id in ["pool-a", "pool-b"]:
+        write_run(sim_id, positions=(0.0, 0.7))
+
+    futures = submit_statistics(StatisticsInput(sim_ids=["pool-a", "pool-missing", "pool-b"], n_slices=5))
+    results = [future.result(timeout=60) for future in futures]
+
+    assert [result.sim_id for result in results] == ["pool-a", "pool-missing", "pool-b"]
+    assert results[0].error is None and results[2].error is None
+    assert results[0].particle_counts['total'] == 2000 and len(results[0].slice_emittances) == 5
+    assert results[1].error.startswith("FileNotFoundError")
+
+
+def test_statistics_endpoint(client):
+    write_run("pool-endpoint", positions=(0.0, 0.7))
+    request = {"sim_ids": ["pool-endpoint", "pool-unknown"], "n_slices": 5}
+
+    response = client.post('/simulations/statistics', json=request)
+    assert response.status_code == 200
+    assert [result['error'] is None for result in response.json()] == [True, False]
+
+    response = client.post('/simulations/statistics', json=request, headers={"accept": "application/x-ndjson"})
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    results = [orjson.loads(line) for line in response.text.splitlines()]
+    assert sorted(result['sim_id'] for result in results) == ["pool-endpoint", "pool-unknown"]
@@ -0,0 +1,23 @@
+import orjson
+from astra_web.negotiation import NDJSON_MEDIA_TYPE
+from conftest import write_run
+
+
+def test_ndjson_simulation_output(client):
+    write_run("ndjson")
+    expected = client.get('/simulations/ndjson').json()
+
+    response = client.get('/simulations/ndjson', headers={'accept': NDJSON_MEDIA_TYPE})
+    assert response.headers['content-type'] == NDJSON_MEDIA_TYPE
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+
+    assert lines[0] == {key: expected[key] for key in ['sim_id', 'input_ini', 'run_output']}
+    assert lines[1:4] == [{key: expected[key]} for key in ['emittance_x', 'emittance_y', 'emittance_z']]
+    assert lines[4:] == [{"index": idx, "particles": particles} for idx, particles in enumerate(expected['particles'])]
+    assert len(lines) == 7
+
+
+def test_ndjson_response_of_missing_simulation(client):
+    response = client.get('/simulations/missing', headers={'accept': NDJSON_MEDIA_TYPE})
+
+    assert response.status_code == 404
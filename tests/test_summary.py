@@ -0,0 +1,43 @@
+import os
+import pytest
+from astra_web.simulation.summary import load_summary, summarize_run, summary_path
+from conftest import write_run
+
+
+def test_summarize_run():
+    run_dir = write_run("summarized")
+
+    summary = summarize_run("summarized", run_dir, mode="final", n_slices=5)
+
+    assert summary.error is None and os.path.exists(summary_path(run_dir))
+    assert summary.checkpoints == ['run.0000.001', 'run.0050.001', 'run.0100.001']
+    assert list(summary.statistics) == ['run.0100.001']
+    assert len(summary.statistics['run.0100.001'].slice_emittances) == 5
+    assert summary.statistics['run.0100.001'].inputs == {}
+    emittance = summary.emittance['x']['emittance']
+    assert (emittance.z_min, emittance.z_max) == (0.0, 1.0) and emittance.final == emittance.max
+    assert set(summary.emittance) == {'x', 'y', 'z'}
+    assert load_summary("summarized", run_dir) == summary
+    # runs restored from the result cache hold the summary of another simulation
+    assert load_summary("other", run_dir) is None
+
+
+def test_summarize_all_checkpoints():
+    run_dir = write_run("summarized-all")
+
+    summary = summarize_run("summarized-all", run_dir, mode="all", n_slices=5)
+
+    assert list(summary.statistics) == summary.checkpoints
+    assert summary.statistics['run.0050.001'].z_pos == pytest.approx(0.5, abs=1e-3)
+
+
+def test_summary_endpoints(client):
+    write_run("summary-endpoint")
+    assert client.get('/simulations/summaries', params={'sim_ids': ['summary-endpoint']}).json() == []
+
+    response = client.get('/simulations/summary-endpoint/summary')
+    assert response.status_code == 200
+    assert response.json()['checkpoints'][-1] == 'run.0100.001'
+    summaries = client.get('/simulations/summaries', params={'sim_ids': ['summary-endpoint', 'unknown']}).json()
+    assert [summary['sim_id'] for summary in summaries] == ['summary-endpoint']
+    assert client.get('/simulations/unknown/summary').status_code == 404
@@ -0,0 +1,49 @@
+import numpy as np
+from conftest import make_particles
+
+
+def test_absolute_coordinates_and_units():
+    particles = make_particles(1000, z_ref=0.5)
+    particles.t_clock[0] = 2.0
+    particle_group = particles.to_pmd()
+
+    assert particle_group.n_particle == 1000
+    np.testing.assert_array_equal(particle_group.x, particles.x)
+    assert particle_group.z[0] == 0.5 and particle_group.pz[0] == 2.5e6
+    np.testing.assert_array_equal(particle_group.z[1:], particles.z[1:] + 0.5)
+    np.testing.assert_array_equal(particle_group.pz[1:], particles.pz[1:] + 2.5e6)
+    np.testing.assert_allclose(particle_group.weight, 1e-14)
+    assert np.all(particle_group.t == 2e-9)
+
+
+def test_status_mapping():
+    particles = make_particles(4)
+    particles.status[:] = [5, 1, 3, -1]
+
+    assert particles.to_pmd().status.tolist() == [1, 2, 3, -1]
+
+
+def test_only_active():
+    particles = make_particles(1000, z_ref=0.5)
+    active = particles.status >= 0
+    particle_group = particles.to_pmd(only_active=True)
+
+    assert particle_group.n_particle == np.count_nonzero(active)
+    np.testing.assert_array_equal(particle_group.z, np.concatenate([[0.5], particles.z[active][1:] + 0.5]))
+
+
+def test_explicit_reference():
+    particles = make_particles(100)
+    particle_group = particles.to_pmd(ref={'z': 1.0, 'pz': 1e6, 't_clock': 0.0})
+
+    np.testing.assert_array_equal(particle_group.z[1:], particles.z[1:] + 1.0)
+    np.testing.assert_array_equal(particle_group.pz[1:], particles.pz[1:] + 1e6)
+
+
+def test_conversion_does_not_modify_particles():
+    particles = make_particles(100, z_ref=0.5)
+    z = particles.z.copy()
+    particles.to_pmd()
+    particles.to_pmd(only_active=True)
+
+    np.testing.assert_array_equal(particles.z, z)